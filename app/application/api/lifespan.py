@@ -1,36 +1,232 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Iterable
+
+from domain.events.base import BaseEvent
 from infra.message_brokers.base import BaseMessageBroker
-from logic.events.messages import NewMessageReceivedFromBrokerEvent
-from logic.init import init_container
+from infra.message_brokers.dots import ConsumedMessage
+from infra.message_brokers.outbox import OutboxRelay
+from infra.message_brokers.routing import PartitionOwnershipMap
+from infra.repositories.messages.base import BaseMessagesRepository
+from infra.repositories.messages.buckets import (
+    BucketedMongoDBMessagesRepository,
+    MessagesStorageLayout,
+)
+from infra.repositories.messages.group_commit import GroupCommitMessagesRepository
+from infra.repositories.messages.memory import StorageBackend
+from infra.repositories.messages.mongo import (
+    BaseMongoDBRepository,
+    MongoDBChatsRepository,
+    MongoDBMessagesRepository,
+)
+from infra.repositories.outbox.mongo import MongoDBOutboxRepository
+from infra.websockets.managers import BaseConnectionManager
+from logic.events.messages import (
+    ChatDeletedFromBrokerEvent,
+    ChatListenersChangedFromBrokerEvent,
+    NewMessageReceivedFromBrokerEvent,
+)
+from logic.init import (
+    get_mediator,
+    init_container,
+)
 from logic.mediator.base import Mediator
 from settings.config import Config
 
 
+logger = logging.getLogger(__name__)
+
+
+async def init_indexes():
+    container = init_container()
+    config: Config = container.resolve(Config)
+
+    if (
+        not config.mongodb_ensure_indexes
+        or config.storage_backend == StorageBackend.MEMORY
+    ):
+        return
+
+    repositories: list[BaseMongoDBRepository] = [
+        container.resolve(MongoDBChatsRepository),
+        container.resolve(MongoDBMessagesRepository),
+        container.resolve(MongoDBOutboxRepository),
+    ]
+    if config.messages_storage_layout == MessagesStorageLayout.BUCKET:
+        repositories.append(container.resolve(BucketedMongoDBMessagesRepository))
+
+    for repository in repositories:
+        for issue in await repository.ensure_indexes():
+            logger.warning("Index could not be ensured: %s", issue)
+
+
 async def init_message_broker():
     container = init_container()
     message_broker: BaseMessageBroker = container.resolve(BaseMessageBroker)
     await message_broker.start()
 
 
+def get_consumed_topics(config: Config) -> list[str]:
+    # Sockets of a deleted chat may be held by any node, only the listener
+    # topics are read just to keep the chats cache up to date.
+    topics = [config.new_message_received_topic, config.chat_deleted_topic]
+
+    if config.chats_cache_enabled:
+        topics.extend(
+            [
+                config.new_listener_added_topic,
+                config.listener_deleted_topic,
+            ]
+        )
+
+    return topics
+
+
+async def check_chat_routing():
+    container = init_container()
+    config: Config = container.resolve(Config)
+
+    if not config.chat_routing_enabled:
+        return
+
+    # Fails when this node is not one of the routing nodes.
+    ownership_map: PartitionOwnershipMap = container.resolve(PartitionOwnershipMap)
+
+    await check_routed_topics(
+        message_broker=container.resolve(BaseMessageBroker),
+        topics=get_consumed_topics(config),
+        routed_topic=config.new_message_received_topic,
+        ownership_map=ownership_map,
+    )
+
+
+async def check_routed_topics(
+    message_broker: BaseMessageBroker,
+    topics: Iterable[str],
+    routed_topic: str,
+    ownership_map: PartitionOwnershipMap,
+) -> None:
+    # Partitions are assigned, not subscribed to, so a topic created later is
+    # never read and chats hashed over a wrong count land on the wrong node.
+    for topic in topics:
+        partitions_count = await message_broker.get_partitions_count(topic)
+
+        if partitions_count is None:
+            raise ValueError(f"Topic {topic} does not exist, chat routing needs it")
+
+        if topic == routed_topic and partitions_count != ownership_map.partitions_count:
+            raise ValueError(
+                f"Topic {topic} has {partitions_count} partitions, "
+                f"CHAT_ROUTING_PARTITIONS is {ownership_map.partitions_count}"
+            )
+
+
 async def consume_in_background():
     container = init_container()
     config: Config = container.resolve(Config)
     message_broker: BaseMessageBroker = container.resolve(BaseMessageBroker)
+    connection_manager: BaseConnectionManager = container.resolve(BaseConnectionManager)
 
-    mediator: Mediator = container.resolve(Mediator)
+    mediator: Mediator = get_mediator()
 
-    async for msg in message_broker.start_consuming(config.new_message_received_topic):
-        await mediator.publish(
-            [
-                NewMessageReceivedFromBrokerEvent(
-                    message_text=msg["message_text"],
-                    message_oid=msg["message_oid"],
-                    chat_oid=msg["chat_oid"],
-                ),
-            ]
+    topics = get_consumed_topics(config)
+
+    def has_local_interest(topic: str, key: bytes | None) -> bool:
+        # New messages only matter for chats with a websocket on this node, the
+        # other topics keep the chats cache of every node up to date.
+        return (
+            topic != config.new_message_received_topic
+            or connection_manager.has_local_interest(key)
+        )
+
+    partitions = None
+    if config.chat_routing_enabled:
+        ownership_map: PartitionOwnershipMap = container.resolve(PartitionOwnershipMap)
+        partitions = {
+            config.new_message_received_topic: ownership_map.get_local_partitions()
+        }
+
+    async for messages in message_broker.start_consuming_batches(
+        topics,
+        max_records=config.kafka_consumer_batch_size,
+        timeout_ms=config.kafka_consumer_batch_timeout_ms,
+        record_filter=has_local_interest,
+        partitions=partitions,
+    ):
+        events = []
+
+        for msg in messages:
+            try:
+                event = convert_consumed_message_to_event(config, msg)
+            except KeyError:
+                logger.warning("Skipping malformed message from topic %s", msg.topic)
+                continue
+
+            if event is None:
+                logger.warning("Skipping message from unknown topic %s", msg.topic)
+                continue
+
+            events.append(event)
+
+        await publish_by_chat(mediator, events)
+
+
+async def publish_by_chat(mediator: Mediator, events: Iterable[BaseEvent]) -> None:
+    # Chats are dispatched concurrently, the events of one chat keep the order
+    # in which they were consumed.
+    events_by_chat: dict[str, list[BaseEvent]] = defaultdict(list)
+
+    for event in events:
+        events_by_chat[event.chat_oid].append(event)
+
+    await asyncio.gather(
+        *[mediator.publish(chat_events) for chat_events in events_by_chat.values()]
+    )
+
+
+def convert_consumed_message_to_event(
+    config: Config, message: ConsumedMessage
+) -> BaseEvent | None:
+    if message.topic == config.new_message_received_topic:
+        return NewMessageReceivedFromBrokerEvent(
+            message_text=message.value["message_text"],
+            message_oid=message.value["message_oid"],
+            chat_oid=message.value["chat_oid"],
+            sequence=message.value.get("sequence"),
         )
 
+    if message.topic == config.chat_deleted_topic:
+        return ChatDeletedFromBrokerEvent(chat_oid=message.value["chat_oid"])
+
+    if message.topic in (
+        config.new_listener_added_topic,
+        config.listener_deleted_topic,
+    ):
+        return ChatListenersChangedFromBrokerEvent(chat_oid=message.value["chat_oid"])
+
+    return None
+
+
+async def relay_outbox_in_background():
+    container = init_container()
+    outbox_relay: OutboxRelay = container.resolve(OutboxRelay)
+
+    await outbox_relay.run()
+
+
+async def close_messages_repository():
+    container = init_container()
+
+    # Messages still collecting in a batch are written before shutting down.
+    messages_repository = container.resolve(BaseMessagesRepository)
+    if isinstance(messages_repository, GroupCommitMessagesRepository):
+        await messages_repository.aclose()
+
 
 async def close_message_broker():
+    await get_mediator().wait_background_tasks()
+
     container = init_container()
     message_broker: BaseMessageBroker = container.resolve(BaseMessageBroker)
     await message_broker.close()
@@ -6,27 +6,43 @@ from aiojobs import Scheduler
 from punq import Container
 
 from application.api.lifespan import (
+    check_chat_routing,
     close_message_broker,
+    close_messages_repository,
     consume_in_background,
+    init_indexes,
     init_message_broker,
+    relay_outbox_in_background,
 )
 from application.api.messages.handlers import router as message_router
 from application.api.messages.websockets.messages import router as message_ws_router
+from application.api.metrics.handlers import router as metrics_router
+from infra.repositories.messages.memory import StorageBackend
 from logic.init import init_container
+from settings.config import Config
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await init_indexes()
     await init_message_broker()
+    await check_chat_routing()
 
     container: Container = init_container()
+    config: Config = container.resolve(Config)
     scheduler: Scheduler = container.resolve(Scheduler)
 
-    job = await scheduler.spawn(consume_in_background())
+    jobs = [await scheduler.spawn(consume_in_background())]
+
+    if config.outbox_enabled and config.storage_backend == StorageBackend.MONGODB:
+        jobs.append(await scheduler.spawn(relay_outbox_in_background()))
 
     yield
+    await close_messages_repository()
     await close_message_broker()
-    await job.close()
+
+    for job in jobs:
+        await job.close()
 
 
 def create_app() -> FastAPI:
@@ -39,5 +55,6 @@ def create_app() -> FastAPI:
     )
     app.include_router(message_router, prefix="/chats")
     app.include_router(message_ws_router, prefix="/chats")
+    app.include_router(metrics_router, prefix="/metrics")
 
     return app
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from domain.exceptions.base import ApplicationException
+
+
+@dataclass(eq=False)
+class InvalidCursorException(ApplicationException):
+    cursor: str
+
+    @property
+    def message(self):
+        return f"Invalid pagination cursor: {self.cursor}"
@@ -1,22 +1,99 @@
+from base64 import (
+    urlsafe_b64decode,
+    urlsafe_b64encode,
+)
+from binascii import Error as BinasciiError
+from datetime import datetime
+from typing import Iterable
+
+import orjson
 from pydantic import BaseModel
 
+from application.api.messages.exceptions import InvalidCursorException
 from infra.repositories.filters.messages import (
-    GetMessagesFilters as GetMessagesInfraFilters,
+    CountMode,
+    CursorDirection,
     GetChatsFilters as GetChatsInfraFilters,
+    GetMessagesFilters as GetMessagesInfraFilters,
+    MessagesCursor,
 )
+from infra.repositories.messages.read_models import MessageListItem
+
+
+def encode_messages_cursor(message: MessageListItem, direction: CursorDirection) -> str:
+    payload = orjson.dumps(
+        [message.created_at.isoformat(), message.oid, direction.value]
+    )
+    return urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_messages_cursor(cursor: str) -> tuple[MessagesCursor, CursorDirection]:
+    try:
+        payload = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, oid, direction = orjson.loads(payload)
+
+        return (
+            MessagesCursor(created_at=datetime.fromisoformat(created_at), oid=oid),
+            CursorDirection(direction),
+        )
+    except (BinasciiError, orjson.JSONDecodeError, TypeError, ValueError):
+        raise InvalidCursorException(cursor)
 
 
 class GetMessagesFilters(BaseModel):
     limit: int = 10
     offset: int = 0
+    cursor: str | None = None
+    direction: CursorDirection | None = None
+    count: CountMode | None = None
+    # Deprecated in favour of `count`, true asks for the exact count and false
+    # for none. It is only used when `count` is not passed.
+    with_count: bool | None = None
+
+    def get_count_mode(self) -> CountMode:
+        if self.count is not None:
+            return self.count
+
+        if self.with_count is None:
+            return CountMode.ESTIMATED
+
+        return CountMode.EXACT if self.with_count else CountMode.NONE
 
     def to_infra(self):
-        return GetMessagesInfraFilters(limit=self.limit, offset=self.offset)
+        if not self.cursor:
+            return GetMessagesInfraFilters(
+                limit=self.limit,
+                offset=self.offset,
+                direction=self.direction,
+                count=self.get_count_mode(),
+            )
+
+        cursor, direction = decode_messages_cursor(self.cursor)
+
+        return GetMessagesInfraFilters(
+            limit=self.limit,
+            cursor=cursor,
+            direction=direction,
+            count=self.get_count_mode(),
+        )
+
+    def get_next_cursor(
+        self, filters: GetMessagesInfraFilters, messages: Iterable[MessageListItem]
+    ) -> str | None:
+        messages = list(messages)
+
+        if not filters.is_cursor_mode or len(messages) < filters.limit:
+            return None
+
+        return encode_messages_cursor(messages[-1], filters.direction)
 
 
 class GetChatsFilters(BaseModel):
     limit: int = 10
     offset: int = 0
+    count: CountMode = CountMode.ESTIMATED
 
     def to_infra(self):
-        return GetChatsInfraFilters(limit=self.limit, offset=self.offset)
+        return GetChatsInfraFilters(
+            limit=self.limit, offset=self.offset, count=self.count
+        )
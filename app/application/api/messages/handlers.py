@@ -1,7 +1,10 @@
-from punq import Container
+from typing import AsyncIterator
 
+import orjson
 from fastapi import Depends, status
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
+from punq import Container
 
 from application.api.messages.decorators import handle_exceptions
 from application.api.messages.filters import GetMessagesFilters, GetChatsFilters
@@ -10,10 +13,14 @@ from application.api.messages.schemas import (
     AddListenerSchema,
     ChatDetailSchema,
     ChatListenerItemSchema,
+    ChatRouteSchema,
     CreateChatRequestSchema,
     CreateChatResponseSchema,
     CreateMessageResponseSchema,
     CreateMessageSchema,
+    CreateMessagesBatchItemSchema,
+    CreateMessagesBatchResponseSchema,
+    CreateMessagesBatchSchema,
     GetAllChatsQueryResponseSchema,
     GetMessagesQueryResponseSchema,
     MessageDetailSchema,
@@ -23,23 +30,46 @@ from logic.commands.messages import (
     AddTelegramListenerCommand,
     CreateChatCommand,
     CreateMessageCommand,
+    CreateMessagesBatchCommand,
     DeleteChatCommand,
     DeleteTelegramListenerCommand,
 )
-from logic.init import init_container
+from infra.repositories.messages.read_models import MessageListItem
+from logic.init import get_mediator, init_container
 from logic.mediator.base import Mediator
 from logic.queries.messages import (
+    ExportMessagesQuery,
     GetAllChatsListenersQuery,
     GetAllChatsQuery,
     GetChatDetailQuery,
+    GetChatRouteQuery,
     GetMessagesQuery,
 )
+from settings.config import Config
 
 router = APIRouter(
     tags=["Chat"],
 )
 
 
+async def encode_ndjson(
+    messages: AsyncIterator[MessageListItem], chunk_size: int
+) -> AsyncIterator[bytes]:
+    # Lines are sent in chunks, a write per message would cost more than the
+    # encoding itself.
+    lines = []
+
+    async for message in messages:
+        lines.append(orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE))
+
+        if len(lines) >= chunk_size:
+            yield b"".join(lines)
+            lines.clear()
+
+    if lines:
+        yield b"".join(lines)
+
+
 @router.post(
     "/",
     response_model=CreateChatResponseSchema,
@@ -52,11 +82,9 @@ router = APIRouter(
 )
 @handle_exceptions
 async def create_chat_handler(
-    schema: CreateChatRequestSchema, container: Container = Depends(init_container)
+    schema: CreateChatRequestSchema, mediator: Mediator = Depends(get_mediator)
 ) -> CreateChatResponseSchema:
     """Create new chat"""
-    mediator: Mediator = container.resolve(Mediator)
-
     chat, *_ = await mediator.handle_command(CreateChatCommand(title=schema.title))
 
     return CreateChatResponseSchema.from_entity(chat=chat)
@@ -75,11 +103,9 @@ async def create_chat_handler(
 async def create_message_handler(
     chat_oid: str,
     schema: CreateMessageSchema,
-    container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
 ) -> CreateMessageResponseSchema:
     """Create new message"""
-    mediator: Mediator = container.resolve(Mediator)
-
     message, *_ = await mediator.handle_command(
         CreateMessageCommand(text=schema.text, chat_oid=chat_oid)
     )
@@ -87,6 +113,40 @@ async def create_message_handler(
     return CreateMessageResponseSchema.from_entity(message=message)
 
 
+@router.post(
+    "/{chat_oid}/messages:batch",
+    status_code=status.HTTP_201_CREATED,
+    description=(
+        "Create many messages at once. Every message is validated on its own "
+        "and the result of each one is returned in request order"
+    ),
+    responses={
+        status.HTTP_201_CREATED: {"model": CreateMessagesBatchResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorSchema},
+    },
+)
+@handle_exceptions
+async def create_messages_batch_handler(
+    chat_oid: str,
+    schema: CreateMessagesBatchSchema,
+    mediator: Mediator = Depends(get_mediator),
+) -> CreateMessagesBatchResponseSchema:
+    """Create many messages"""
+    results, *_ = await mediator.handle_command(
+        CreateMessagesBatchCommand(
+            texts=tuple(message.text for message in schema.messages),
+            chat_oid=chat_oid,
+        )
+    )
+
+    return CreateMessagesBatchResponseSchema(
+        items=[
+            CreateMessagesBatchItemSchema.from_result(index=index, result=result)
+            for index, result in enumerate(results)
+        ]
+    )
+
+
 @router.get(
     "/{chat_oid}/",
     status_code=status.HTTP_200_OK,
@@ -98,19 +158,39 @@ async def create_message_handler(
 )
 @handle_exceptions
 async def get_chat_detail_handler(
-    chat_oid: str, container: Container = Depends(init_container)
+    chat_oid: str, mediator: Mediator = Depends(get_mediator)
 ) -> ChatDetailSchema:
-    mediator: Mediator = container.resolve(Mediator)
-
     chat = await mediator.handle_query(GetChatDetailQuery(chat_oid=chat_oid))
 
     return ChatDetailSchema.from_entity(chat)
 
 
+@router.get(
+    "/{chat_oid}/node",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Get the node that owns the chat. Open the chat websocket on this node "
+        "to receive its messages"
+    ),
+    responses={
+        status.HTTP_200_OK: {"model": ChatRouteSchema},
+    },
+)
+async def get_chat_node_handler(
+    chat_oid: str, mediator: Mediator = Depends(get_mediator)
+) -> ChatRouteSchema:
+    route = await mediator.handle_query(GetChatRouteQuery(chat_oid=chat_oid))
+
+    return ChatRouteSchema.from_entity(route)
+
+
 @router.get(
     "/{chat_oid}/messages",
     status_code=status.HTTP_200_OK,
-    description="Get all messages by chat_oid",
+    description=(
+        "Get all messages by chat_oid. Pass direction to page by cursor, "
+        "then pass the returned next_cursor to get the following page"
+    ),
     responses={
         status.HTTP_200_OK: {"model": GetMessagesQueryResponseSchema},
         status.HTTP_400_BAD_REQUEST: {"model": ErrorSchema},
@@ -120,19 +200,52 @@ async def get_chat_detail_handler(
 async def get_chat_messages_handler(
     chat_oid: str,
     filters: GetMessagesFilters = Depends(),
-    container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
 ) -> GetMessagesQueryResponseSchema:
-    mediator: Mediator = container.resolve(Mediator)
-
+    infra_filters = filters.to_infra()
     messages, count = await mediator.handle_query(
-        GetMessagesQuery(chat_oid=chat_oid, filters=filters.to_infra())
+        GetMessagesQuery(chat_oid=chat_oid, filters=infra_filters)
     )
 
     return GetMessagesQueryResponseSchema(
         count=count,
         limit=filters.limit,
         offset=filters.offset,
-        items=[MessageDetailSchema.from_entity(message) for message in messages],
+        items=[MessageDetailSchema.from_read_model(message) for message in messages],
+        next_cursor=filters.get_next_cursor(infra_filters, messages),
+    )
+
+
+@router.get(
+    "/{chat_oid}/messages/export",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Export all messages of the chat as newline delimited JSON, from the "
+        "oldest to the newest"
+    ),
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorSchema},
+    },
+)
+@handle_exceptions
+async def export_chat_messages_handler(
+    chat_oid: str,
+    container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
+) -> StreamingResponse:
+    config: Config = container.resolve(Config)
+    messages = await mediator.handle_query(
+        ExportMessagesQuery(
+            chat_oid=chat_oid, batch_size=config.messages_export_batch_size
+        )
+    )
+
+    # A client that goes away cancels the stream, which closes the cursor.
+    return StreamingResponse(
+        encode_ndjson(messages, chunk_size=config.messages_export_batch_size),
+        media_type="application/x-ndjson",
     )
 
 
@@ -149,10 +262,8 @@ async def get_chat_messages_handler(
 @handle_exceptions
 async def get_all_chats_handler(
     filters: GetChatsFilters = Depends(),
-    container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
 ) -> GetAllChatsQueryResponseSchema:
-    mediator: Mediator = container.resolve(Mediator)
-
     chats, count = await mediator.handle_query(
         GetAllChatsQuery(filters=filters.to_infra())
     )
@@ -161,7 +272,7 @@ async def get_all_chats_handler(
         count=count,
         limit=filters.limit,
         offset=filters.offset,
-        items=[ChatDetailSchema.from_entity(chat) for chat in chats],
+        items=[ChatDetailSchema.from_read_model(chat) for chat in chats],
     )
 
 
@@ -177,10 +288,8 @@ async def get_all_chats_handler(
 )
 @handle_exceptions
 async def delete_chat_handler(
-    chat_oid: str, container: Container = Depends(init_container)
+    chat_oid: str, mediator: Mediator = Depends(get_mediator)
 ) -> None:
-    mediator: Mediator = container.resolve(Mediator)
-
     await mediator.handle_command(DeleteChatCommand(chat_oid=chat_oid))
 
     return status.HTTP_204_NO_CONTENT
@@ -201,10 +310,8 @@ async def delete_chat_handler(
 async def add_telegram_listener(
     chat_oid: str,
     schema: AddListenerSchema,
-    container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
 ) -> AddListenerResponseSchema:
-    mediator: Mediator = container.resolve(Mediator)
-
     listener, *_ = await mediator.handle_command(
         AddTelegramListenerCommand(
             chat_oid=chat_oid, telegram_chat_id=schema.telegram_chat_id
@@ -227,10 +334,8 @@ async def add_telegram_listener(
 @handle_exceptions
 async def get_all_chat_listeners_handler(
     chat_oid: str,
-    container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
 ) -> list[ChatListenerItemSchema]:
-    mediator: Mediator = container.resolve(Mediator)
-
     listeners = await mediator.handle_query(
         GetAllChatsListenersQuery(chat_oid=chat_oid)
     )
@@ -256,10 +361,8 @@ async def get_all_chat_listeners_handler(
 async def delete_chat_listener_handler(
     chat_oid: str,
     listener_oid: str,
-    container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
 ) -> None:
-    mediator: Mediator = container.resolve(Mediator)
-
     await mediator.handle_command(
         DeleteTelegramListenerCommand(chat_oid=chat_oid, telegram_chat_id=listener_oid)
     )
@@ -1,8 +1,11 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from application.api.schemas import BaseQueryResponseSchema
 from domain.entities.messages import Chat, ChatListener, Message
+from domain.exceptions.base import ApplicationException
+from infra.message_brokers.routing import ChatRoute
+from infra.repositories.messages.read_models import ChatListItem, MessageListItem
 
 
 class CreateChatRequestSchema(BaseModel):
@@ -37,16 +40,40 @@ class CreateMessageResponseSchema(BaseModel):
         )
 
 
+class CreateMessagesBatchSchema(BaseModel):
+    messages: list[CreateMessageSchema] = Field(min_length=1, max_length=1000)
+
+
+class CreateMessagesBatchItemSchema(BaseModel):
+    index: int
+    oid: str | None = None
+    text: str | None = None
+    error: str | None = None
+
+    @classmethod
+    def from_result(
+        cls, index: int, result: Message | ApplicationException
+    ) -> "CreateMessagesBatchItemSchema":
+        if isinstance(result, ApplicationException):
+            return cls(index=index, error=result.message)
+
+        return cls(index=index, oid=result.oid, text=result.text.as_generic_type())
+
+
+class CreateMessagesBatchResponseSchema(BaseModel):
+    items: list[CreateMessagesBatchItemSchema]
+
+
 class MessageDetailSchema(BaseModel):
     oid: str
     text: str
     created_at: datetime
 
     @classmethod
-    def from_entity(cls, message: Message) -> "MessageDetailSchema":
+    def from_read_model(cls, message: MessageListItem) -> "MessageDetailSchema":
         return cls(
             oid=message.oid,
-            text=message.text.as_generic_type(),
+            text=message.text,
             created_at=message.created_at,
         )
 
@@ -64,6 +91,10 @@ class ChatDetailSchema(BaseModel):
             created_at=chat.created_at,
         )
 
+    @classmethod
+    def from_read_model(cls, chat: ChatListItem) -> "ChatDetailSchema":
+        return cls(oid=chat.oid, title=chat.title, created_at=chat.created_at)
+
 
 class AddListenerSchema(BaseModel):
     telegram_chat_id: str
@@ -87,9 +118,28 @@ class ChatListenerItemSchema(BaseModel):
 
 class GetMessagesQueryResponseSchema(
     BaseQueryResponseSchema[list[MessageDetailSchema]]
-): ...
+):
+    next_cursor: str | None = None
 
 
 class GetAllChatsQueryResponseSchema(
     BaseQueryResponseSchema[list[ChatDetailSchema]]
 ): ...
+
+
+class ChatRouteSchema(BaseModel):
+    chat_oid: str
+    partition: int
+    node_id: str
+    node_url: str
+    is_local: bool
+
+    @classmethod
+    def from_entity(cls, route: ChatRoute) -> "ChatRouteSchema":
+        return cls(
+            chat_oid=route.chat_oid,
+            partition=route.partition,
+            node_id=route.node.node_id,
+            node_url=route.node.url,
+            is_local=route.is_local,
+        )
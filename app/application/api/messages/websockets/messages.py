@@ -2,11 +2,21 @@ from fastapi import Depends, WebSocket, WebSocketDisconnect
 from fastapi.routing import APIRouter
 from punq import Container
 
-from infra.websockets.managers import BaseConnectionManager
+from infra.websockets.formats import negotiate_wire_format
+from infra.websockets.managers import (
+    BaseConnectionManager,
+    ResumeBacklog,
+)
+from logic.events.messages import convert_message_to_wire_frames
 from logic.exceptions.messages import ChatNotFoundException
-from logic.init import init_container
+from logic.init import get_mediator, init_container
 from logic.mediator.base import Mediator
-from logic.queries.messages import GetChatDetailQuery
+from logic.queries.messages import (
+    GetChatDetailQuery,
+    GetChatRouteQuery,
+    GetMessagesAfterSequenceQuery,
+)
+from settings.config import Config
 
 
 router = APIRouter(tags=["chats"])
@@ -16,10 +26,24 @@ router = APIRouter(tags=["chats"])
 async def websocket_endpoint(
     chat_oid: str,
     websocket: WebSocket,
+    since: str | None = None,
+    resume_from: int | None = None,
     container: Container = Depends(init_container),
+    mediator: Mediator = Depends(get_mediator),
 ):
     connection_manager: BaseConnectionManager = container.resolve(BaseConnectionManager)
-    mediator: Mediator = container.resolve(Mediator)
+
+    route = await mediator.handle_query(GetChatRouteQuery(chat_oid=chat_oid))
+    if not route.is_local:
+        await websocket.accept()
+        await websocket.send_json(
+            data={
+                "error": "Chat is served by another node",
+                "node_url": route.node.url,
+            }
+        )
+        await websocket.close()
+        return
 
     try:
         await mediator.handle_query(GetChatDetailQuery(chat_oid=chat_oid))
@@ -29,13 +53,53 @@ async def websocket_endpoint(
         await websocket.close()
         return
 
-    await connection_manager.accept_connection(websocket=websocket, key=chat_oid)
+    # A client that passes the sequence of the last message it got in
+    # `resume_from` receives exactly the messages after it, from the replay
+    # buffer when it holds all of them and from the database otherwise. Without
+    # it the recent messages are replayed, only those after the message_oid
+    # passed in `since` when it is still buffered. A resume with more messages
+    # than fit in one load gets a `history_truncated` frame where the gap
+    # starts, the rest has to be fetched from the history endpoint.
+    load_backlog = None
+    if resume_from is not None and not connection_manager.can_resume_locally(
+        chat_oid, resume_from
+    ):
+        config: Config = container.resolve(Config)
 
-    await websocket.send_text("You are now connected!")
+        async def load_backlog() -> ResumeBacklog:
+            messages = await mediator.handle_query(
+                GetMessagesAfterSequenceQuery(
+                    chat_oid=chat_oid,
+                    sequence=resume_from,
+                    limit=config.websocket_resume_max_messages,
+                )
+            )
+
+            return ResumeBacklog(
+                frames=[
+                    convert_message_to_wire_frames(message) for message in messages
+                ],
+                is_truncated=len(messages) >= config.websocket_resume_max_messages,
+            )
+
+    is_accepted = await connection_manager.accept_connection(
+        websocket=websocket,
+        key=chat_oid,
+        since_message_oid=since,
+        wire_format=negotiate_wire_format(websocket.scope.get("subprotocols", ())),
+        resume_from=resume_from,
+        load_backlog=load_backlog,
+        # Written by the sender task ahead of the replayed messages, a second
+        # writer on the socket could interleave with them.
+        greeting="You are now connected!",
+    )
+    if not is_accepted:
+        return
 
     try:
         while True:
             await websocket.receive_text()
+            connection_manager.mark_alive(websocket)
 
     except WebSocketDisconnect:
         await connection_manager.remove_connection(websocket=websocket, key=chat_oid)
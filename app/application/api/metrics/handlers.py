@@ -0,0 +1,95 @@
+import os
+import resource
+
+from fastapi import (
+    Depends,
+    status,
+)
+from fastapi.routing import APIRouter
+
+from punq import Container
+
+from application.api.metrics.schemas import (
+    CacheStatsSchema,
+    ConsumerStatsSchema,
+    GroupCommitStatsSchema,
+    MetricsResponseSchema,
+    ReplayBufferStatsSchema,
+    WebsocketsStatsSchema,
+)
+from infra.message_brokers.base import BaseMessageBroker
+from infra.message_brokers.kafka import KafkaMessageBroker
+from infra.message_brokers.outbox import OutboxMessageBroker
+from infra.repositories.messages.cache import CachedChatsRepository
+from infra.repositories.messages.group_commit import GroupCommitMessagesRepository
+from infra.websockets.managers import (
+    BaseConnectionManager,
+    ConnectionManager,
+)
+from logic.init import init_container
+from settings.config import Config
+
+
+router = APIRouter(
+    tags=["Metrics"],
+)
+
+
+def get_rss_bytes() -> int | None:
+    """Current resident set size, None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    description="Get runtime metrics of this node",
+    responses={
+        status.HTTP_200_OK: {"model": MetricsResponseSchema},
+    },
+    summary="Get runtime metrics of this node",
+)
+async def get_metrics_handler(
+    container: Container = Depends(init_container),
+) -> MetricsResponseSchema:
+    config: Config = container.resolve(Config)
+    # ru_maxrss is the peak of the process, reported in kilobytes on Linux.
+    metrics = MetricsResponseSchema(
+        rss_bytes=get_rss_bytes(),
+        peak_rss_bytes=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    )
+
+    if config.chats_cache_enabled:
+        chats_cache: CachedChatsRepository = container.resolve(CachedChatsRepository)
+        metrics.chats_cache = CacheStatsSchema.from_entity(chats_cache.stats)
+
+    if config.messages_group_commit_enabled:
+        group_commit: GroupCommitMessagesRepository = container.resolve(
+            GroupCommitMessagesRepository
+        )
+        metrics.group_commit = GroupCommitStatsSchema.from_entity(group_commit.stats)
+
+    message_broker = container.resolve(BaseMessageBroker)
+    if isinstance(message_broker, OutboxMessageBroker):
+        message_broker = message_broker.message_broker
+    if isinstance(message_broker, KafkaMessageBroker):
+        metrics.consumer = ConsumerStatsSchema.from_entity(
+            message_broker.consumer_stats
+        )
+
+    connection_manager = container.resolve(BaseConnectionManager)
+    if isinstance(connection_manager, ConnectionManager):
+        metrics.websockets = WebsocketsStatsSchema.from_entity(connection_manager)
+
+        if connection_manager.replay_buffer is not None:
+            metrics.replay_buffer = ReplayBufferStatsSchema.from_entity(
+                connection_manager.replay_buffer.stats
+            )
+
+    return metrics
@@ -0,0 +1,142 @@
+from pydantic import BaseModel
+
+from infra.message_brokers.kafka import ConsumerStats
+from infra.repositories.messages.cache import CacheStats
+from infra.repositories.messages.group_commit import (
+    GroupCommitStats,
+    Histogram,
+)
+from infra.websockets.managers import ConnectionManager
+from infra.websockets.replay import ReplayBufferStats
+
+
+class CacheStatsSchema(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    size: int
+
+    @classmethod
+    def from_entity(cls, stats: CacheStats) -> "CacheStatsSchema":
+        return cls(
+            hits=stats.hits,
+            misses=stats.misses,
+            evictions=stats.evictions,
+            invalidations=stats.invalidations,
+            size=stats.size,
+        )
+
+
+class WebsocketsStatsSchema(BaseModel):
+    connections: int
+    chats: int
+    accepted_connections: int
+    removed_connections: int
+    reaped_connections: int
+    rejected_connections: int
+    disconnect_timeouts: int
+    queued_frames: int
+    queued_bytes: int
+    enqueued_frames: int
+    sent_frames: int
+    dropped_frames: int
+    coalesced_frames: int
+    disconnected_clients: int
+
+    @classmethod
+    def from_entity(
+        cls, connection_manager: ConnectionManager
+    ) -> "WebsocketsStatsSchema":
+        stats = connection_manager.send_stats
+
+        return cls(
+            connections=connection_manager.connections_count,
+            chats=len(connection_manager.connections_map),
+            accepted_connections=connection_manager.stats.accepted_connections,
+            removed_connections=connection_manager.stats.removed_connections,
+            reaped_connections=connection_manager.stats.reaped_connections,
+            rejected_connections=connection_manager.stats.rejected_connections,
+            disconnect_timeouts=connection_manager.stats.disconnect_timeouts,
+            queued_frames=connection_manager.queued_frames,
+            queued_bytes=connection_manager.queued_bytes,
+            enqueued_frames=stats.enqueued_frames,
+            sent_frames=stats.sent_frames,
+            dropped_frames=stats.dropped_frames,
+            coalesced_frames=stats.coalesced_frames,
+            disconnected_clients=stats.disconnected_clients,
+        )
+
+
+class ConsumerStatsSchema(BaseModel):
+    processed_records: int
+    skipped_records: int
+
+    @classmethod
+    def from_entity(cls, stats: ConsumerStats) -> "ConsumerStatsSchema":
+        return cls(
+            processed_records=stats.processed_records,
+            skipped_records=stats.skipped_records,
+        )
+
+
+class ReplayBufferStatsSchema(BaseModel):
+    chats: int
+    messages: int
+    size_bytes: int
+    evicted_chats: int
+    replayed_messages: int
+
+    @classmethod
+    def from_entity(cls, stats: ReplayBufferStats) -> "ReplayBufferStatsSchema":
+        return cls(
+            chats=stats.chats,
+            messages=stats.messages,
+            size_bytes=stats.size_bytes,
+            evicted_chats=stats.evicted_chats,
+            replayed_messages=stats.replayed_messages,
+        )
+
+
+class HistogramSchema(BaseModel):
+    bounds: list[float]
+    counts: list[int]
+    count: int
+    sum: float
+
+    @classmethod
+    def from_entity(cls, histogram: Histogram) -> "HistogramSchema":
+        return cls(
+            bounds=list(histogram.bounds),
+            counts=list(histogram.counts),
+            count=histogram.count,
+            sum=histogram.sum,
+        )
+
+
+class GroupCommitStatsSchema(BaseModel):
+    flushes: int
+    written_messages: int
+    failed_messages: int
+    flush_interval_ms: HistogramSchema
+    batch_size: HistogramSchema
+
+    @classmethod
+    def from_entity(cls, stats: GroupCommitStats) -> "GroupCommitStatsSchema":
+        return cls(
+            flushes=stats.flushes,
+            written_messages=stats.written_messages,
+            failed_messages=stats.failed_messages,
+            flush_interval_ms=HistogramSchema.from_entity(stats.flush_interval_ms),
+            batch_size=HistogramSchema.from_entity(stats.batch_size),
+        )
+
+
+class MetricsResponseSchema(BaseModel):
+    rss_bytes: int | None
+    peak_rss_bytes: int
+    chats_cache: CacheStatsSchema | None = None
+    consumer: ConsumerStatsSchema | None = None
+    websockets: WebsocketsStatsSchema | None = None
+    replay_buffer: ReplayBufferStatsSchema | None = None
+    group_commit: GroupCommitStatsSchema | None = None
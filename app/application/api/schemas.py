@@ -10,7 +10,7 @@ R = TypeVar("R", bound=BaseModel)
 
 
 class BaseQueryResponseSchema(BaseModel, Generic[R]):
-    count: int
+    count: int | None
     offset: int
     limit: int
     items: R
@@ -0,0 +1,87 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import Iterable
+
+from punq import (
+    Container,
+    Scope,
+)
+
+from domain.entities.messages import (
+    Chat,
+    ChatListener,
+)
+from domain.values.messages import Title
+from infra.message_brokers.base import BaseMessageBroker
+from infra.message_brokers.null import NullMessageBroker
+from infra.repositories.filters.messages import GetChatsFilters
+from infra.repositories.messages.base import BaseChatsRepository
+from infra.repositories.messages.read_models import ChatListItem
+from logic.init import _init_container
+from settings.config import Config
+
+
+@dataclass
+class StaticChatsRepository(BaseChatsRepository):
+    chat: Chat = field(default_factory=lambda: Chat(title=Title("benchmark")))
+    last_sequence: int = 0
+
+    async def check_chat_exists_by_title(self, title: str) -> bool:
+        return self.chat.title.as_generic_type() == title
+
+    async def get_chat_by_oid(self, oid: str) -> Chat | None:
+        return self.chat
+
+    async def add_chat(self, chat: Chat) -> None: ...
+
+    async def get_all_chats(
+        self, filters: GetChatsFilters
+    ) -> tuple[list[ChatListItem], int | None]:
+        return [
+            ChatListItem(
+                oid=self.chat.oid,
+                title=self.chat.title.as_generic_type(),
+                created_at=self.chat.created_at,
+            )
+        ], 1
+
+    async def delete_chat_by_oid(self, oid: str) -> None: ...
+
+    async def add_telegram_listener(self, chat_oid: str, telegram_chat_id: str): ...
+
+    async def delete_telegram_listener(self, chat_oid: str, telegram_chat_id: str): ...
+
+    async def get_all_chat_listeners(self, chat_oid: str) -> Iterable[ChatListener]:
+        return self.chat.listeners
+
+    async def reserve_message_sequences(
+        self, chat_oid: str, count: int = 1
+    ) -> int | None:
+        self.last_sequence += count
+        return self.last_sequence - count + 1
+
+    async def uncount_messages(self, chat_oid: str, count: int) -> None: ...
+
+    async def get_messages_count(self, chat_oid: str) -> int | None:
+        return self.last_sequence
+
+
+def init_benchmark_container() -> Container:
+    # Settings are required by the container, but nothing in the benchmarks
+    # connects to MongoDB or Kafka.
+    container = _init_container(
+        config=Config(
+            MONGO_DB_CONNECTION_URI="mongodb://localhost:27017",
+            KAFKA_URL="localhost:9092",
+        )
+    )
+    container.register(
+        BaseMessageBroker, instance=NullMessageBroker(), scope=Scope.singleton
+    )
+    container.register(
+        BaseChatsRepository, instance=StaticChatsRepository(), scope=Scope.singleton
+    )
+
+    return container
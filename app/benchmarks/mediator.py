@@ -0,0 +1,63 @@
+"""Compare the cost of getting a mediator and dispatching one query.
+
+legacy: the handler graph is rebuilt by punq on every request.
+frozen: the singleton mediator is built once and dispatches from its table.
+
+Run from the ``app`` directory: ``python -m benchmarks.mediator``.
+"""
+
+import asyncio
+import time
+from typing import Callable
+
+from punq import Container
+
+from benchmarks.fixtures import init_benchmark_container
+from logic.init import init_mediator
+from logic.mediator.base import Mediator
+from logic.queries.messages import GetChatDetailQuery
+
+
+ITERATIONS = 20_000
+
+
+def init_legacy_container() -> Container:
+    container = init_benchmark_container()
+
+    # Register the mediator factory without the singleton scope, which is how
+    # the mediator was registered before it was frozen at startup.
+    container.register(Mediator, factory=lambda: init_mediator(container))
+
+    return container
+
+
+async def measure(name: str, get_mediator: Callable[[], Mediator]) -> float:
+    query = GetChatDetailQuery(chat_oid="benchmark")
+
+    started_at = time.perf_counter()
+    for _ in range(ITERATIONS):
+        mediator = get_mediator()
+        await mediator.handle_query(query)
+    elapsed = time.perf_counter() - started_at
+
+    per_dispatch_us = elapsed / ITERATIONS * 1_000_000
+    print(f"{name:<8} {per_dispatch_us:10.2f} us/dispatch")
+
+    return per_dispatch_us
+
+
+async def main():
+    legacy_container = init_legacy_container()
+    frozen_mediator = init_benchmark_container().resolve(Mediator)
+
+    benchmarks: list[tuple[str, Callable[[], Mediator]]] = [
+        ("legacy", lambda: legacy_container.resolve(Mediator)),
+        ("frozen", lambda: frozen_mediator),
+    ]
+    results = {name: await measure(name, getter) for name, getter in benchmarks}
+
+    print(f"speedup  {results['legacy'] / results['frozen']:10.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
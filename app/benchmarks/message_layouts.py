@@ -0,0 +1,196 @@
+"""Compare the document and the bucket layout of messages on a real MongoDB.
+
+Both repositories get the same ``--messages`` spread over ``--chats`` chats,
+written one message per call by ``--concurrency`` writers, then serve
+``--reads`` pages of ``--page-size`` messages of a random chat:
+
+recent  the newest page, what a client opening a chat reads
+cursor  a page after a cursor at a random position of the chat
+offset  a page at a random offset
+
+Reported: writes per second, p50/p99 latency of every read, the documents
+and bytes (data plus indexes) the collection takes. The benchmark works in
+its own database, ``--uri`` defaults to MONGO_DB_CONNECTION_URI, and drops it
+afterwards.
+
+Run from the ``app`` directory: ``python -m benchmarks.message_layouts``.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from domain.entities.messages import Message
+from domain.values.messages import Text
+from infra.repositories.filters.messages import (
+    CountMode,
+    CursorDirection,
+    GetMessagesFilters,
+    MessagesCursor,
+)
+from infra.repositories.messages.base import BaseMessagesRepository
+from infra.repositories.messages.buckets import BucketedMongoDBMessagesRepository
+from infra.repositories.messages.mongo import MongoDBMessagesRepository
+
+
+DATABASE = "benchmark_message_layouts"
+# A message every 10 seconds per chat, so chats span many bucket windows.
+MESSAGE_INTERVAL = timedelta(seconds=10)
+
+
+def build_messages(chats: int, count: int) -> list[Message]:
+    started_at = datetime(2024, 1, 1)
+
+    return [
+        Message(
+            text=Text(f"benchmark message {index} " + "x" * 80),
+            chat_oid=f"chat-{index % chats}",
+            created_at=started_at + MESSAGE_INTERVAL * (index // chats),
+            sequence=index // chats + 1,
+        )
+        for index in range(count)
+    ]
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def measure_writes(
+    repository: BaseMessagesRepository, messages: list[Message], concurrency: int
+) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def write(message: Message):
+        async with semaphore:
+            await repository.add_message(message)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[write(message) for message in messages])
+
+    return len(messages) / (time.perf_counter() - started_at)
+
+
+async def measure_reads(
+    repository: BaseMessagesRepository,
+    messages: list[Message],
+    chats: int,
+    reads: int,
+    page_size: int,
+) -> dict[str, list[float]]:
+    per_chat = len(messages) // chats
+    latencies: dict[str, list[float]] = {"recent": [], "cursor": [], "offset": []}
+    # The same pages are read from both layouts.
+    randomizer = random.Random(0)
+
+    for _ in range(reads):
+        chat_index = randomizer.randrange(chats)
+        position = randomizer.randrange(per_chat)
+        after = messages[position * chats + chat_index]
+
+        pages = {
+            "recent": GetMessagesFilters(
+                limit=page_size,
+                direction=CursorDirection.BACKWARD,
+                count=CountMode.NONE,
+            ),
+            "cursor": GetMessagesFilters(
+                limit=page_size,
+                direction=CursorDirection.FORWARD,
+                cursor=MessagesCursor(created_at=after.created_at, oid=after.oid),
+                count=CountMode.NONE,
+            ),
+            "offset": GetMessagesFilters(
+                limit=page_size, offset=position, count=CountMode.NONE
+            ),
+        }
+        for name, filters in pages.items():
+            started_at = time.perf_counter()
+            await repository.get_messages(f"chat-{chat_index}", filters)
+            latencies[name].append(time.perf_counter() - started_at)
+
+    return latencies
+
+
+async def run_layout(
+    name: str,
+    repository: MongoDBMessagesRepository | BucketedMongoDBMessagesRepository,
+    messages: list[Message],
+    arguments: argparse.Namespace,
+) -> None:
+    await repository.ensure_indexes()
+
+    writes_per_second = await measure_writes(
+        repository, messages, arguments.concurrency
+    )
+    latencies = await measure_reads(
+        repository, messages, arguments.chats, arguments.reads, arguments.page_size
+    )
+    stats = await repository.mongo_db_client[DATABASE].command(
+        "collStats", repository.mongo_db_collection_name
+    )
+
+    print(f"{name}")
+    print(f"  writes              {writes_per_second:12.0f} messages/s")
+    for read, values in latencies.items():
+        print(
+            f"  {read:<8} p50/p99    "
+            f"{percentile(values, 0.5) * 1000:8.2f} / "
+            f"{percentile(values, 0.99) * 1000:8.2f} ms"
+        )
+    print(f"  documents           {stats['count']:12d}")
+    print(
+        f"  size                "
+        f"{(stats['size'] + stats['totalIndexSize']) / 1024 / 1024:12.1f} MiB"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--uri",
+        default=os.environ.get("MONGO_DB_CONNECTION_URI", "mongodb://localhost:27017"),
+    )
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--bucket-size", type=int, default=200)
+    arguments = parser.parse_args()
+
+    client = AsyncIOMotorClient(arguments.uri)
+    messages = build_messages(arguments.chats, arguments.messages)
+    layouts = {
+        "document": MongoDBMessagesRepository(
+            mongo_db_client=client,
+            mongo_db_db_name=DATABASE,
+            mongo_db_collection_name="messages",
+        ),
+        "bucket": BucketedMongoDBMessagesRepository(
+            mongo_db_client=client,
+            mongo_db_db_name=DATABASE,
+            mongo_db_collection_name="message_buckets",
+            bucket_size=arguments.bucket_size,
+        ),
+    }
+
+    await client.drop_database(DATABASE)
+    try:
+        for name, repository in layouts.items():
+            await run_layout(name, repository, messages, arguments)
+    finally:
+        await client.drop_database(DATABASE)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,180 @@
+"""Compare producer throughput profiles against a local broker stand-in.
+
+The stand-in replaces ``AIOKafkaProducer``: records are accumulated into
+batches the way aiokafka does it (up to ``max_batch_size`` bytes, waiting up
+to ``linger_ms`` for a batch to fill), batches are compressed with the real
+codec and every produce request costs a round trip plus the time to push its
+bytes through the network. ``acks="all"`` adds a replication round trip.
+
+Run from the ``app`` directory: ``python -m benchmarks.producer``.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+import orjson
+from aiokafka.codec import (
+    gzip_encode,
+    lz4_encode,
+    snappy_encode,
+    zstd_encode,
+)
+
+from infra.message_brokers.kafka import KafkaMessageBroker
+from infra.message_brokers.profiles import (
+    KAFKA_PRODUCER_PROFILES,
+    KafkaProducerSettings,
+)
+
+
+MESSAGES = 50_000
+# A broker in another availability zone behind a 100 Mbit/s link.
+REQUEST_LATENCY = 0.005
+REPLICATION_LATENCY = 0.005
+BANDWIDTH = 100 * 1024 * 1024 / 8
+
+ENCODERS = {
+    None: lambda payload: payload,
+    "gzip": gzip_encode,
+    "lz4": lz4_encode,
+    "snappy": snappy_encode,
+    "zstd": zstd_encode,
+}
+WORDS = [
+    "hello",
+    "support",
+    "order",
+    "delivery",
+    "payment",
+    "thanks",
+    "please",
+    "chat",
+    "when",
+    "where",
+]
+
+
+@dataclass
+class StandInProducer:
+    settings: KafkaProducerSettings
+
+    sent_requests: int = 0
+    sent_bytes: int = 0
+    _batch: list[tuple[bytes, asyncio.Future]] = field(default_factory=list)
+    _batch_size: int = 0
+    _has_records: asyncio.Event = field(default_factory=asyncio.Event)
+    _is_full: asyncio.Event = field(default_factory=asyncio.Event)
+    _has_room: asyncio.Event = field(default_factory=asyncio.Event)
+    _sender: asyncio.Task | None = None
+
+    async def start(self):
+        self._has_room.set()
+        self._sender = asyncio.create_task(self._send_batches())
+
+    async def stop(self):
+        self._sender.cancel()
+
+    async def send(self, topic: str, key: bytes, value: bytes) -> asyncio.Future:
+        # Like aiokafka, wait while the batch being filled has no room left.
+        while self._batch_size >= self.settings.max_batch_size:
+            self._has_room.clear()
+            await self._has_room.wait()
+
+        delivery = asyncio.get_running_loop().create_future()
+        self._batch.append((key + value, delivery))
+        self._batch_size += len(key) + len(value)
+        self._has_records.set()
+
+        if self._batch_size >= self.settings.max_batch_size:
+            self._is_full.set()
+
+        return delivery
+
+    async def _send_batches(self):
+        encode = ENCODERS[self.settings.to_producer_kwargs()["compression_type"]]
+
+        while True:
+            await self._has_records.wait()
+
+            if self.settings.linger_ms:
+                try:
+                    await asyncio.wait_for(
+                        self._is_full.wait(), timeout=self.settings.linger_ms / 1000
+                    )
+                except TimeoutError:
+                    pass
+
+            batch, self._batch, self._batch_size = self._batch, [], 0
+            self._has_records.clear()
+            self._is_full.clear()
+            self._has_room.set()
+
+            payload = encode(b"".join(record for record, _ in batch))
+            latency = REQUEST_LATENCY + len(payload) / BANDWIDTH
+            if self.settings.acks == "all":
+                latency += REPLICATION_LATENCY
+
+            await asyncio.sleep(latency)
+
+            self.sent_requests += 1
+            self.sent_bytes += len(payload)
+            for _, delivery in batch:
+                delivery.set_result(None)
+
+
+def generate_records(count: int) -> list[tuple[bytes, bytes]]:
+    rnd = random.Random(0)
+    chat_oids = [f"{rnd.getrandbits(128):032x}" for _ in range(100)]
+
+    return [
+        (
+            chat_oid.encode(),
+            orjson.dumps(
+                {
+                    "message_text": " ".join(rnd.choices(WORDS, k=rnd.randint(3, 20))),
+                    "message_oid": f"{rnd.getrandbits(128):032x}",
+                    "chat_oid": chat_oid,
+                    "event_id": f"{rnd.getrandbits(128):032x}",
+                }
+            ),
+        )
+        for chat_oid in rnd.choices(chat_oids, k=count)
+    ]
+
+
+async def measure(name: str, settings: KafkaProducerSettings, records) -> None:
+    producer = StandInProducer(settings=settings)
+    broker = KafkaMessageBroker(producer=producer, consumer=None)
+    await producer.start()
+
+    started_at = time.perf_counter()
+    deliveries = [
+        await broker.send_message_nowait(key=key, topic="new-messages", value=value)
+        for key, value in records
+    ]
+    await asyncio.gather(*deliveries)
+    elapsed = time.perf_counter() - started_at
+
+    await producer.stop()
+
+    print(
+        f"{name:<11} {len(records) / elapsed:12,.0f} msg/s "
+        f"{producer.sent_requests:7} requests "
+        f"{producer.sent_bytes / 1024 / 1024:8.2f} MiB on the wire"
+    )
+
+
+async def main():
+    records = generate_records(MESSAGES)
+
+    for profile, settings in KAFKA_PRODUCER_PROFILES.items():
+        await measure(profile.value, settings, records)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
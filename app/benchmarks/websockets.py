@@ -0,0 +1,292 @@
+"""Load and fan-out benchmark for ConnectionManager.
+
+Sockets are spread over chats of ``--chat-size`` members and broadcasts are
+sent round-robin over the chats at ``--rate`` messages per second. A share of
+the sockets (``--slow-percent``) is slow: it takes ``--slow-delay`` seconds to
+write a frame. Two transports are available:
+
+fake      in-memory sockets, to measure the manager itself with 10k-100k sockets
+loopback  every socket writes length-prefixed frames to a local socket pair and
+          a reader task on the other end receives them
+
+Reported: p50/p99 broadcast latency (from send_all until a healthy client got
+the frame), memory per connection, p99 event loop lag, the median time
+disconnect_all takes for one chat and the time it takes for a chat in which
+the slow share of clients never takes the deletion notice, which is bounded by
+``--disconnect-timeout``. ``--record`` stores the results as the
+baseline of the scenario, later runs are compared against it and exit with 1
+on a regression.
+
+Run from the ``app`` directory: ``python -m benchmarks.websockets``.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import struct
+import sys
+import time
+import tracemalloc
+from dataclasses import (
+    asdict,
+    dataclass,
+    field,
+)
+from pathlib import Path
+
+from infra.websockets.managers import ConnectionManager
+
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "websockets.json"
+# Results may grow by this share, and at least by the absolute slack (ms or
+# bytes), before a run counts as a regression.
+TOLERANCE = 0.5
+SLACK = 5.0
+DISCONNECTED_CHATS = 5
+FRAME_BODY = b"x" * 200
+TIMESTAMP = struct.Struct("!d")
+LENGTH = struct.Struct("!I")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    transport: str = "fake"
+    connections: int = 10_000
+    chat_size: int = 1_000
+    messages: int = 200
+    rate: float = 1_000.0
+    slow_percent: float = 5.0
+    slow_delay: float = 0.05
+    send_queue_size: int = 256
+    disconnect_timeout: float = 0.25
+
+
+@dataclass
+class Results:
+    broadcast_p50_ms: float
+    broadcast_p99_ms: float
+    memory_per_connection_bytes: float
+    loop_lag_p99_ms: float
+    disconnect_chat_ms: float
+    disconnect_stalled_chat_ms: float
+
+
+@dataclass
+class Recorder:
+    latencies: list[float] = field(default_factory=list)
+
+    def record(self, frame: bytes) -> None:
+        (sent_at,) = TIMESTAMP.unpack_from(frame)
+        self.latencies.append(time.perf_counter() - sent_at)
+
+
+@dataclass(eq=False)
+class FakeWebSocket:
+    recorder: Recorder | None
+    delay: float = 0.0
+
+    async def accept(self, subprotocol: str | None = None): ...
+
+    async def send_bytes(self, data: bytes):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        if self.recorder is not None:
+            self.recorder.record(data)
+
+    async def send_json(self, data: dict):
+        # Slow clients are just as slow to take the deletion notice.
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+    async def close(self, code: int = 1000): ...
+
+
+@dataclass(eq=False)
+class LoopbackWebSocket:
+    recorder: Recorder | None
+    delay: float = 0.0
+
+    _streams: tuple | None = field(default=None, repr=False)
+    _writer: asyncio.StreamWriter | None = field(default=None, repr=False)
+    _reader_task: asyncio.Task | None = field(default=None, repr=False)
+
+    async def accept(self, subprotocol: str | None = None):
+        server_socket, client_socket = socket.socketpair()
+        # Both stream pairs are kept, a collected reader closes its transport.
+        server_streams = await asyncio.open_connection(sock=server_socket)
+        client_streams = await asyncio.open_connection(sock=client_socket)
+        self._streams = (server_streams, client_streams)
+        self._writer = server_streams[1]
+        reader = client_streams[0]
+        self._reader_task = asyncio.create_task(self._read_frames(reader))
+
+    async def send_bytes(self, data: bytes):
+        self._writer.write(LENGTH.pack(len(data)) + data)
+        await self._writer.drain()
+
+    async def send_json(self, data: dict):
+        await self.send_bytes(TIMESTAMP.pack(time.perf_counter()))
+
+    async def close(self, code: int = 1000):
+        self._writer.close()
+        self._reader_task.cancel()
+
+    async def _read_frames(self, reader: asyncio.StreamReader):
+        while True:
+            (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            frame = await reader.readexactly(length)
+
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+            if self.recorder is not None:
+                self.recorder.record(frame)
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def monitor_loop_lag(lags: list[float], interval: float = 0.005):
+    while True:
+        started_at = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started_at - interval)
+
+
+async def run(scenario: Scenario) -> Results:
+    websocket_class = {"fake": FakeWebSocket, "loopback": LoopbackWebSocket}[
+        scenario.transport
+    ]
+    manager = ConnectionManager(
+        send_queue_size=scenario.send_queue_size,
+        disconnect_timeout=scenario.disconnect_timeout,
+    )
+    recorder = Recorder()
+    slow_every = int(100 / scenario.slow_percent) if scenario.slow_percent else 0
+
+    websockets = [
+        websocket_class(recorder=None, delay=scenario.slow_delay)
+        if slow_every and index % slow_every == 0
+        else websocket_class(recorder=recorder)
+        for index in range(scenario.connections)
+    ]
+    chats = [
+        f"chat-{index}"
+        for index in range(max(1, scenario.connections // scenario.chat_size))
+    ]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for index, websocket in enumerate(websockets):
+        await manager.accept_connection(
+            websocket=websocket, key=chats[index % len(chats)]
+        )
+    memory_per_connection = (
+        tracemalloc.get_traced_memory()[0] - before
+    ) / scenario.connections
+    tracemalloc.stop()
+
+    lags: list[float] = []
+    lag_monitor = asyncio.create_task(monitor_loop_lag(lags))
+
+    for index in range(scenario.messages):
+        frame = TIMESTAMP.pack(time.perf_counter()) + FRAME_BODY
+        await manager.send_all(chats[index % len(chats)], frame)
+        await asyncio.sleep(1 / scenario.rate)
+
+    # Let the healthy clients drain their queues.
+    await asyncio.sleep(0.5)
+
+    # A single disconnect is too short to be measured reliably.
+    disconnect_times = []
+    for chat in chats[:DISCONNECTED_CHATS]:
+        started_at = time.perf_counter()
+        await manager.disconnect_all(chat)
+        disconnect_times.append(time.perf_counter() - started_at)
+
+    lag_monitor.cancel()
+
+    for index in range(scenario.chat_size):
+        is_stalled = slow_every and index % slow_every == 0
+        await manager.accept_connection(
+            websocket=websocket_class(recorder=None, delay=3600.0 if is_stalled else 0),
+            key="chat-stalled",
+        )
+    started_at = time.perf_counter()
+    await manager.disconnect_all("chat-stalled")
+    disconnect_stalled_chat = time.perf_counter() - started_at
+
+    for chat in chats[DISCONNECTED_CHATS:]:
+        for websocket in list(manager.connections_map.get(chat, ())):
+            await manager.remove_connection(websocket=websocket, key=chat)
+            await websocket.close()
+
+    return Results(
+        broadcast_p50_ms=percentile(recorder.latencies, 0.5) * 1000,
+        broadcast_p99_ms=percentile(recorder.latencies, 0.99) * 1000,
+        memory_per_connection_bytes=memory_per_connection,
+        loop_lag_p99_ms=percentile(lags, 0.99) * 1000,
+        disconnect_chat_ms=percentile(disconnect_times, 0.5) * 1000,
+        disconnect_stalled_chat_ms=disconnect_stalled_chat * 1000,
+    )
+
+
+def find_regressions(results: Results, baseline: dict) -> list[str]:
+    return [
+        f"{name}: {value:.2f} > baseline {baseline[name]:.2f}"
+        for name, value in asdict(results).items()
+        if value > max(baseline[name] * (1 + TOLERANCE), baseline[name] + SLACK)
+    ]
+
+
+def parse_scenario() -> tuple[Scenario, bool]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name, default in asdict(Scenario()).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(default), default=default
+        )
+    parser.add_argument("--record", action="store_true", help="store as baseline")
+
+    arguments = vars(parser.parse_args())
+    record = arguments.pop("record")
+
+    return Scenario(**arguments), record
+
+
+async def main() -> int:
+    scenario, record = parse_scenario()
+    results = await run(scenario)
+
+    for name, value in asdict(results).items():
+        print(f"{name:<28} {value:12.2f}")
+
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    key = json.dumps(asdict(scenario), sort_keys=True)
+
+    if record:
+        baselines[key] = asdict(results)
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"baseline recorded in {BASELINE_PATH}")
+        return 0
+
+    if key not in baselines:
+        print("no baseline recorded for this scenario")
+        return 0
+
+    regressions = find_regressions(results, baselines[key])
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
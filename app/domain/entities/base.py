@@ -1,5 +1,4 @@
 from abc import ABC
-from copy import copy
 from dataclasses import dataclass, field
 from datetime import datetime
 from uuid import uuid4
@@ -7,22 +6,26 @@ from uuid import uuid4
 from domain.events.base import BaseEvent
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class BaseEntity(ABC):
     oid: str = field(
         default_factory=lambda: str(uuid4()),
         kw_only=True,
     )
     created_at: datetime = field(default_factory=datetime.now, kw_only=True)
-    _events: list[BaseEvent] = field(default_factory=list, kw_only=True)
+    # Allocated by the first registered event, most entities never get one.
+    _events: list[BaseEvent] | None = field(default=None, kw_only=True)
 
     def pull_events(self) -> list[BaseEvent]:
-        registered_events = copy(self._events)
-        self._events.clear()
+        registered_events = self._events or []
+        self._events = None
 
         return registered_events
 
     def register_event(self, event: BaseEvent):
+        if self._events is None:
+            self._events = []
+
         self._events.append(event)
 
     def __hash__(self) -> int:
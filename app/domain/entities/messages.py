@@ -15,30 +15,40 @@ from domain.exceptions.messages import (
 from domain.values.messages import Text, Title
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Message(BaseEntity):
     chat_oid: str
     text: Text
+    # Position of the message in its chat, allocated when it is stored.
+    sequence: int | None = field(default=None, kw_only=True)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class ChatListener(BaseEntity): ...
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Chat(BaseEntity):
     title: Title
-    messages: set[Message] = field(default_factory=set, kw_only=True)
+    # Only filled while a command adds messages, so loaded chats share one
+    # empty frozenset until then.
+    messages: set[Message] | frozenset[Message] = field(
+        default=frozenset(), kw_only=True
+    )
     listeners: set[ChatListener] = field(default_factory=set, kw_only=True)
     is_deleted: bool = field(default=False, kw_only=True)
 
     def add_message(self, message: Message):
+        if not isinstance(self.messages, set):
+            self.messages = set(self.messages)
+
         self.messages.add(message)
         self.register_event(
             NewMessageReceivedEvent(
                 message_text=message.text.as_generic_type(),
                 chat_oid=self.oid,
                 message_oid=message.oid,
+                sequence=message.sequence,
             )
         )
 
@@ -60,10 +70,14 @@ class Chat(BaseEntity):
         if listener in self.listeners:
             raise ListenerAlreadyExistsException(listener.oid)
         self.listeners.add(listener)
-        self.register_event(ListenerAddedEvent(listener_oid=listener.oid))
+        self.register_event(
+            ListenerAddedEvent(listener_oid=listener.oid, chat_oid=self.oid)
+        )
 
     def delete_listener(self, listener: ChatListener):
         if listener not in self.listeners:
             raise ListenerAlreadyDeletedException(listener_id=listener.oid)
         self.listeners.remove(listener)
-        self.register_event(ListenerDeletedEvent(listener_oid=listener.oid))
+        self.register_event(
+            ListenerDeletedEvent(listener_oid=listener.oid, chat_oid=self.oid)
+        )
@@ -11,6 +11,7 @@ class NewMessageReceivedEvent(BaseEvent):
     message_text: str
     message_oid: str
     chat_oid: str
+    sequence: int | None = None
 
 
 @dataclass
@@ -18,12 +19,14 @@ class ListenerAddedEvent(BaseEvent):
     event_title: ClassVar[str] = "New Listener Added To Chat"
 
     listener_oid: str
+    chat_oid: str
 
 
 @dataclass
 class ListenerDeletedEvent(BaseEvent):
     event_title: ClassVar[str] = "The listener has been removed from the chat."
     listener_oid: str
+    chat_oid: str
 
 
 @dataclass
@@ -1,18 +1,26 @@
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
-from typing import Any, Generic, TypeVar
+from typing import Any, Generic, Self, TypeVar
 
 
 VT = TypeVar("VT", bound=Any)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BaseValueObject(ABC, Generic[VT]):
     value: VT
 
     def __post_init__(self):
         self.validate()
 
+    @classmethod
+    def trusted(cls, value: VT) -> Self:
+        """Build from a value validated before, such as one read from storage."""
+        value_object = object.__new__(cls)
+        object.__setattr__(value_object, "value", value)
+
+        return value_object
+
     @abstractmethod
     def validate(self): ...
 
@@ -4,7 +4,7 @@ from domain.values.base import BaseValueObject
 from domain.exceptions.messages import TitleTooLongException, EmptyTextException
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Text(BaseValueObject[str]):
     value: str
 
@@ -16,7 +16,7 @@ class Text(BaseValueObject[str]):
         return str(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Title(BaseValueObject[str]):
     value: str
 
@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+from domain.exceptions.base import ApplicationException
+
+
+@dataclass(eq=False)
+class InfraException(ApplicationException):
+    @property
+    def message(self):
+        return "there was an error storing the data"
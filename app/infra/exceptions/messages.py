@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+
+from infra.exceptions.base import InfraException
+
+
+@dataclass(eq=False)
+class MessagesWriteException(InfraException):
+    # The reason of every message that was not written, by its batch index.
+    errors: dict[int, str]
+
+    @property
+    def message(self):
+        return f"{len(self.errors)} messages could not be written"
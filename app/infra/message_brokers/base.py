@@ -3,6 +3,21 @@ from abc import (
     abstractmethod,
 )
 from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+)
+
+from infra.message_brokers.dots import (
+    BrokerMessage,
+    ConsumedMessage,
+)
+
+
+# Gets the topic and the raw key of a record, records it rejects are skipped
+# without being decoded.
+RecordFilter = Callable[[str, bytes | None], bool]
 
 
 @dataclass
@@ -17,7 +32,26 @@ class BaseMessageBroker(ABC):
     async def send_message(self, key: str, topic: str, value: bytes): ...
 
     @abstractmethod
-    async def start_consuming(self, topic: str): ...
+    async def send_messages(self, messages: Iterable[BrokerMessage]): ...
+
+    @abstractmethod
+    async def start_consuming(
+        self, topics: Iterable[str]
+    ) -> AsyncIterator[ConsumedMessage]: ...
+
+    @abstractmethod
+    async def start_consuming_batches(
+        self,
+        topics: Iterable[str],
+        max_records: int,
+        timeout_ms: int,
+        record_filter: RecordFilter | None = None,
+        partitions: dict[str, Iterable[int]] | None = None,
+    ) -> AsyncIterator[list[ConsumedMessage]]: ...
 
     @abstractmethod
     async def stop_consuming(self, topic: str): ...
+
+    @abstractmethod
+    async def get_partitions_count(self, topic: str) -> int | None:
+        """Returns None for a topic that does not exist."""
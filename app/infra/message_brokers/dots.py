@@ -0,0 +1,26 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import datetime
+from uuid import uuid4
+
+
+@dataclass(frozen=True)
+class BrokerMessage:
+    topic: str
+    key: bytes
+    value: bytes
+
+
+@dataclass(frozen=True)
+class ConsumedMessage:
+    topic: str
+    key: bytes | None
+    value: dict
+
+
+@dataclass(frozen=True)
+class OutboxMessage(BrokerMessage):
+    oid: str = field(default_factory=lambda: str(uuid4()), kw_only=True)
+    created_at: datetime = field(default_factory=datetime.now, kw_only=True)
@@ -1,30 +1,179 @@
-from dataclasses import dataclass
-from typing import AsyncIterator
+import asyncio
+import logging
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    AsyncIterator,
+    Iterable,
+)
 
 import orjson
-from aiokafka import AIOKafkaConsumer
+from aiokafka import (
+    AIOKafkaConsumer,
+    TopicPartition,
+)
 from aiokafka.producer import AIOKafkaProducer
 
-from infra.message_brokers.base import BaseMessageBroker
+from infra.message_brokers.base import (
+    BaseMessageBroker,
+    RecordFilter,
+)
+from infra.message_brokers.dots import (
+    BrokerMessage,
+    ConsumedMessage,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConsumerStats:
+    processed_records: int = 0
+    skipped_records: int = 0
 
 
 @dataclass
 class KafkaMessageBroker(BaseMessageBroker):
     producer: AIOKafkaProducer
     consumer: AIOKafkaConsumer
+    max_in_flight_messages: int = 10_000
+
+    consumer_stats: ConsumerStats = field(default_factory=ConsumerStats, init=False)
+
+    _in_flight: asyncio.Semaphore = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._in_flight = asyncio.Semaphore(self.max_in_flight_messages)
 
     async def send_message(self, key: bytes, topic: str, value: bytes):
-        await self.producer.send(topic=topic, key=key, value=value)
+        await self.send_message_nowait(key=key, topic=topic, value=value)
+
+    async def send_message_nowait(
+        self, key: bytes, topic: str, value: bytes
+    ) -> asyncio.Future:
+        # Returns as soon as the producer has buffered the record, the future
+        # resolves once it is acked. When max_in_flight_messages records are
+        # still waiting for their ack, callers wait here until one completes.
+        await self._in_flight.acquire()
+
+        try:
+            delivery = await self.producer.send(topic=topic, key=key, value=value)
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+        delivery.add_done_callback(self._on_delivery)
+
+        return delivery
+
+    async def send_messages(self, messages: Iterable[BrokerMessage]):
+        # Enqueue everything first so the producer can pack the records into
+        # as few requests as possible, then wait until all of them are acked.
+        deliveries = [
+            await self.send_message_nowait(
+                key=message.key, topic=message.topic, value=message.value
+            )
+            for message in messages
+        ]
+        await asyncio.gather(*deliveries)
+
+    def _on_delivery(self, delivery: asyncio.Future) -> None:
+        self._in_flight.release()
 
-    async def start_consuming(self, topic: str) -> AsyncIterator[dict]:
-        self.consumer.subscribe(topics=[topic])
+        if not delivery.cancelled() and delivery.exception() is not None:
+            logger.error("Kafka delivery failed", exc_info=delivery.exception())
+
+    async def start_consuming(
+        self, topics: Iterable[str]
+    ) -> AsyncIterator[ConsumedMessage]:
+        self.consumer.subscribe(topics=list(topics))
 
         async for message in self.consumer:
-            yield orjson.loads(message.value)
+            yield ConsumedMessage(
+                topic=message.topic,
+                key=message.key,
+                value=orjson.loads(message.value),
+            )
+
+    async def start_consuming_batches(
+        self,
+        topics: Iterable[str],
+        max_records: int,
+        timeout_ms: int,
+        record_filter: RecordFilter | None = None,
+        partitions: dict[str, Iterable[int]] | None = None,
+    ) -> AsyncIterator[list[ConsumedMessage]]:
+        if partitions is None:
+            self.consumer.subscribe(topics=list(topics))
+        else:
+            await self._assign_partitions(topics, partitions)
+
+        while True:
+            records = await self.consumer.getmany(
+                timeout_ms=timeout_ms, max_records=max_records
+            )
+
+            if not records:
+                continue
+
+            messages = []
+            for partition_records in records.values():
+                for record in partition_records:
+                    if record_filter is not None and not record_filter(
+                        record.topic, record.key
+                    ):
+                        self.consumer_stats.skipped_records += 1
+                        continue
+
+                    self.consumer_stats.processed_records += 1
+
+                    try:
+                        value = orjson.loads(record.value)
+                    except orjson.JSONDecodeError:
+                        logger.warning(
+                            "Skipping undecodable message from topic %s", record.topic
+                        )
+                        continue
+
+                    messages.append(
+                        ConsumedMessage(topic=record.topic, key=record.key, value=value)
+                    )
+
+            yield messages
+
+            # The caller asks for the next batch only once this one has been
+            # dispatched, so offsets are never committed for unhandled records.
+            await self.consumer.commit()
+
+    async def _assign_partitions(
+        self, topics: Iterable[str], partitions: dict[str, Iterable[int]]
+    ) -> None:
+        # Only the given partitions are read from the topics in the mapping,
+        # every partition is read from the other ones.
+        await self.consumer.topics()
+
+        self.consumer.assign(
+            [
+                TopicPartition(topic=topic, partition=partition)
+                for topic in topics
+                for partition in partitions.get(
+                    topic, self.consumer.partitions_for_topic(topic) or ()
+                )
+            ]
+        )
 
     async def stop_consuming(self):
         self.consumer.unsubscribe()
 
+    async def get_partitions_count(self, topic: str) -> int | None:
+        await self.consumer.topics()
+        partitions = self.consumer.partitions_for_topic(topic)
+
+        return len(partitions) if partitions else None
+
     async def close(self):
         await self.consumer.stop()
         await self.producer.stop()
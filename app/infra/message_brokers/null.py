@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Iterable,
+)
+
+from infra.message_brokers.base import (
+    BaseMessageBroker,
+    RecordFilter,
+)
+from infra.message_brokers.dots import (
+    BrokerMessage,
+    ConsumedMessage,
+)
+
+
+@dataclass
+class NullMessageBroker(BaseMessageBroker):
+    """Drops everything that is sent and never consumes anything, for running
+    without Kafka in tests and benchmarks."""
+
+    async def start(self): ...
+
+    async def close(self): ...
+
+    async def send_message(self, key: str, topic: str, value: bytes): ...
+
+    async def send_messages(self, messages: Iterable[BrokerMessage]): ...
+
+    async def start_consuming(
+        self, topics: Iterable[str]
+    ) -> AsyncIterator[ConsumedMessage]:
+        return
+        yield
+
+    async def start_consuming_batches(
+        self,
+        topics: Iterable[str],
+        max_records: int,
+        timeout_ms: int,
+        record_filter: RecordFilter | None = None,
+        partitions: dict[str, Iterable[int]] | None = None,
+    ) -> AsyncIterator[list[ConsumedMessage]]:
+        return
+        yield
+
+    async def stop_consuming(self, topic: str): ...
+
+    async def get_partitions_count(self, topic: str) -> int | None:
+        return None
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    AsyncIterator,
+    Iterable,
+)
+from uuid import uuid4
+
+from infra.message_brokers.base import (
+    BaseMessageBroker,
+    RecordFilter,
+)
+from infra.message_brokers.dots import (
+    BrokerMessage,
+    ConsumedMessage,
+    OutboxMessage,
+)
+from infra.repositories.outbox.base import BaseOutboxRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboxMessageBroker(BaseMessageBroker):
+    message_broker: BaseMessageBroker
+    outbox_repository: BaseOutboxRepository
+
+    async def send_message(self, key: bytes, topic: str, value: bytes):
+        await self.outbox_repository.add_messages(
+            [OutboxMessage(topic=topic, key=key, value=value)]
+        )
+
+    async def send_messages(self, messages: Iterable[BrokerMessage]):
+        await self.outbox_repository.add_messages(
+            [
+                OutboxMessage(topic=message.topic, key=message.key, value=message.value)
+                for message in messages
+            ]
+        )
+
+    async def start_consuming(
+        self, topics: Iterable[str]
+    ) -> AsyncIterator[ConsumedMessage]:
+        async for message in self.message_broker.start_consuming(topics):
+            yield message
+
+    async def start_consuming_batches(
+        self,
+        topics: Iterable[str],
+        max_records: int,
+        timeout_ms: int,
+        record_filter: RecordFilter | None = None,
+        partitions: dict[str, Iterable[int]] | None = None,
+    ) -> AsyncIterator[list[ConsumedMessage]]:
+        async for messages in self.message_broker.start_consuming_batches(
+            topics,
+            max_records=max_records,
+            timeout_ms=timeout_ms,
+            record_filter=record_filter,
+            partitions=partitions,
+        ):
+            yield messages
+
+    async def stop_consuming(self):
+        await self.message_broker.stop_consuming()
+
+    async def get_partitions_count(self, topic: str) -> int | None:
+        return await self.message_broker.get_partitions_count(topic)
+
+    async def close(self):
+        await self.message_broker.close()
+
+    async def start(self):
+        await self.message_broker.start()
+
+
+@dataclass
+class OutboxRelay:
+    outbox_repository: BaseOutboxRepository
+    message_broker: BaseMessageBroker
+    batch_size: int = 100
+    poll_interval: float = 0.5
+    lease_seconds: float = 30.0
+    relay_id: str = field(default_factory=lambda: f"relay-{uuid4()}")
+
+    async def relay_batch(self) -> int:
+        messages = await self.outbox_repository.claim_pending_messages(
+            owner=self.relay_id,
+            limit=self.batch_size,
+            lease_seconds=self.lease_seconds,
+        )
+
+        if not messages:
+            return 0
+
+        oids = [message.oid for message in messages]
+        # Another relay would send the batch again if the lease ran out while
+        # the broker is still sending it.
+        lease_renewal = asyncio.create_task(self._renew_lease(oids))
+
+        try:
+            await self.message_broker.send_messages(messages)
+        finally:
+            lease_renewal.cancel()
+            (renewal_error,) = await asyncio.gather(
+                lease_renewal, return_exceptions=True
+            )
+
+            if isinstance(renewal_error, Exception):
+                logger.warning(
+                    "Outbox relay failed to renew its lease", exc_info=renewal_error
+                )
+
+        await self.outbox_repository.mark_dispatched(oids)
+
+        return len(messages)
+
+    async def _renew_lease(self, oids: list[str]) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.outbox_repository.extend_lease(
+                owner=self.relay_id, oids=oids, lease_seconds=self.lease_seconds
+            )
+
+    async def run(self):
+        while True:
+            try:
+                relayed = await self.relay_batch()
+            except Exception:
+                # Claimed messages are picked up again once their lease expires.
+                logger.exception("Outbox relay failed to dispatch a batch")
+                relayed = 0
+
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
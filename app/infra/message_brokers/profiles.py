@@ -0,0 +1,116 @@
+import logging
+from dataclasses import (
+    asdict,
+    dataclass,
+)
+from enum import Enum
+from typing import Any
+
+from aiokafka.codec import (
+    has_gzip,
+    has_lz4,
+    has_snappy,
+    has_zstd,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class KafkaCompressionType(str, Enum):
+    GZIP = "gzip"
+    LZ4 = "lz4"
+    SNAPPY = "snappy"
+    ZSTD = "zstd"
+
+
+CODEC_CHECKS = {
+    KafkaCompressionType.GZIP: has_gzip,
+    KafkaCompressionType.LZ4: has_lz4,
+    KafkaCompressionType.SNAPPY: has_snappy,
+    KafkaCompressionType.ZSTD: has_zstd,
+}
+
+
+class KafkaProducerProfile(str, Enum):
+    DEFAULT = "default"
+    THROUGHPUT = "throughput"
+    DURABLE = "durable"
+
+
+@dataclass(frozen=True)
+class KafkaProducerSettings:
+    linger_ms: int = 0
+    max_batch_size: int = 16384
+    compression_type: str | None = None
+    acks: int | str = 1
+    enable_idempotence: bool = False
+
+    def to_producer_kwargs(self) -> dict[str, Any]:
+        kwargs = asdict(self)
+        kwargs["compression_type"] = get_available_compression_type(
+            self.compression_type
+        )
+
+        return kwargs
+
+
+KAFKA_PRODUCER_PROFILES: dict[KafkaProducerProfile, KafkaProducerSettings] = {
+    # aiokafka defaults: every record is sent as soon as possible, uncompressed.
+    KafkaProducerProfile.DEFAULT: KafkaProducerSettings(),
+    # Wait a little to fill large batches and compress them with a fast codec.
+    KafkaProducerProfile.THROUGHPUT: KafkaProducerSettings(
+        linger_ms=20,
+        max_batch_size=256 * 1024,
+        compression_type="lz4",
+        acks=1,
+    ),
+    # Batched as well, but every record is acked by all in-sync replicas and
+    # retries can not produce duplicates.
+    KafkaProducerProfile.DURABLE: KafkaProducerSettings(
+        linger_ms=5,
+        max_batch_size=64 * 1024,
+        compression_type="zstd",
+        acks="all",
+        enable_idempotence=True,
+    ),
+}
+
+
+def get_available_compression_type(compression_type: str | None) -> str | None:
+    # lz4 and zstd come with the aiokafka extras of the project, gzip is always
+    # available. Installs without them still produce, with a warning.
+    if compression_type is None:
+        return None
+
+    # Plain strings for aiokafka, it looks codecs up by their name.
+    compression_type = KafkaCompressionType(compression_type)
+    if CODEC_CHECKS[compression_type]():
+        return compression_type.value
+
+    logger.warning(
+        "Kafka compression codec %s is not installed, gzip is used instead",
+        compression_type.value,
+    )
+    return KafkaCompressionType.GZIP.value
+
+
+def get_producer_settings(
+    profile: KafkaProducerProfile,
+    linger_ms: int | None = None,
+    max_batch_size: int | None = None,
+    compression_type: str | None = None,
+) -> KafkaProducerSettings:
+    settings = KAFKA_PRODUCER_PROFILES[profile]
+    overrides = {
+        "linger_ms": linger_ms,
+        "max_batch_size": max_batch_size,
+        "compression_type": compression_type,
+    }
+
+    return KafkaProducerSettings(
+        **{
+            **asdict(settings),
+            **{name: value for name, value in overrides.items() if value is not None},
+        }
+    )
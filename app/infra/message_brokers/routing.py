@@ -0,0 +1,85 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from aiokafka.partitioner import murmur2
+
+
+@dataclass(frozen=True)
+class ChatNode:
+    node_id: str
+    url: str
+
+
+@dataclass(frozen=True)
+class ChatRoute:
+    chat_oid: str
+    partition: int
+    node: ChatNode
+    is_local: bool
+
+
+@dataclass
+class PartitionOwnershipMap:
+    """Maps chats to topic partitions and partitions to the nodes owning them.
+
+    Chats are hashed the way the default Kafka partitioner hashes message keys,
+    so a chat lands in the partition its messages are produced to.
+    """
+
+    partitions_count: int
+    nodes: tuple[ChatNode, ...]
+    local_node_id: str
+
+    _owners: dict[int, ChatNode] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # A node missing from the list would own nothing and redirect every
+        # client away.
+        if self.local_node_id not in {node.node_id for node in self.nodes}:
+            raise ValueError(
+                f"Node {self.local_node_id!r} is not one of the routing nodes"
+            )
+
+        nodes = sorted(self.nodes, key=lambda node: node.node_id)
+        self._owners = {
+            partition: nodes[partition % len(nodes)]
+            for partition in range(self.partitions_count)
+        }
+
+    @classmethod
+    def from_string(
+        cls, nodes: str, partitions_count: int, local_node_id: str
+    ) -> "PartitionOwnershipMap":
+        # "node-0=ws://10.0.0.1:8000,node-1=ws://10.0.0.2:8000"
+        return cls(
+            partitions_count=partitions_count,
+            nodes=tuple(
+                ChatNode(*(part.strip() for part in item.split("=", 1)))
+                for item in nodes.split(",")
+                if item.strip()
+            ),
+            local_node_id=local_node_id,
+        )
+
+    def get_partition(self, chat_oid: str) -> int:
+        return (murmur2(chat_oid.encode()) & 0x7FFFFFFF) % self.partitions_count
+
+    def get_route(self, chat_oid: str) -> ChatRoute:
+        partition = self.get_partition(chat_oid)
+        node = self._owners[partition]
+
+        return ChatRoute(
+            chat_oid=chat_oid,
+            partition=partition,
+            node=node,
+            is_local=node.node_id == self.local_node_id,
+        )
+
+    def get_local_partitions(self) -> list[int]:
+        return [
+            partition
+            for partition, node in self._owners.items()
+            if node.node_id == self.local_node_id
+        ]
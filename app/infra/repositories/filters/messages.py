@@ -1,13 +1,42 @@
 from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+
+
+class CursorDirection(str, Enum):
+    FORWARD = "forward"
+    BACKWARD = "backward"
+
+
+class CountMode(str, Enum):
+    # Counted from the collection on every request.
+    EXACT = "exact"
+    # Read from counters kept up to date on writes.
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
+@dataclass(frozen=True)
+class MessagesCursor:
+    created_at: datetime
+    oid: str
 
 
 @dataclass
 class GetMessagesFilters:
     limit: int = 10
     offset: int = 0
+    cursor: MessagesCursor | None = None
+    direction: CursorDirection | None = None
+    count: CountMode = CountMode.ESTIMATED
+
+    @property
+    def is_cursor_mode(self) -> bool:
+        return self.direction is not None
 
 
 @dataclass
 class GetChatsFilters:
     limit: int = 10
     offset: int = 0
+    count: CountMode = CountMode.ESTIMATED
@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import (
+    Any,
+    Iterable,
+    Mapping,
+)
+
+from pymongo import IndexModel
+
+
+class IndexIssueReason(str, Enum):
+    MISSING = "missing"
+    DIVERGENT = "divergent"
+    # The build was rejected, e.g. a unique index over duplicate values.
+    FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class IndexIssue:
+    collection_name: str
+    index_name: str
+    reason: IndexIssueReason
+    detail: str = ""
+
+    def __str__(self) -> str:
+        issue = f"{self.collection_name}.{self.index_name}: {self.reason.value}"
+
+        return f"{issue} ({self.detail})" if self.detail else issue
+
+
+def find_index_issues(
+    collection_name: str,
+    declared_indexes: Iterable[IndexModel],
+    index_information: Mapping[str, Mapping[str, Any]],
+) -> list[IndexIssue]:
+    issues = []
+
+    for index in declared_indexes:
+        declared = index.document
+        existing = index_information.get(declared["name"])
+        detail = ""
+
+        if existing is None:
+            # The same keys may already be indexed under another name, e.g. the
+            # default "oid_1", creating it again would conflict with that one.
+            existing_name, existing = _find_index_by_keys(declared, index_information)
+            detail = f"indexed as {existing_name}" if existing is not None else ""
+
+        if existing is None:
+            reason = IndexIssueReason.MISSING
+        elif not _is_same_index(declared, existing):
+            reason = IndexIssueReason.DIVERGENT
+        else:
+            continue
+
+        issues.append(
+            IndexIssue(
+                collection_name=collection_name,
+                index_name=declared["name"],
+                reason=reason,
+                detail=detail,
+            )
+        )
+
+    return issues
+
+
+def _find_index_by_keys(
+    declared: Mapping[str, Any], index_information: Mapping[str, Mapping[str, Any]]
+) -> tuple[str | None, Mapping[str, Any] | None]:
+    for name, existing in index_information.items():
+        if _has_same_keys(declared, existing):
+            return name, existing
+
+    return None, None
+
+
+def _has_same_keys(declared: Mapping[str, Any], existing: Mapping[str, Any]) -> bool:
+    return list(declared["key"].items()) == [tuple(key) for key in existing["key"]]
+
+
+def _is_same_index(declared: Mapping[str, Any], existing: Mapping[str, Any]) -> bool:
+    return (
+        _has_same_keys(declared, existing)
+        and bool(declared.get("unique")) == bool(existing.get("unique"))
+        and bool(declared.get("sparse")) == bool(existing.get("sparse"))
+        and declared.get("expireAfterSeconds") == existing.get("expireAfterSeconds")
+    )
@@ -0,0 +1,62 @@
+"""Set the message counter of chats created before it was kept.
+
+Chats without a counter are counted exactly on every listing until this has
+run. Messages of the configured storage layout are counted chat by chat, and
+only chats that still have no counter are updated, so the backfill can be
+started again at any time. A message written while its chat is being counted
+may be left out of the counter.
+
+Run from the ``app`` directory:
+``python -m infra.repositories.messages.backfill_message_counts``.
+"""
+
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from infra.repositories.filters.messages import (
+    CountMode,
+    GetMessagesFilters,
+)
+from infra.repositories.messages.base import BaseMessagesRepository
+from logic.init import init_container
+from settings.config import Config
+
+
+async def backfill_message_counts(
+    chats_collection,
+    messages_repository: BaseMessagesRepository,
+) -> int:
+    backfilled = 0
+    cursor = chats_collection.find(
+        {"message_count": {"$exists": False}}, projection={"oid": True}
+    )
+
+    async for chat_document in cursor:
+        _, count = await messages_repository.get_messages(
+            chat_oid=chat_document["oid"],
+            filters=GetMessagesFilters(limit=1, count=CountMode.EXACT),
+        )
+        result = await chats_collection.update_one(
+            {"oid": chat_document["oid"], "message_count": {"$exists": False}},
+            {"$set": {"message_count": count}},
+        )
+        backfilled += result.modified_count
+
+    return backfilled
+
+
+async def main():
+    container = init_container()
+    config: Config = container.resolve(Config)
+    database = container.resolve(AsyncIOMotorClient)[config.mongodb_chat_database]
+
+    backfilled = await backfill_message_counts(
+        chats_collection=database[config.mongodb_chat_collection],
+        messages_repository=container.resolve(BaseMessagesRepository),
+    )
+    print(f"backfilled the message counts of {backfilled} chats")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
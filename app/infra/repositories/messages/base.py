@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Iterable
+from typing import AsyncIterator, Iterable
 
 from domain.entities.messages import Chat, ChatListener, Message
-from infra.repositories.filters.messages import GetMessagesFilters
+from infra.repositories.filters.messages import GetChatsFilters, GetMessagesFilters
+from infra.repositories.messages.read_models import ChatListItem, MessageListItem
 
 
 @dataclass
@@ -18,7 +19,9 @@ class BaseChatsRepository(ABC):
     async def add_chat(self, chat: Chat): ...
 
     @abstractmethod
-    async def get_all_chats(self, limit: int, offset: int) -> Iterable[Chat]: ...
+    async def get_all_chats(
+        self, filters: GetChatsFilters
+    ) -> tuple[list[ChatListItem], int | None]: ...
 
     @abstractmethod
     async def delete_chat_by_oid(self, oid: str): ...
@@ -32,13 +35,42 @@ class BaseChatsRepository(ABC):
     @abstractmethod
     async def get_all_chat_listeners(self, chat_oid: str) -> Iterable[ChatListener]: ...
 
+    # Reserves the next `count` message positions of a chat and returns the
+    # first one, None when the chat does not exist.
+    @abstractmethod
+    async def reserve_message_sequences(
+        self, chat_oid: str, count: int = 1
+    ) -> int | None: ...
+
+    # Takes back messages that were counted when their positions were reserved
+    # but could not be saved.
+    @abstractmethod
+    async def uncount_messages(self, chat_oid: str, count: int) -> None: ...
+
+    # None when the chat does not exist or its messages were never counted.
+    @abstractmethod
+    async def get_messages_count(self, chat_oid: str) -> int | None: ...
+
 
 @dataclass
 class BaseMessagesRepository(ABC):
     @abstractmethod
     async def add_message(self, chat_oid: str, message: Message) -> None: ...
 
+    @abstractmethod
+    async def add_messages(self, messages: Iterable[Message]) -> None: ...
+
     @abstractmethod
     async def get_messages(
         self, chat_oid: str, filters: GetMessagesFilters
-    ) -> tuple[Iterable[Message], int]: ...
+    ) -> tuple[list[MessageListItem], int | None]: ...
+
+    @abstractmethod
+    async def get_messages_after_sequence(
+        self, chat_oid: str, sequence: int, limit: int
+    ) -> list[Message]: ...
+
+    @abstractmethod
+    def iter_messages(
+        self, chat_oid: str, batch_size: int
+    ) -> AsyncIterator[MessageListItem]: ...
@@ -0,0 +1,363 @@
+from dataclasses import dataclass
+from datetime import (
+    datetime,
+    timedelta,
+)
+from enum import Enum
+from typing import (
+    Any,
+    AsyncIterator,
+    ClassVar,
+    Iterable,
+    Mapping,
+)
+
+from pymongo import (
+    ASCENDING,
+    DESCENDING,
+    IndexModel,
+    UpdateOne,
+)
+from pymongo.errors import BulkWriteError
+
+from domain.entities.messages import Message
+from infra.exceptions.messages import MessagesWriteException
+from infra.repositories.filters.messages import (
+    CountMode,
+    CursorDirection,
+    GetMessagesFilters,
+)
+from infra.repositories.messages.base import BaseMessagesRepository
+from infra.repositories.messages.converters import (
+    convert_bucket_item_to_entity,
+    convert_message_document_to_list_item,
+    convert_message_to_bucket_item,
+)
+from infra.repositories.messages.mongo import BaseMongoDBRepository
+from infra.repositories.messages.read_models import MessageListItem
+
+
+EPOCH = datetime(1970, 1, 1)
+# History pages usually need the newest bucket and the one before it, larger
+# cursor batches would fetch buckets that are never read.
+PAGE_BATCH_SIZE = 2
+
+
+class MessagesStorageLayout(str, Enum):
+    # One document per message.
+    DOCUMENT = "document"
+    # Up to bucket_size messages of a chat and time window per document.
+    BUCKET = "bucket"
+
+
+def get_window_start(created_at: datetime, window: timedelta) -> datetime:
+    return created_at - (created_at - EPOCH) % window
+
+
+def build_bucket_document(
+    chat_oid: str, window_start: datetime, bucket_items: list[dict]
+) -> dict:
+    """A whole bucket, in the shape the appends of the repository build up."""
+    bucket = {
+        "chat_oid": chat_oid,
+        "window_start": window_start,
+        "count": len(bucket_items),
+        "messages": bucket_items,
+    }
+    sequences = [
+        bucket_item["sequence"]
+        for bucket_item in bucket_items
+        if "sequence" in bucket_item
+    ]
+
+    if sequences:
+        bucket["first_sequence"] = min(sequences)
+        bucket["last_sequence"] = max(sequences)
+
+    return bucket
+
+
+def get_bucket_item_key(bucket_item: Mapping[str, Any]) -> tuple[datetime, str]:
+    return bucket_item["created_at"], bucket_item["oid"]
+
+
+@dataclass
+class BucketedMongoDBMessagesRepository(BaseMessagesRepository, BaseMongoDBRepository):
+    """Stores the messages of a chat in buckets of one time window each.
+
+    A message is pushed into a bucket of its window that is not full yet, a
+    new bucket is upserted once they all are. Concurrent upserts may open
+    two buckets for the same window, so readers merge every bucket of a
+    window before ordering its messages. Windows never overlap, which is what
+    lets a page stop reading once it is full.
+    """
+
+    bucket_size: int = 200
+    bucket_window: timedelta = timedelta(hours=1)
+
+    indexes: ClassVar[tuple[IndexModel, ...]] = (
+        IndexModel(
+            [
+                ("chat_oid", ASCENDING),
+                ("window_start", ASCENDING),
+                ("count", ASCENDING),
+            ],
+            name="chat_oid_window_start_count",
+        ),
+        IndexModel(
+            [
+                ("chat_oid", ASCENDING),
+                ("first_sequence", ASCENDING),
+                ("last_sequence", ASCENDING),
+            ],
+            name="chat_oid_first_sequence_last_sequence",
+            partialFilterExpression={"last_sequence": {"$exists": True}},
+        ),
+    )
+
+    async def add_message(self, message: Message) -> None:
+        await self._collection.update_one(
+            **self._get_append(message), upsert=True, session=self._session
+        )
+
+    async def add_messages(self, messages: Iterable[Message]) -> None:
+        # Ordered, so every append sees the bucket counts left by the previous.
+        appends = [
+            UpdateOne(**self._get_append(message), upsert=True) for message in messages
+        ]
+
+        if not appends:
+            return
+
+        try:
+            await self._collection.bulk_write(
+                appends, ordered=True, session=self._session
+            )
+        except BulkWriteError as error:
+            # The appends are ordered, the first one that failed stopped all
+            # after it. With a write concern error none of the writes is known
+            # to be durable.
+            errors: dict[int, str] = {}
+            write_concern_errors = error.details.get("writeConcernErrors")
+            write_errors = error.details.get("writeErrors", [])
+
+            if write_concern_errors:
+                errors = dict.fromkeys(
+                    range(len(appends)), write_concern_errors[0]["errmsg"]
+                )
+            if write_errors:
+                first_failed = write_errors[0]["index"]
+                errors.update(
+                    dict.fromkeys(
+                        range(first_failed + 1, len(appends)),
+                        "not written, an earlier message of the batch failed",
+                    )
+                )
+                errors[first_failed] = write_errors[0]["errmsg"]
+
+            if not errors:
+                raise
+
+            raise MessagesWriteException(errors=errors) from error
+
+    async def get_messages(
+        self, chat_oid: str, filters: GetMessagesFilters
+    ) -> tuple[list[MessageListItem], int | None]:
+        if filters.is_cursor_mode:
+            bucket_items = await self._get_page_after_cursor(chat_oid, filters)
+        else:
+            bucket_items = await self._get_page_by_offset(chat_oid, filters)
+
+        messages = [
+            convert_message_document_to_list_item(bucket_item)
+            for bucket_item in bucket_items
+        ]
+        count = None
+
+        if filters.count == CountMode.EXACT:
+            count = sum(
+                [window["count"] async for window in self._count_windows(chat_oid)]
+            )
+
+        return messages, count
+
+    async def get_messages_after_sequence(
+        self, chat_oid: str, sequence: int, limit: int
+    ) -> list[Message]:
+        # Buckets opened concurrently for one window interleave their
+        # sequences, so buckets are read by their first sequence, and every
+        # bucket after one starting past the page starts past it as well.
+        cursor = (
+            self._collection.find(
+                {"chat_oid": chat_oid, "last_sequence": {"$gt": sequence}},
+                session=self._session,
+            )
+            .sort([("first_sequence", ASCENDING), ("last_sequence", ASCENDING)])
+            .batch_size(PAGE_BATCH_SIZE)
+        )
+        bucket_items = []
+
+        try:
+            async for bucket in cursor:
+                if len(bucket_items) >= limit:
+                    bucket_items.sort(key=lambda bucket_item: bucket_item["sequence"])
+                    if bucket["first_sequence"] > bucket_items[limit - 1]["sequence"]:
+                        break
+
+                bucket_items.extend(
+                    bucket_item
+                    for bucket_item in bucket["messages"]
+                    if bucket_item.get("sequence", -1) > sequence
+                )
+        finally:
+            await cursor.close()
+
+        bucket_items.sort(key=lambda bucket_item: bucket_item["sequence"])
+
+        return [
+            convert_bucket_item_to_entity(chat_oid, bucket_item)
+            for bucket_item in bucket_items[:limit]
+        ]
+
+    async def iter_messages(
+        self, chat_oid: str, batch_size: int
+    ) -> AsyncIterator[MessageListItem]:
+        windows = self._iter_windows(
+            {"chat_oid": chat_oid},
+            is_forward=True,
+            batch_size=max(1, batch_size // self.bucket_size),
+        )
+
+        async for bucket_items in windows:
+            for bucket_item in bucket_items:
+                yield convert_message_document_to_list_item(bucket_item)
+
+    async def _get_page_by_offset(
+        self, chat_oid: str, filters: GetMessagesFilters
+    ) -> list[dict]:
+        # Whole windows before the offset are skipped by their counts, only
+        # the buckets of the page itself are read.
+        skipped = 0
+        first_window_start = None
+
+        async for window in self._count_windows(chat_oid):
+            if skipped + window["count"] > filters.offset:
+                first_window_start = window["_id"]
+                break
+
+            skipped += window["count"]
+
+        if first_window_start is None:
+            return []
+
+        page = []
+        windows = self._iter_windows(
+            {"chat_oid": chat_oid, "window_start": {"$gte": first_window_start}},
+            is_forward=True,
+        )
+
+        async for bucket_items in windows:
+            page.extend(bucket_items[max(0, filters.offset - skipped) :])
+            skipped += len(bucket_items)
+
+            if len(page) >= filters.limit:
+                break
+
+        await windows.aclose()
+
+        return page[: filters.limit]
+
+    async def _get_page_after_cursor(
+        self, chat_oid: str, filters: GetMessagesFilters
+    ) -> list[dict]:
+        is_forward = filters.direction == CursorDirection.FORWARD
+        find: dict = {"chat_oid": chat_oid}
+        cursor_key = None
+
+        if filters.cursor:
+            cursor_key = (filters.cursor.created_at, filters.cursor.oid)
+            window_start = get_window_start(
+                filters.cursor.created_at, self.bucket_window
+            )
+            find["window_start"] = {"$gte" if is_forward else "$lte": window_start}
+
+        page = []
+        windows = self._iter_windows(find, is_forward=is_forward)
+
+        async for bucket_items in windows:
+            for bucket_item in bucket_items:
+                key = get_bucket_item_key(bucket_item)
+
+                if cursor_key is None or (
+                    key > cursor_key if is_forward else key < cursor_key
+                ):
+                    page.append(bucket_item)
+
+            if len(page) >= filters.limit:
+                break
+
+        await windows.aclose()
+
+        return page[: filters.limit]
+
+    async def _iter_windows(
+        self, find: dict, is_forward: bool, batch_size: int = PAGE_BATCH_SIZE
+    ) -> AsyncIterator[list[dict]]:
+        """Messages of every window in order, one list per window."""
+        sort_order = ASCENDING if is_forward else DESCENDING
+        cursor = (
+            self._collection.find(find, session=self._session)
+            .sort("window_start", sort_order)
+            .batch_size(batch_size)
+        )
+        window_start = None
+        bucket_items: list[dict] = []
+
+        try:
+            async for bucket in cursor:
+                if bucket["window_start"] != window_start and bucket_items:
+                    yield self._sort_bucket_items(bucket_items, is_forward)
+                    bucket_items = []
+
+                window_start = bucket["window_start"]
+                bucket_items.extend(bucket["messages"])
+
+            if bucket_items:
+                yield self._sort_bucket_items(bucket_items, is_forward)
+        finally:
+            await cursor.close()
+
+    def _count_windows(self, chat_oid: str):
+        return self._collection.aggregate(
+            [
+                {"$match": {"chat_oid": chat_oid}},
+                {"$group": {"_id": "$window_start", "count": {"$sum": "$count"}}},
+                {"$sort": {"_id": ASCENDING}},
+            ],
+            session=self._session,
+        )
+
+    def _get_append(self, message: Message) -> dict:
+        update: dict = {
+            "$push": {"messages": convert_message_to_bucket_item(message)},
+            "$inc": {"count": 1},
+        }
+
+        if message.sequence is not None:
+            update["$min"] = {"first_sequence": message.sequence}
+            update["$max"] = {"last_sequence": message.sequence}
+
+        return {
+            "filter": {
+                "chat_oid": message.chat_oid,
+                "window_start": get_window_start(
+                    message.created_at, self.bucket_window
+                ),
+                "count": {"$lt": self.bucket_size},
+            },
+            "update": update,
+        }
+
+    @staticmethod
+    def _sort_bucket_items(bucket_items: list[dict], is_forward: bool) -> list[dict]:
+        return sorted(bucket_items, key=get_bucket_item_key, reverse=not is_forward)
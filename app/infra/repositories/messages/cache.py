@@ -0,0 +1,129 @@
+import time
+from collections import OrderedDict
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import Iterable
+
+from domain.entities.messages import (
+    Chat,
+    ChatListener,
+)
+from infra.repositories.filters.messages import GetChatsFilters
+from infra.repositories.messages.base import BaseChatsRepository
+from infra.repositories.messages.converters import copy_chat_entity
+from infra.repositories.messages.read_models import ChatListItem
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+
+@dataclass
+class CachedChatsRepository(BaseChatsRepository):
+    chats_repository: BaseChatsRepository
+    max_size: int = 10_000
+    ttl: float = 60.0
+
+    stats: CacheStats = field(default_factory=CacheStats, init=False)
+    _entries: OrderedDict[str, tuple[float, Chat]] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _loading: dict[str, object] = field(default_factory=dict, init=False, repr=False)
+
+    def invalidate(self, oid: str) -> None:
+        self._loading.pop(oid, None)
+
+        if self._entries.pop(oid, None) is not None:
+            self.stats.invalidations += 1
+            self.stats.size = len(self._entries)
+
+    async def get_chat_by_oid(self, oid: str) -> Chat | None:
+        entry = self._entries.get(oid)
+
+        if entry is not None:
+            expires_at, chat = entry
+
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(oid)
+                self.stats.hits += 1
+                return copy_chat_entity(chat)
+
+            del self._entries[oid]
+            self.stats.size = len(self._entries)
+
+        self.stats.misses += 1
+
+        # An invalidation that arrives while the chat is being loaded drops the
+        # token, so a possibly stale result is returned but never cached.
+        token = self._loading[oid] = object()
+        chat = await self.chats_repository.get_chat_by_oid(oid=oid)
+
+        if self._loading.get(oid) is token:
+            del self._loading[oid]
+
+            if chat is not None:
+                self._put(oid, chat)
+
+        return chat
+
+    async def check_chat_exists_by_title(self, title: str) -> bool:
+        return await self.chats_repository.check_chat_exists_by_title(title=title)
+
+    async def add_chat(self, chat: Chat) -> None:
+        await self.chats_repository.add_chat(chat)
+
+    async def get_all_chats(
+        self, filters: GetChatsFilters
+    ) -> tuple[list[ChatListItem], int | None]:
+        return await self.chats_repository.get_all_chats(filters)
+
+    async def delete_chat_by_oid(self, oid: str) -> None:
+        await self.chats_repository.delete_chat_by_oid(oid=oid)
+        self.invalidate(oid)
+
+    async def add_telegram_listener(self, chat_oid: str, telegram_chat_id: str):
+        await self.chats_repository.add_telegram_listener(
+            chat_oid=chat_oid, telegram_chat_id=telegram_chat_id
+        )
+        self.invalidate(chat_oid)
+
+    async def delete_telegram_listener(self, chat_oid: str, telegram_chat_id: str):
+        await self.chats_repository.delete_telegram_listener(
+            chat_oid=chat_oid, telegram_chat_id=telegram_chat_id
+        )
+        self.invalidate(chat_oid)
+
+    async def get_all_chat_listeners(self, chat_oid: str) -> Iterable[ChatListener]:
+        chat = await self.get_chat_by_oid(chat_oid)
+        return list(chat.listeners)
+
+    async def reserve_message_sequences(
+        self, chat_oid: str, count: int = 1
+    ) -> int | None:
+        return await self.chats_repository.reserve_message_sequences(
+            chat_oid=chat_oid, count=count
+        )
+
+    async def uncount_messages(self, chat_oid: str, count: int) -> None:
+        await self.chats_repository.uncount_messages(chat_oid=chat_oid, count=count)
+
+    async def get_messages_count(self, chat_oid: str) -> int | None:
+        # Counters change with every message, they are never cached.
+        return await self.chats_repository.get_messages_count(chat_oid=chat_oid)
+
+    def _put(self, oid: str, chat: Chat) -> None:
+        self._entries[oid] = (time.monotonic() + self.ttl, copy_chat_entity(chat))
+        self._entries.move_to_end(oid)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+        self.stats.size = len(self._entries)
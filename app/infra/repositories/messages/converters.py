@@ -1,31 +1,67 @@
+from dataclasses import replace
 from typing import Any, Mapping
 from domain.entities.messages import Chat, ChatListener, Message
 from domain.values.messages import Text, Title
+from infra.repositories.messages.read_models import ChatListItem, MessageListItem
+
+
+CHAT_LIST_ITEM_PROJECTION = {
+    "_id": False,
+    "oid": True,
+    "title": True,
+    "created_at": True,
+}
+MESSAGE_LIST_ITEM_PROJECTION = {
+    "_id": False,
+    "oid": True,
+    "text": True,
+    "created_at": True,
+    "sequence": True,
+}
 
 
 def convert_message_to_document(message: Message) -> dict:
-    return {
+    document = {
         "oid": message.oid,
         "text": message.text.as_generic_type(),
         "created_at": message.created_at,
         "chat_oid": message.chat_oid,
     }
 
+    # Left out rather than stored as null, so the partial index stays small.
+    if message.sequence is not None:
+        document["sequence"] = message.sequence
+
+    return document
+
 
 def convert_chat_entity_to_document(chat: Chat) -> dict:
     return {
         "oid": chat.oid,
         "title": chat.title.as_generic_type(),
         "created_at": chat.created_at,
+        "message_count": 0,
     }
 
 
 def convert_message_document_to_entity(message_document: Mapping[str, Any]) -> Message:
     return Message(
-        text=Text(value=message_document["text"]),
+        text=Text.trusted(message_document["text"]),
         oid=message_document["oid"],
         created_at=message_document["created_at"],
         chat_oid=message_document["chat_oid"],
+        sequence=message_document.get("sequence"),
+    )
+
+
+def copy_chat_entity(chat: Chat) -> Chat:
+    # Callers mutate the aggregate they get (messages, listeners, events),
+    # so a kept instance is never handed out directly.
+    return replace(
+        chat,
+        messages=frozenset(),
+        listeners=set(chat.listeners),
+        _events=None,
     )
 
 
@@ -35,7 +71,7 @@ def convert_chat_listener_document_to_entity(listener_id: str) -> ChatListener:
 
 def convert_chat_document_to_entity(chat_document: Mapping[str, Any]) -> Chat:
     return Chat(
-        title=Title(value=chat_document["title"]),
+        title=Title.trusted(chat_document["title"]),
         oid=chat_document["oid"],
         created_at=chat_document["created_at"],
         listeners=set(
@@ -45,3 +81,53 @@ def convert_chat_document_to_entity(chat_document: Mapping[str, Any]) -> Chat:
             )
         ),
     )
+
+
+def convert_chat_document_to_list_item(
+    chat_document: Mapping[str, Any],
+) -> ChatListItem:
+    return ChatListItem(
+        oid=chat_document["oid"],
+        title=chat_document["title"],
+        created_at=chat_document["created_at"],
+    )
+
+
+def convert_message_document_to_list_item(
+    message_document: Mapping[str, Any],
+) -> MessageListItem:
+    return MessageListItem(
+        oid=message_document["oid"],
+        text=message_document["text"],
+        created_at=message_document["created_at"],
+        sequence=message_document.get("sequence"),
+    )
+
+
+def convert_message_to_bucket_item(message: Message) -> dict:
+    # The chat is stored once per bucket rather than once per message.
+    document = convert_message_to_document(message)
+    del document["chat_oid"]
+
+    return document
+
+
+def convert_bucket_item_to_entity(
+    chat_oid: str, bucket_item: Mapping[str, Any]
+) -> Message:
+    return Message(
+        text=Text.trusted(bucket_item["text"]),
+        oid=bucket_item["oid"],
+        created_at=bucket_item["created_at"],
+        chat_oid=chat_oid,
+        sequence=bucket_item.get("sequence"),
+    )
+
+
+def convert_message_to_list_item(message: Message) -> MessageListItem:
+    return MessageListItem(
+        oid=message.oid,
+        text=message.text.as_generic_type(),
+        created_at=message.created_at,
+        sequence=message.sequence,
+    )
@@ -0,0 +1,193 @@
+import asyncio
+import bisect
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    AsyncIterator,
+    Iterable,
+)
+
+from pymongo.errors import PyMongoError
+
+from domain.entities.messages import Message
+from infra.exceptions.messages import MessagesWriteException
+from infra.repositories.filters.messages import GetMessagesFilters
+from infra.repositories.messages.base import BaseMessagesRepository
+from infra.repositories.messages.mongo import MongoDBMessagesRepository
+from infra.repositories.messages.read_models import MessageListItem
+from infra.repositories.transactions import current_mongo_db_session
+
+
+@dataclass
+class Histogram:
+    # Upper bounds of the buckets, the last bucket counts everything above.
+    bounds: tuple[float, ...]
+
+    counts: list[int] = field(init=False)
+    count: int = field(default=0, init=False)
+    sum: float = field(default=0.0, init=False)
+
+    def __post_init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+@dataclass
+class GroupCommitStats:
+    flushes: int = 0
+    written_messages: int = 0
+    failed_messages: int = 0
+    # How long every batch was collecting before it was written.
+    flush_interval_ms: Histogram = field(
+        default_factory=lambda: Histogram(bounds=(0.5, 1, 2, 5, 10, 25, 50))
+    )
+    batch_size: Histogram = field(
+        default_factory=lambda: Histogram(bounds=(1, 2, 5, 10, 25, 50, 100, 250, 500))
+    )
+
+
+@dataclass
+class PendingMessage:
+    message: Message
+    future: asyncio.Future
+
+
+@dataclass
+class GroupCommitMessagesRepository(BaseMessagesRepository):
+    """Collects concurrent inserts and writes them with one insert_many.
+
+    A batch is written once it is `max_delay_ms` old or holds `max_batch_size`
+    messages, every caller waits for the result of its own message.
+    """
+
+    messages_repository: MongoDBMessagesRepository
+    max_delay_ms: float = 2.0
+    max_batch_size: int = 500
+
+    stats: GroupCommitStats = field(default_factory=GroupCommitStats, init=False)
+    _pending: list[PendingMessage] = field(default_factory=list, init=False, repr=False)
+    _opened_at: float = field(default=0.0, init=False, repr=False)
+    _flush_timer: asyncio.TimerHandle | None = field(
+        default=None, init=False, repr=False
+    )
+    _flushes: set[asyncio.Task] = field(default_factory=set, init=False, repr=False)
+
+    async def add_message(self, message: Message) -> None:
+        # Inside a transaction the message has to be written with its session,
+        # a shared batch can not be.
+        if current_mongo_db_session.get() is not None:
+            await self.messages_repository.add_message(message=message)
+            return
+
+        loop = asyncio.get_running_loop()
+        pending = PendingMessage(message=message, future=loop.create_future())
+
+        if not self._pending:
+            self._opened_at = time.monotonic()
+            self._flush_timer = loop.call_later(
+                self.max_delay_ms / 1000, self._start_flush
+            )
+
+        self._pending.append(pending)
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+
+        await pending.future
+
+    async def add_messages(self, messages: Iterable[Message]) -> None:
+        await self.messages_repository.add_messages(messages=messages)
+
+    async def get_messages(
+        self, chat_oid: str, filters: GetMessagesFilters
+    ) -> tuple[list[MessageListItem], int | None]:
+        return await self.messages_repository.get_messages(
+            chat_oid=chat_oid, filters=filters
+        )
+
+    async def get_messages_after_sequence(
+        self, chat_oid: str, sequence: int, limit: int
+    ) -> list[Message]:
+        return await self.messages_repository.get_messages_after_sequence(
+            chat_oid=chat_oid, sequence=sequence, limit=limit
+        )
+
+    def iter_messages(
+        self, chat_oid: str, batch_size: int
+    ) -> AsyncIterator[MessageListItem]:
+        return self.messages_repository.iter_messages(
+            chat_oid=chat_oid, batch_size=batch_size
+        )
+
+    async def aclose(self) -> None:
+        """Write the collecting batch and wait for the batches being written."""
+        self._start_flush()
+
+        if self._flushes:
+            await asyncio.wait(self._flushes)
+
+    def _start_flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self.stats.flush_interval_ms.observe(
+            (time.monotonic() - self._opened_at) * 1000
+        )
+        self.stats.batch_size.observe(len(batch))
+
+        # Batches are written concurrently, a slow write does not hold up the
+        # next batch.
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[PendingMessage]) -> None:
+        self.stats.flushes += 1
+        errors: dict[int, Exception] = {}
+
+        try:
+            await self.messages_repository.add_messages(
+                messages=[pending.message for pending in batch]
+            )
+        except MessagesWriteException as error:
+            errors = {
+                index: MessagesWriteException(errors={0: reason})
+                for index, reason in error.errors.items()
+            }
+        except PyMongoError as error:
+            errors = {index: error for index in range(len(batch))}
+        except BaseException as error:
+            # Nobody is left waiting forever, also not for a flush that failed
+            # unexpectedly or was cancelled.
+            for pending in batch:
+                if pending.future.done():
+                    continue
+
+                if isinstance(error, Exception):
+                    pending.future.set_exception(error)
+                else:
+                    pending.future.cancel()
+            raise
+
+        for index, pending in enumerate(batch):
+            if pending.future.done():
+                continue
+
+            if index in errors:
+                pending.future.set_exception(errors[index])
+            else:
+                pending.future.set_result(None)
+
+        self.stats.failed_messages += len(errors)
+        self.stats.written_messages += len(batch) - len(errors)
@@ -1,23 +1,224 @@
-from dataclasses import dataclass, field
+import bisect
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import datetime
+from enum import Enum
+from itertools import islice
+from typing import (
+    AsyncIterator,
+    Iterable,
+)
 
-from domain.entities.messages import Chat
-from infra.repositories.messages.base import BaseChatsRepository
+from domain.entities.messages import (
+    Chat,
+    ChatListener,
+    Message,
+)
+from infra.repositories.filters.messages import (
+    CountMode,
+    CursorDirection,
+    GetChatsFilters,
+    GetMessagesFilters,
+)
+from infra.repositories.messages.base import (
+    BaseChatsRepository,
+    BaseMessagesRepository,
+)
+from infra.repositories.messages.converters import (
+    convert_message_to_list_item,
+    copy_chat_entity,
+)
+from infra.repositories.messages.read_models import (
+    ChatListItem,
+    MessageListItem,
+)
+
+
+class StorageBackend(str, Enum):
+    MONGODB = "mongodb"
+    # Everything is kept in the process, for load tests and single-node runs.
+    MEMORY = "memory"
 
 
 @dataclass
 class MemoryChatRepository(BaseChatsRepository):
-    _saved_chats: list[Chat] = field(default_factory=list, kw_only=True)
+    # Chats by oid, in the order they were added.
+    _saved_chats: dict[str, Chat] = field(default_factory=dict, kw_only=True)
+    _oids_by_title: dict[str, str] = field(default_factory=dict, kw_only=True)
+    _last_message_sequences: dict[str, int] = field(default_factory=dict, kw_only=True)
+    _message_counts: dict[str, int] = field(default_factory=dict, kw_only=True)
+    # Drops the messages of deleted chats, which nothing else would free.
+    messages_repository: "MemoryMessagesRepository | None" = field(
+        default=None, kw_only=True
+    )
 
     async def check_chat_exists_by_title(self, title: str) -> bool:
-        for chat in self._saved_chats:
-            if chat.title.as_generic_type() == title:
-                return True
+        return title in self._oids_by_title
 
     async def add_chat(self, chat: Chat) -> None:
-        self._saved_chats.append(chat)
+        self._saved_chats[chat.oid] = copy_chat_entity(chat)
+        self._oids_by_title[chat.title.as_generic_type()] = chat.oid
 
     async def get_chat_by_oid(self, oid: str) -> Chat | None:
-        try:
-            return next(chat for chat in self._saved_chats if chat.oid == oid)
-        except StopIteration:
+        chat = self._saved_chats.get(oid)
+
+        if chat is None:
             return None
+
+        return copy_chat_entity(chat)
+
+    async def get_all_chats(
+        self, filters: GetChatsFilters
+    ) -> tuple[list[ChatListItem], int | None]:
+        chats = [
+            ChatListItem(
+                oid=chat.oid,
+                title=chat.title.as_generic_type(),
+                created_at=chat.created_at,
+            )
+            for chat in islice(
+                self._saved_chats.values(),
+                filters.offset,
+                filters.offset + filters.limit,
+            )
+        ]
+        count = None if filters.count == CountMode.NONE else len(self._saved_chats)
+
+        return chats, count
+
+    async def delete_chat_by_oid(self, oid: str) -> None:
+        chat = self._saved_chats.pop(oid, None)
+
+        if chat is not None:
+            self._oids_by_title.pop(chat.title.as_generic_type(), None)
+            self._last_message_sequences.pop(oid, None)
+            self._message_counts.pop(oid, None)
+
+        if self.messages_repository is not None:
+            self.messages_repository.discard_chat(oid)
+
+    async def add_telegram_listener(self, chat_oid: str, telegram_chat_id: str):
+        chat = self._saved_chats.get(chat_oid)
+
+        if chat is not None:
+            chat.listeners.add(ChatListener(oid=telegram_chat_id))
+
+    async def delete_telegram_listener(self, chat_oid: str, telegram_chat_id: str):
+        chat = self._saved_chats.get(chat_oid)
+
+        if chat is not None:
+            chat.listeners.discard(ChatListener(oid=telegram_chat_id))
+
+    async def get_all_chat_listeners(self, chat_oid: str) -> Iterable[ChatListener]:
+        chat = self._saved_chats.get(chat_oid)
+
+        return list(chat.listeners) if chat is not None else []
+
+    async def reserve_message_sequences(
+        self, chat_oid: str, count: int = 1
+    ) -> int | None:
+        if chat_oid not in self._saved_chats:
+            return None
+
+        last_sequence = self._last_message_sequences.get(chat_oid, 0) + count
+        self._last_message_sequences[chat_oid] = last_sequence
+        self._message_counts[chat_oid] = self._message_counts.get(chat_oid, 0) + count
+
+        return last_sequence - count + 1
+
+    async def uncount_messages(self, chat_oid: str, count: int) -> None:
+        if chat_oid in self._message_counts:
+            self._message_counts[chat_oid] -= count
+
+    async def get_messages_count(self, chat_oid: str) -> int | None:
+        if chat_oid not in self._saved_chats:
+            return None
+
+        return self._message_counts.get(chat_oid, 0)
+
+
+@dataclass
+class ChatMessages:
+    # Kept sorted by (created_at, oid), the order history is paged in.
+    keys: list[tuple[datetime, str]] = field(default_factory=list)
+    messages: list[Message] = field(default_factory=list)
+    # Messages with a sequence, kept sorted by it for resumed streams.
+    sequences: list[int] = field(default_factory=list)
+    sequenced_messages: list[Message] = field(default_factory=list)
+
+    def add(self, message: Message) -> None:
+        key = (message.created_at, message.oid)
+        # Messages mostly arrive in order, which makes this an append.
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.messages.insert(index, message)
+
+        if message.sequence is not None:
+            index = bisect.bisect_right(self.sequences, message.sequence)
+            self.sequences.insert(index, message.sequence)
+            self.sequenced_messages.insert(index, message)
+
+
+@dataclass
+class MemoryMessagesRepository(BaseMessagesRepository):
+    _chats: dict[str, ChatMessages] = field(default_factory=dict, kw_only=True)
+
+    async def add_message(self, message: Message) -> None:
+        chat = self._chats.get(message.chat_oid)
+
+        if chat is None:
+            chat = self._chats[message.chat_oid] = ChatMessages()
+
+        chat.add(message)
+
+    async def add_messages(self, messages: Iterable[Message]) -> None:
+        for message in messages:
+            await self.add_message(message)
+
+    def discard_chat(self, chat_oid: str) -> None:
+        self._chats.pop(chat_oid, None)
+
+    async def get_messages(
+        self, chat_oid: str, filters: GetMessagesFilters
+    ) -> tuple[list[MessageListItem], int | None]:
+        chat = self._chats.get(chat_oid, ChatMessages())
+
+        if not filters.is_cursor_mode:
+            messages = chat.messages[filters.offset : filters.offset + filters.limit]
+        elif filters.direction == CursorDirection.FORWARD:
+            start = 0
+            if filters.cursor:
+                cursor_key = (filters.cursor.created_at, filters.cursor.oid)
+                start = bisect.bisect_right(chat.keys, cursor_key)
+
+            messages = chat.messages[start : start + filters.limit]
+        else:
+            end = len(chat.keys)
+            if filters.cursor:
+                cursor_key = (filters.cursor.created_at, filters.cursor.oid)
+                end = bisect.bisect_left(chat.keys, cursor_key)
+
+            messages = chat.messages[max(0, end - filters.limit) : end][::-1]
+
+        count = len(chat.messages) if filters.count == CountMode.EXACT else None
+
+        return [convert_message_to_list_item(message) for message in messages], count
+
+    async def get_messages_after_sequence(
+        self, chat_oid: str, sequence: int, limit: int
+    ) -> list[Message]:
+        chat = self._chats.get(chat_oid, ChatMessages())
+        start = bisect.bisect_right(chat.sequences, sequence)
+
+        return chat.sequenced_messages[start : start + limit]
+
+    async def iter_messages(
+        self, chat_oid: str, batch_size: int
+    ) -> AsyncIterator[MessageListItem]:
+        chat = self._chats.get(chat_oid, ChatMessages())
+
+        # A snapshot of the references, messages added meanwhile are left out.
+        for message in list(chat.messages):
+            yield convert_message_to_list_item(message)
@@ -0,0 +1,118 @@
+"""Copy messages from the document layout into the bucket layout.
+
+Messages are read chat by chat in the order of the chat_oid_created_at_oid
+index and packed into full buckets of their window. The buckets a chat had in
+the target collection are replaced, so an interrupted run can simply be
+started again. Messages written while a chat is being copied are not, stop
+the writers or switch MESSAGES_STORAGE_LAYOUT to bucket only afterwards.
+
+Run from the ``app`` directory:
+``python -m infra.repositories.messages.migrate_to_buckets``.
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+
+from infra.repositories.messages.buckets import (
+    BucketedMongoDBMessagesRepository,
+    build_bucket_document,
+    get_window_start,
+)
+from logic.init import init_container
+from settings.config import Config
+
+
+@dataclass
+class MigrationStats:
+    chats: int = 0
+    messages: int = 0
+    buckets: int = 0
+
+
+async def migrate_messages_to_buckets(
+    messages_collection,
+    buckets_collection,
+    bucket_size: int,
+    bucket_window: timedelta,
+    batch_size: int = 1000,
+) -> MigrationStats:
+    stats = MigrationStats()
+    buckets: list[dict] = []
+    chat_oid = None
+    window_start = None
+    bucket_items: list[dict] = []
+
+    def close_bucket():
+        if bucket_items:
+            buckets.append(build_bucket_document(chat_oid, window_start, bucket_items))
+
+    async def write_buckets():
+        if buckets:
+            await buckets_collection.insert_many(buckets, ordered=False)
+            stats.buckets += len(buckets)
+            buckets.clear()
+
+    cursor = messages_collection.find(
+        {}, projection={"_id": False}, batch_size=batch_size
+    ).sort([("chat_oid", ASCENDING), ("created_at", ASCENDING), ("oid", ASCENDING)])
+
+    async for message_document in cursor:
+        message_chat_oid = message_document.pop("chat_oid")
+        message_window_start = get_window_start(
+            message_document["created_at"], bucket_window
+        )
+
+        if message_chat_oid != chat_oid:
+            close_bucket()
+            await write_buckets()
+            await buckets_collection.delete_many({"chat_oid": message_chat_oid})
+            chat_oid, window_start, bucket_items = message_chat_oid, None, []
+            stats.chats += 1
+
+        if message_window_start != window_start or len(bucket_items) >= bucket_size:
+            close_bucket()
+            window_start, bucket_items = message_window_start, []
+
+        bucket_items.append(message_document)
+        stats.messages += 1
+
+        if len(buckets) * bucket_size >= batch_size:
+            await write_buckets()
+
+    close_bucket()
+    await write_buckets()
+
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    batch_size = parser.parse_args().batch_size
+
+    container = init_container()
+    config: Config = container.resolve(Config)
+    database = container.resolve(AsyncIOMotorClient)[config.mongodb_chat_database]
+    repository = container.resolve(BucketedMongoDBMessagesRepository)
+    await repository.ensure_indexes()
+
+    stats = await migrate_messages_to_buckets(
+        messages_collection=database[config.mongodb_messages_collection],
+        buckets_collection=database[config.mongodb_message_buckets_collection],
+        bucket_size=repository.bucket_size,
+        bucket_window=repository.bucket_window,
+        batch_size=batch_size,
+    )
+    print(
+        f"migrated {stats.messages} messages of {stats.chats} chats "
+        f"into {stats.buckets} buckets"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,39 @@
 from abc import ABC
 from dataclasses import dataclass
-from typing import Iterable
+from typing import AsyncIterator, ClassVar, Iterable
 from motor.core import AgnosticClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import (
+    BulkWriteError,
+    OperationFailure,
+)
 from domain.entities.messages import Chat, ChatListener, Message
-from infra.repositories.filters.messages import GetChatsFilters, GetMessagesFilters
+from infra.exceptions.messages import MessagesWriteException
+from infra.repositories.filters.messages import (
+    CountMode,
+    CursorDirection,
+    GetChatsFilters,
+    GetMessagesFilters,
+)
+from infra.repositories.indexes import (
+    IndexIssue,
+    IndexIssueReason,
+    find_index_issues,
+)
 from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
 from infra.repositories.messages.converters import (
+    CHAT_LIST_ITEM_PROJECTION,
+    MESSAGE_LIST_ITEM_PROJECTION,
     convert_chat_document_to_entity,
+    convert_chat_document_to_list_item,
     convert_chat_entity_to_document,
     convert_chat_listener_document_to_entity,
     convert_message_document_to_entity,
+    convert_message_document_to_list_item,
     convert_message_to_document,
 )
+from infra.repositories.messages.read_models import ChatListItem, MessageListItem
+from infra.repositories.transactions import current_mongo_db_session
 
 
 @dataclass
@@ -20,17 +42,71 @@ class BaseMongoDBRepository(ABC):
     mongo_db_db_name: str
     mongo_db_collection_name: str
 
+    indexes: ClassVar[tuple[IndexModel, ...]] = ()
+
     @property
     def _collection(self):
         return self.mongo_db_client[self.mongo_db_db_name][
             self.mongo_db_collection_name
         ]
 
+    @property
+    def _session(self):
+        return current_mongo_db_session.get()
+
+    async def get_index_issues(self) -> list[IndexIssue]:
+        return find_index_issues(
+            collection_name=self.mongo_db_collection_name,
+            declared_indexes=self.indexes,
+            index_information=await self._collection.index_information(),
+        )
+
+    async def ensure_indexes(self) -> list[IndexIssue]:
+        """Create missing indexes and return the ones that differ or failed."""
+        issues = await self.get_index_issues()
+        missing_names = {
+            issue.index_name
+            for issue in issues
+            if issue.reason == IndexIssueReason.MISSING
+        }
+        remaining_issues = [
+            issue for issue in issues if issue.reason != IndexIssueReason.MISSING
+        ]
+
+        for index in self.indexes:
+            index_name = index.document["name"]
+
+            if index_name not in missing_names:
+                continue
+
+            # One at a time, so existing data breaking one index (duplicate
+            # values under a unique one) does not keep the others from building.
+            try:
+                await self._collection.create_indexes([index])
+            except OperationFailure as error:
+                remaining_issues.append(
+                    IndexIssue(
+                        collection_name=self.mongo_db_collection_name,
+                        index_name=index_name,
+                        reason=IndexIssueReason.FAILED,
+                        detail=(error.details or {}).get("errmsg", str(error)),
+                    )
+                )
+
+        return remaining_issues
+
 
 @dataclass
 class MongoDBChatsRepository(BaseChatsRepository, BaseMongoDBRepository):
+    indexes: ClassVar[tuple[IndexModel, ...]] = (
+        IndexModel("oid", name="oid_unique", unique=True),
+        IndexModel("title", name="title_unique", unique=True),
+    )
+
     async def get_chat_by_oid(self, oid: str) -> Chat:
-        chat_document = await self._collection.find_one(filter={"oid": oid})
+        chat_document = await self._collection.find_one(
+            filter={"oid": oid}, session=self._session
+        )
 
         if not chat_document:
             return None
@@ -38,7 +114,9 @@ class MongoDBChatsRepository(BaseChatsRepository, BaseMongoDBRepository):
         return convert_chat_document_to_entity(chat_document)
 
     async def check_chat_exists_by_title(self, title: str) -> bool:
-        chat_document = await self._collection.find_one(filter={"title": title})
+        chat_document = await self._collection.find_one(
+            filter={"title": title}, session=self._session
+        )
         return bool(chat_document)
 
     async def add_chat(self, chat: Chat) -> None:
@@ -46,32 +124,49 @@ class MongoDBChatsRepository(BaseChatsRepository, BaseMongoDBRepository):
 
         await collection.insert_one(
             convert_chat_entity_to_document(chat),
+            session=self._session,
         )
 
     async def get_all_chats(
         self, filters: GetChatsFilters
-    ) -> tuple[Iterable[Chat], int]:
-        cursor = self._collection.find().skip(filters.offset).limit(filters.limit)
+    ) -> tuple[list[ChatListItem], int | None]:
+        cursor = (
+            self._collection.find(
+                projection=CHAT_LIST_ITEM_PROJECTION, session=self._session
+            )
+            .skip(filters.offset)
+            .limit(filters.limit)
+        )
 
         chats = [
-            convert_chat_document_to_entity(chat_document=chat_document)
+            convert_chat_document_to_list_item(chat_document)
             async for chat_document in cursor
         ]
-        count = await self._collection.count_documents({})
+        count = None
+
+        if filters.count == CountMode.EXACT:
+            count = await self._collection.count_documents({}, session=self._session)
+        elif filters.count == CountMode.ESTIMATED:
+            # Read from the collection metadata instead of scanning it.
+            count = await self._collection.estimated_document_count()
 
         return chats, count
 
     async def delete_chat_by_oid(self, oid: str) -> None:
-        await self._collection.delete_one({"oid": oid})
+        await self._collection.delete_one({"oid": oid}, session=self._session)
 
     async def add_telegram_listener(self, chat_oid: str, telegram_chat_id: str):
         await self._collection.update_one(
-            {"oid": chat_oid}, {"$push": {"listeners": telegram_chat_id}}
+            {"oid": chat_oid},
+            {"$push": {"listeners": telegram_chat_id}},
+            session=self._session,
         )
 
     async def delete_telegram_listener(self, chat_oid: str, telegram_chat_id: str):
         await self._collection.update_one(
-            {"oid": chat_oid}, {"$pull": {"listeners": telegram_chat_id}}
+            {"oid": chat_oid},
+            {"$pull": {"listeners": telegram_chat_id}},
+            session=self._session,
         )
 
     async def get_all_chat_listeners(self, chat_oid: str) -> Iterable[ChatListener]:
@@ -81,23 +176,197 @@ class MongoDBChatsRepository(BaseChatsRepository, BaseMongoDBRepository):
             for listener in chat.listeners
         ]
 
+    async def reserve_message_sequences(
+        self, chat_oid: str, count: int = 1
+    ) -> int | None:
+        # The message counter is kept in the same update, so counting messages
+        # costs no extra write. Chats created before it was introduced have no
+        # counter until it is backfilled, it is not started from zero for them.
+        chat_document = await self._collection.find_one_and_update(
+            {"oid": chat_oid},
+            [
+                {
+                    "$set": {
+                        "last_message_sequence": {
+                            "$add": [{"$ifNull": ["$last_message_sequence", 0]}, count]
+                        },
+                        "message_count": {
+                            "$cond": [
+                                {"$eq": [{"$type": "$message_count"}, "missing"]},
+                                "$$REMOVE",
+                                {"$add": ["$message_count", count]},
+                            ]
+                        },
+                    }
+                }
+            ],
+            projection={"last_message_sequence": True},
+            return_document=ReturnDocument.AFTER,
+            session=self._session,
+        )
+
+        if not chat_document:
+            return None
+
+        return chat_document["last_message_sequence"] - count + 1
+
+    async def get_messages_count(self, chat_oid: str) -> int | None:
+        chat_document = await self._collection.find_one(
+            {"oid": chat_oid},
+            projection={"message_count": True},
+            session=self._session,
+        )
+
+        if not chat_document:
+            return None
+
+        return chat_document.get("message_count")
+
+    async def uncount_messages(self, chat_oid: str, count: int) -> None:
+        await self._collection.update_one(
+            {"oid": chat_oid, "message_count": {"$exists": True}},
+            {"$inc": {"message_count": -count}},
+            session=self._session,
+        )
+
 
 @dataclass
 class MongoDBMessagesRepository(BaseMessagesRepository, BaseMongoDBRepository):
+    indexes: ClassVar[tuple[IndexModel, ...]] = (
+        IndexModel("oid", name="oid_unique", unique=True),
+        IndexModel(
+            [("chat_oid", ASCENDING), ("created_at", ASCENDING), ("oid", ASCENDING)],
+            name="chat_oid_created_at_oid",
+        ),
+        IndexModel(
+            [("chat_oid", ASCENDING), ("sequence", ASCENDING)],
+            name="chat_oid_sequence",
+            partialFilterExpression={"sequence": {"$exists": True}},
+        ),
+    )
+
     async def add_message(self, message: Message) -> None:
-        await self._collection.insert_one(document=convert_message_to_document(message))
+        await self._collection.insert_one(
+            document=convert_message_to_document(message), session=self._session
+        )
+
+    async def add_messages(self, messages: Iterable[Message]) -> None:
+        documents = [convert_message_to_document(message) for message in messages]
+
+        if not documents:
+            return
+
+        try:
+            await self._collection.insert_many(
+                documents, ordered=False, session=self._session
+            )
+        except BulkWriteError as error:
+            # The insert is unordered, only the documents listed failed. With a
+            # write concern error none of the writes is known to be durable.
+            errors: dict[int, str] = {}
+            write_concern_errors = error.details.get("writeConcernErrors")
+
+            if write_concern_errors:
+                errors = dict.fromkeys(
+                    range(len(documents)), write_concern_errors[0]["errmsg"]
+                )
+            errors.update(
+                (write_error["index"], write_error["errmsg"])
+                for write_error in error.details.get("writeErrors", [])
+            )
+
+            if not errors:
+                raise
+
+            raise MessagesWriteException(errors=errors) from error
 
     async def get_messages(
         self, chat_oid: str, filters: GetMessagesFilters
-    ) -> tuple[Iterable[Message], int]:
+    ) -> tuple[list[MessageListItem], int | None]:
         find = {"chat_oid": chat_oid}
-        cursor = self._collection.find(find)
-        messages = [
-            convert_message_document_to_entity(message_document)
-            async for message_document in cursor.skip(filters.offset).limit(
-                filters.limit
+
+        if filters.is_cursor_mode:
+            cursor = self._get_messages_page_after_cursor(chat_oid, filters)
+        else:
+            cursor = (
+                self._collection.find(
+                    find, projection=MESSAGE_LIST_ITEM_PROJECTION, session=self._session
+                )
+                .skip(filters.offset)
+                .limit(filters.limit)
             )
+
+        messages = [
+            convert_message_document_to_list_item(message_document)
+            async for message_document in cursor
         ]
-        count = await self._collection.count_documents(filter=find)
+        count = None
+
+        if filters.count == CountMode.EXACT:
+            count = await self._collection.count_documents(
+                filter=find, session=self._session
+            )
 
         return messages, count
+
+    async def get_messages_after_sequence(
+        self, chat_oid: str, sequence: int, limit: int
+    ) -> list[Message]:
+        cursor = (
+            self._collection.find(
+                {"chat_oid": chat_oid, "sequence": {"$gt": sequence}},
+                session=self._session,
+            )
+            .sort("sequence", ASCENDING)
+            .limit(limit)
+        )
+
+        return [
+            convert_message_document_to_entity(message_document)
+            async for message_document in cursor
+        ]
+
+    async def iter_messages(
+        self, chat_oid: str, batch_size: int
+    ) -> AsyncIterator[MessageListItem]:
+        # Only one batch of documents is held at a time, however long the chat.
+        cursor = self._collection.find(
+            {"chat_oid": chat_oid},
+            projection=MESSAGE_LIST_ITEM_PROJECTION,
+            batch_size=batch_size,
+            session=self._session,
+        ).sort([("created_at", ASCENDING), ("oid", ASCENDING)])
+
+        try:
+            async for message_document in cursor:
+                yield convert_message_document_to_list_item(message_document)
+        finally:
+            await cursor.close()
+
+    def _get_messages_page_after_cursor(
+        self, chat_oid: str, filters: GetMessagesFilters
+    ):
+        is_forward = filters.direction == CursorDirection.FORWARD
+        find: dict = {"chat_oid": chat_oid}
+
+        if filters.cursor:
+            # Seek past the (created_at, oid) of the last seen message, the oid
+            # breaks ties between messages created in the same millisecond.
+            operator = "$gt" if is_forward else "$lt"
+            find["$or"] = [
+                {"created_at": {operator: filters.cursor.created_at}},
+                {
+                    "created_at": filters.cursor.created_at,
+                    "oid": {operator: filters.cursor.oid},
+                },
+            ]
+
+        sort_order = ASCENDING if is_forward else DESCENDING
+
+        return (
+            self._collection.find(
+                find, projection=MESSAGE_LIST_ITEM_PROJECTION, session=self._session
+            )
+            .sort([("created_at", sort_order), ("oid", sort_order)])
+            .limit(filters.limit)
+        )
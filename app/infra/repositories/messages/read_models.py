@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+
+# Rows of the listing endpoints, read with a projection and never hydrated
+# into aggregates.
+
+
+@dataclass(frozen=True, slots=True)
+class ChatListItem:
+    oid: str
+    title: str
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class MessageListItem:
+    oid: str
+    text: str
+    created_at: datetime
+    sequence: int | None = None
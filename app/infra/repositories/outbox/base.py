@@ -0,0 +1,27 @@
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from dataclasses import dataclass
+from typing import Iterable
+
+from infra.message_brokers.dots import OutboxMessage
+
+
+@dataclass
+class BaseOutboxRepository(ABC):
+    @abstractmethod
+    async def add_messages(self, messages: Iterable[OutboxMessage]) -> None: ...
+
+    @abstractmethod
+    async def claim_pending_messages(
+        self, owner: str, limit: int, lease_seconds: float
+    ) -> list[OutboxMessage]: ...
+
+    @abstractmethod
+    async def extend_lease(
+        self, owner: str, oids: Iterable[str], lease_seconds: float
+    ) -> None: ...
+
+    @abstractmethod
+    async def mark_dispatched(self, oids: Iterable[str]) -> None: ...
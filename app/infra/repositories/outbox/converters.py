@@ -0,0 +1,31 @@
+from typing import (
+    Any,
+    Mapping,
+)
+
+from infra.message_brokers.dots import OutboxMessage
+
+
+def convert_outbox_message_to_document(message: OutboxMessage) -> dict:
+    return {
+        "oid": message.oid,
+        "topic": message.topic,
+        "key": message.key,
+        "value": message.value,
+        "created_at": message.created_at,
+        "dispatched_at": None,
+        "locked_by": None,
+        "locked_until": None,
+    }
+
+
+def convert_outbox_document_to_message(
+    outbox_document: Mapping[str, Any],
+) -> OutboxMessage:
+    return OutboxMessage(
+        topic=outbox_document["topic"],
+        key=outbox_document["key"],
+        value=outbox_document["value"],
+        oid=outbox_document["oid"],
+        created_at=outbox_document["created_at"],
+    )
@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+from datetime import (
+    datetime,
+    timedelta,
+)
+from typing import (
+    ClassVar,
+    Iterable,
+)
+
+from pymongo import IndexModel
+
+from infra.message_brokers.dots import OutboxMessage
+from infra.repositories.messages.mongo import BaseMongoDBRepository
+from infra.repositories.outbox.base import BaseOutboxRepository
+from infra.repositories.outbox.converters import (
+    convert_outbox_document_to_message,
+    convert_outbox_message_to_document,
+)
+
+
+@dataclass
+class MongoDBOutboxRepository(BaseOutboxRepository, BaseMongoDBRepository):
+    indexes: ClassVar[tuple[IndexModel, ...]] = (
+        IndexModel("oid", name="oid_unique", unique=True),
+        IndexModel([("dispatched_at", 1), ("created_at", 1)], name="pending"),
+        # Dispatched records expire after a week, pending ones have no date.
+        IndexModel(
+            "dispatched_at",
+            name="dispatched_at_ttl",
+            expireAfterSeconds=int(timedelta(days=7).total_seconds()),
+        ),
+    )
+
+    async def add_messages(self, messages: Iterable[OutboxMessage]) -> None:
+        documents = [
+            convert_outbox_message_to_document(message) for message in messages
+        ]
+
+        if documents:
+            await self._collection.insert_many(documents, session=self._session)
+
+    async def claim_pending_messages(
+        self, owner: str, limit: int, lease_seconds: float
+    ) -> list[OutboxMessage]:
+        now = datetime.now()
+        claimable = {
+            "dispatched_at": None,
+            "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}],
+        }
+
+        candidates = (
+            self._collection.find(claimable, projection={"oid": True})
+            .sort("created_at")
+            .limit(limit)
+        )
+        candidate_oids = [document["oid"] async for document in candidates]
+
+        if not candidate_oids:
+            return []
+
+        # Every document is re-checked by the update itself, so two relays can
+        # never claim the same message while its lease is still valid.
+        await self._collection.update_many(
+            {"oid": {"$in": candidate_oids}, **claimable},
+            {
+                "$set": {
+                    "locked_by": owner,
+                    "locked_until": now + timedelta(seconds=lease_seconds),
+                }
+            },
+        )
+        claimed = self._collection.find(
+            {"oid": {"$in": candidate_oids}, "locked_by": owner, "dispatched_at": None}
+        ).sort("created_at")
+        messages = [
+            convert_outbox_document_to_message(outbox_document)
+            async for outbox_document in claimed
+        ]
+
+        return await self._release_out_of_order(owner, messages)
+
+    async def _release_out_of_order(
+        self, owner: str, messages: list[OutboxMessage]
+    ) -> list[OutboxMessage]:
+        # With several relays a message of a key (the chat) is only sent once
+        # every older message of that key is dispatched or claimed by the same
+        # relay, the rest is released to keep the per-key order.
+        if not messages:
+            return messages
+
+        older_pending = self._collection.find(
+            {
+                "key": {"$in": list({message.key for message in messages})},
+                "dispatched_at": None,
+                "locked_by": {"$ne": owner},
+                "created_at": {"$lt": messages[-1].created_at},
+            },
+            projection={"key": True, "created_at": True},
+        )
+        blocked_after: dict[bytes, datetime] = {}
+
+        async for outbox_document in older_pending:
+            key = outbox_document["key"]
+            created_at = outbox_document["created_at"]
+
+            if key not in blocked_after or created_at < blocked_after[key]:
+                blocked_after[key] = created_at
+
+        released_oids = {
+            message.oid
+            for message in messages
+            if message.key in blocked_after
+            and message.created_at > blocked_after[message.key]
+        }
+
+        if not released_oids:
+            return messages
+
+        await self._collection.update_many(
+            {"oid": {"$in": list(released_oids)}, "locked_by": owner},
+            {"$set": {"locked_by": None, "locked_until": None}},
+        )
+
+        return [message for message in messages if message.oid not in released_oids]
+
+    async def extend_lease(
+        self, owner: str, oids: Iterable[str], lease_seconds: float
+    ) -> None:
+        await self._collection.update_many(
+            {"oid": {"$in": list(oids)}, "locked_by": owner, "dispatched_at": None},
+            {
+                "$set": {
+                    "locked_until": datetime.now() + timedelta(seconds=lease_seconds)
+                }
+            },
+        )
+
+    async def mark_dispatched(self, oids: Iterable[str]) -> None:
+        await self._collection.update_many(
+            {"oid": {"$in": list(oids)}},
+            {"$set": {"dispatched_at": datetime.now(), "locked_until": None}},
+        )
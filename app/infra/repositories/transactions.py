@@ -0,0 +1,92 @@
+import asyncio
+import random
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    TypeVar,
+)
+
+from motor.core import (
+    AgnosticClient,
+    AgnosticClientSession,
+)
+from pymongo.errors import PyMongoError
+
+
+T = TypeVar("T")
+
+current_mongo_db_session: ContextVar[AgnosticClientSession | None] = ContextVar(
+    "current_mongo_db_session", default=None
+)
+
+
+@dataclass
+class BaseTransactionManager(ABC):
+    @abstractmethod
+    async def run_in_transaction(self, work: Callable[[], Awaitable[T]]) -> T:
+        """Run ``work`` in one transaction, possibly more than once when the
+        transaction has to be retried, so ``work`` must be safe to run again."""
+
+
+@dataclass
+class NullTransactionManager(BaseTransactionManager):
+    async def run_in_transaction(self, work: Callable[[], Awaitable[T]]) -> T:
+        return await work()
+
+
+@dataclass
+class MongoDBTransactionManager(BaseTransactionManager):
+    mongo_db_client: AgnosticClient
+    max_attempts: int = 5
+    retry_delay: float = 0.01
+
+    async def run_in_transaction(self, work: Callable[[], Awaitable[T]]) -> T:
+        if current_mongo_db_session.get() is not None:
+            return await work()
+
+        async with await self.mongo_db_client.start_session() as session:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    return await self._run_once(session, work)
+                except PyMongoError as error:
+                    # Concurrent writes to the same chat document abort all but one
+                    # transaction with a WriteConflict, so those are run again.
+                    if attempt == self.max_attempts or not error.has_error_label(
+                        "TransientTransactionError"
+                    ):
+                        raise
+                await asyncio.sleep(random.uniform(0, self.retry_delay * attempt))
+
+    async def _run_once(
+        self, session: AgnosticClientSession, work: Callable[[], Awaitable[T]]
+    ) -> T:
+        session.start_transaction()
+        token = current_mongo_db_session.set(session)
+        try:
+            result = await work()
+        except BaseException:
+            await session.abort_transaction()
+            raise
+        finally:
+            current_mongo_db_session.reset(token)
+
+        await self._commit(session)
+        return result
+
+    async def _commit(self, session: AgnosticClientSession) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await session.commit_transaction()
+                return
+            except PyMongoError as error:
+                # The commit may have been applied, and committing again is safe.
+                if attempt == self.max_attempts or not error.has_error_label(
+                    "UnknownTransactionCommitResult"
+                ):
+                    raise
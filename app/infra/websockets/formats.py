@@ -0,0 +1,176 @@
+import struct
+import zlib
+from dataclasses import (
+    dataclass,
+    field,
+)
+from enum import Enum
+from typing import Iterable
+
+
+# Field names of the compact encodings.
+COMPACT_FIELDS = {
+    "message_oid": "o",
+    "chat_oid": "c",
+    "message_text": "t",
+    "type": "y",
+    "sequence": "s",
+}
+# Deflated formats only compress frames from this size on, and prefix every
+# frame with a flag byte telling whether it is compressed.
+DEFLATE_MIN_SIZE = 512
+RAW_FLAG = b"\x00"
+DEFLATED_FLAG = b"\x01"
+
+
+class WireFormat(str, Enum):
+    JSON = "chat.v1.json"
+    JSON_DEFLATE = "chat.v1.json+deflate"
+    MSGPACK = "chat.v1.msgpack"
+    MSGPACK_DEFLATE = "chat.v1.msgpack+deflate"
+
+    @property
+    def is_deflated(self) -> bool:
+        return self.value.endswith("+deflate")
+
+    @property
+    def supports_batches(self) -> bool:
+        # Deflated frames are compressed one by one and can not be joined.
+        return not self.is_deflated
+
+
+def negotiate_wire_format(subprotocols: Iterable[str]) -> WireFormat | None:
+    # The first subprotocol offered by the client that is supported wins.
+    for subprotocol in subprotocols:
+        try:
+            return WireFormat(subprotocol)
+        except ValueError:
+            continue
+
+    return None
+
+
+@dataclass(eq=False)
+class WireFrames:
+    """One outgoing message, encoded at most once for every wire format."""
+
+    json: bytes
+    fields: dict[str, str | int]
+
+    _encoded: dict[WireFormat, bytes] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __len__(self) -> int:
+        return len(self.json)
+
+    @property
+    def sequence(self) -> int | None:
+        return self.fields.get("sequence")
+
+    def encode(self, wire_format: WireFormat) -> bytes:
+        if wire_format == WireFormat.JSON:
+            return self.json
+
+        frame = self._encoded.get(wire_format)
+
+        if frame is None:
+            frame = self._encoded[wire_format] = self._encode(wire_format)
+
+        return frame
+
+    def _encode(self, wire_format: WireFormat) -> bytes:
+        if wire_format == WireFormat.JSON_DEFLATE:
+            return deflate(self.json)
+
+        frame = encode_msgpack_map(
+            {
+                COMPACT_FIELDS.get(name, name): value
+                for name, value in self.fields.items()
+            }
+        )
+
+        return deflate(frame) if wire_format.is_deflated else frame
+
+
+def build_history_truncated_frames(sequence: int) -> WireFrames:
+    """Tells a resuming client that messages after `sequence` were left out and
+    have to be loaded from the history endpoint."""
+    fields = {"type": "history_truncated", "sequence": sequence}
+
+    return WireFrames(
+        json=b'{"type": "history_truncated", "sequence": %d}' % sequence,
+        fields=fields,
+    )
+
+
+def join_frames(wire_format: WireFormat, frames: list[bytes]) -> bytes:
+    """Sends several frames as one array, used when a send queue coalesces."""
+    if len(frames) == 1:
+        return frames[0]
+
+    if wire_format == WireFormat.MSGPACK:
+        if len(frames) < 16:
+            header = bytes([0x90 | len(frames)])
+        elif len(frames) < 2**16:
+            header = b"\xdc" + struct.pack(">H", len(frames))
+        else:
+            header = b"\xdd" + struct.pack(">I", len(frames))
+
+        return header + b"".join(frames)
+
+    return b"[" + b",".join(frames) + b"]"
+
+
+def deflate(frame: bytes) -> bytes:
+    if len(frame) < DEFLATE_MIN_SIZE:
+        return RAW_FLAG + frame
+
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return DEFLATED_FLAG + compressor.compress(frame) + compressor.flush()
+
+
+def encode_msgpack_map(values: dict[str, str | int]) -> bytes:
+    # Messages are flat maps of strings and positions, which is all of msgpack
+    # we need.
+    if len(values) < 16:
+        header = bytes([0x80 | len(values)])
+    else:
+        header = b"\xde" + struct.pack(">H", len(values))
+
+    return header + b"".join(
+        encode_msgpack_str(name)
+        + (
+            encode_msgpack_uint(value)
+            if isinstance(value, int)
+            else encode_msgpack_str(value)
+        )
+        for name, value in values.items()
+    )
+
+
+def encode_msgpack_uint(value: int) -> bytes:
+    if value < 0x80:
+        return bytes([value])
+    if value < 2**8:
+        return b"\xcc" + struct.pack(">B", value)
+    if value < 2**16:
+        return b"\xcd" + struct.pack(">H", value)
+    if value < 2**32:
+        return b"\xce" + struct.pack(">I", value)
+
+    return b"\xcf" + struct.pack(">Q", value)
+
+
+def encode_msgpack_str(value: str) -> bytes:
+    data = value.encode()
+    size = len(data)
+
+    if size < 32:
+        return bytes([0xA0 | size]) + data
+    if size < 2**8:
+        return b"\xd9" + struct.pack(">B", size) + data
+    if size < 2**16:
+        return b"\xda" + struct.pack(">H", size) + data
+
+    return b"\xdb" + struct.pack(">I", size) + data
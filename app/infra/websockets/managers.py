@@ -1,66 +1,441 @@
 import asyncio
+import bisect
+import logging
+import time
 from abc import (
     ABC,
     abstractmethod,
 )
-from collections import defaultdict
+from collections import OrderedDict
 from dataclasses import (
     dataclass,
     field,
 )
+from typing import (
+    Awaitable,
+    Callable,
+    Iterator,
+)
+
+from fastapi import (
+    status,
+    WebSocket,
+)
+
+from infra.websockets.formats import (
+    build_history_truncated_frames,
+    WireFormat,
+    WireFrames,
+)
+from infra.websockets.replay import ChatReplayBuffer
+from infra.websockets.senders import (
+    ConnectionSender,
+    OverflowPolicy,
+    SendQueueStats,
+)
+
+
+logger = logging.getLogger(__name__)
+
 
-from fastapi import WebSocket
+@dataclass(frozen=True)
+class ResumeBacklog:
+    frames: list[WireFrames]
+    # The load hit its limit, there may be more messages after the last frame.
+    is_truncated: bool = False
+
+
+BacklogLoader = Callable[[], Awaitable[ResumeBacklog]]
 
 
 @dataclass
 class BaseConnectionManager(ABC):
-    connections_map: dict[str, list[WebSocket]] = field(
-        default_factory=lambda: defaultdict(list),
+    connections_map: dict[str, set[WebSocket]] = field(
+        default_factory=dict,
         kw_only=True,
     )
 
     @abstractmethod
-    async def accept_connection(self, websocket: WebSocket, key: str): ...
+    async def accept_connection(
+        self,
+        websocket: WebSocket,
+        key: str,
+        since_message_oid: str | None = None,
+        wire_format: WireFormat | None = None,
+        resume_from: int | None = None,
+        load_backlog: BacklogLoader | None = None,
+        greeting: str | None = None,
+    ) -> bool: ...
 
     @abstractmethod
     async def remove_connection(self, websocket: WebSocket, key: str): ...
 
     @abstractmethod
-    async def send_all(self, key: str, bytes_: bytes): ...
+    async def send_all(self, key: str, bytes_: bytes | WireFrames): ...
 
     @abstractmethod
     async def disconnect_all(self, key: str): ...
 
+    @abstractmethod
+    def has_local_interest(self, key: bytes | None) -> bool: ...
+
+    def mark_alive(self, websocket: WebSocket) -> None: ...
+
+    def can_resume_locally(self, key: str, resume_from: int) -> bool:
+        return False
+
+
+@dataclass
+class ConnectionStats:
+    accepted_connections: int = 0
+    removed_connections: int = 0
+    reaped_connections: int = 0
+    rejected_connections: int = 0
+    disconnect_timeouts: int = 0
+
 
 @dataclass
 class ConnectionManager(BaseConnectionManager):
-    lock_map: dict[str, asyncio.Lock] = field(default_factory=dict)
+    send_queue_size: int = 256
+    overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST
+    replay_buffer: ChatReplayBuffer | None = None
+    # Connections that sent nothing for this long are closed, 0 disables it.
+    # Listen-only clients never send, so it is off by default and dead peers
+    # are found by the protocol level pings of the server instead.
+    idle_timeout: float = 0
+    # Bounds notifying and closing the sockets of a deleted chat, and every
+    # single socket of it.
+    disconnect_timeout: float = 5.0
+    disconnect_socket_timeout: float = 1.0
+    disconnect_concurrency: int = 64
+    # Deleted chats refuse connections for this long, which covers requests
+    # that checked the chat just before it was deleted.
+    deleted_chat_ttl: float = 60.0
+
+    stats: ConnectionStats = field(default_factory=ConnectionStats, init=False)
+    send_stats: SendQueueStats = field(default_factory=SendQueueStats, init=False)
+    senders_map: dict[WebSocket, ConnectionSender] = field(
+        default_factory=dict, init=False
+    )
+    # Encoded chat keys with at least one connection on this node, so broker
+    # records can be matched by their raw key.
+    interest_keys: set[bytes] = field(default_factory=set, init=False)
+    # Deleted chat keys mapped to when they may be connected to again.
+    deleted_keys: OrderedDict[str, float] = field(
+        default_factory=OrderedDict, init=False
+    )
+    _reaper: asyncio.Task | None = field(default=None, init=False, repr=False)
+    _background_tasks: set[asyncio.Task] = field(
+        default_factory=set, init=False, repr=False
+    )
+
+    @property
+    def connections_count(self) -> int:
+        return len(self.senders_map)
+
+    @property
+    def queued_frames(self) -> int:
+        return sum(sender.depth for sender in self.senders_map.values())
+
+    @property
+    def queued_bytes(self) -> int:
+        return sum(sender.queued_bytes for sender in self.senders_map.values())
+
+    async def accept_connection(
+        self,
+        websocket: WebSocket,
+        key: str,
+        since_message_oid: str | None = None,
+        wire_format: WireFormat | None = None,
+        resume_from: int | None = None,
+        load_backlog: BacklogLoader | None = None,
+        greeting: str | None = None,
+    ) -> bool:
+        # Without a negotiated subprotocol the client gets the full JSON events.
+        if wire_format is None:
+            await websocket.accept()
+        else:
+            await websocket.accept(subprotocol=wire_format.value)
 
-    async def accept_connection(self, websocket: WebSocket, key: str):
-        await websocket.accept()
+        # Nothing below awaits before the sender is registered, so membership
+        # changes never interleave and no per-chat lock is needed. A chat
+        # deleted while the socket was being accepted is caught here as well.
+        if self.is_deleted(key):
+            self.stats.rejected_connections += 1
+            await self._reject_connection(websocket)
+            return False
 
-        if key not in self.lock_map:
-            self.lock_map[key] = asyncio.Lock()
+        sender = ConnectionSender(
+            websocket=websocket,
+            key=key,
+            max_size=self.send_queue_size,
+            overflow_policy=self.overflow_policy,
+            stats=self.send_stats,
+            on_overflow=self._drop_connection,
+            on_failure=self._drop_connection,
+            wire_format=wire_format or WireFormat.JSON,
+            accepts_batches=wire_format is not None,
+            greeting=greeting,
+        )
+        self.connections_map.setdefault(key, set()).add(websocket)
+        self.senders_map[websocket] = sender
+        self.interest_keys.add(key.encode())
+        self.stats.accepted_connections += 1
 
-        async with self.lock_map[key]:
-            # TODO: проверять не находится ли чат в процессе удаления
-            self.connections_map[key].append(websocket)
+        # Live frames are held while the backlog loads, so the messages
+        # published meanwhile are merged in instead of lost when the replay
+        # buffer is off.
+        backlog, held = ResumeBacklog(frames=[]), []
+        if load_backlog is not None:
+            sender.hold()
+            try:
+                backlog = await load_backlog()
+            except BaseException:
+                await self.remove_connection(websocket=websocket, key=key)
+                raise
+
+            held = sender.release()
+            # Dropped meanwhile, e.g. since the chat was deleted.
+            if sender.is_closed:
+                return False
+
+        # Queued before any live frame can reach the new sender, so the client
+        # gets the recent messages first and in order.
+        if resume_from is not None:
+            for frame in self._get_resumed_frames(key, resume_from, backlog, held):
+                sender.enqueue(frame)
+        elif self.replay_buffer is not None:
+            for frame in self.replay_buffer.get_since(key, since_message_oid):
+                sender.enqueue(frame)
+
+        sender.start()
+        self._start_reaper()
+
+        return True
 
     async def remove_connection(self, websocket: WebSocket, key: str):
-        async with self.lock_map[key]:
-            self.connections_map[key].remove(websocket)
+        sender = self._forget(websocket, key)
+
+        if sender is not None:
+            await sender.close()
+
+    async def send_all(self, key: str, bytes_: bytes | WireFrames):
+        # Frames are only queued here, every connection is written by its own
+        # task, so a slow client delays nobody but itself. WireFrames are
+        # encoded once for every format in use, not once for every socket. The
+        # set is copied since an overflowing client is dropped from it right
+        # away.
+        for websocket in tuple(self.connections_map.get(key, ())):
+            self.senders_map[websocket].enqueue(bytes_)
+
+    def has_local_interest(self, key: bytes | None) -> bool:
+        if key in self.interest_keys:
+            return True
+
+        # Chats stay in the replay buffer for a while after the last client
+        # left, so clients that reconnect do not miss anything in between.
+        return (
+            key is not None
+            and self.replay_buffer is not None
+            and self.replay_buffer.has_chat(key.decode(errors="replace"))
+        )
 
-    async def send_all(self, key: str, bytes_: bytes):
-        for websocket in self.connections_map[key]:
-            await websocket.send_bytes(bytes_)
+    def mark_alive(self, websocket: WebSocket) -> None:
+        sender = self.senders_map.get(websocket)
+
+        if sender is not None:
+            sender.last_seen_at = time.monotonic()
+
+    def can_resume_locally(self, key: str, resume_from: int) -> bool:
+        return self.replay_buffer is not None and self.replay_buffer.covers_sequence(
+            key, resume_from
+        )
+
+    def is_deleted(self, key: str) -> bool:
+        now = time.monotonic()
+
+        while self.deleted_keys and next(iter(self.deleted_keys.values())) <= now:
+            self.deleted_keys.popitem(last=False)
+
+        return key in self.deleted_keys
 
     async def disconnect_all(self, key: str):
-        if key in self.lock_map:
-            async with self.lock_map[key]:
-                for websocket in self.connections_map[key]:
-                    await websocket.send_json(
-                        {
-                            "message": "Chat has been deleted",
-                        }
-                    )
-                    await websocket.close()
+        # The chat is forgotten before anything awaits, so new connections are
+        # refused and broadcasts find nobody while the sockets are closing.
+        self.deleted_keys[key] = time.monotonic() + self.deleted_chat_ttl
+        self.deleted_keys.move_to_end(key)
+
+        senders = [
+            sender
+            for websocket in tuple(self.connections_map.get(key, ()))
+            if (sender := self._forget(websocket, key)) is not None
+        ]
+        if self.replay_buffer is not None:
+            self.replay_buffer.discard(key)
+
+        # Writers are stopped right away, also for the sockets no worker gets
+        # to before the deadline.
+        for sender in senders:
+            await sender.close()
+
+        if not senders:
+            return
+
+        # A few workers share the sockets and every socket gets its own short
+        # timeout, so a stalled client holds up its worker only briefly. One
+        # deadline bounds the whole chat. A task per socket would cost more
+        # than the notice itself for most clients.
+        deadline = time.monotonic() + self.disconnect_timeout
+        pending_senders = iter(senders)
+        await asyncio.gather(
+            *[
+                self._close_deleted(pending_senders, deadline)
+                for _ in range(min(self.disconnect_concurrency, len(senders)))
+            ]
+        )
+
+        # The sockets no worker got to before the deadline are closed without
+        # the notice.
+        remaining = [sender.websocket for sender in pending_senders]
+        self.stats.disconnect_timeouts += len(remaining)
+        await asyncio.gather(*[self._force_close(websocket) for websocket in remaining])
+
+    async def _close_deleted(
+        self, senders: Iterator[ConnectionSender], deadline: float
+    ) -> None:
+        while (timeout := deadline - time.monotonic()) > 0:
+            sender = next(senders, None)
+
+            if sender is None:
+                return
+
+            try:
+                await asyncio.wait_for(
+                    self._send_deleted_notice(sender.websocket),
+                    timeout=min(self.disconnect_socket_timeout, timeout),
+                )
+            except asyncio.TimeoutError:
+                self.stats.disconnect_timeouts += 1
+                await self._force_close(sender.websocket)
+            except Exception:
+                logger.info("Websocket was already closed", exc_info=True)
+
+    async def _force_close(self, websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=status.WS_1001_GOING_AWAY),
+                timeout=self.disconnect_socket_timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.info("Websocket could not be closed in time")
+        except Exception:
+            logger.info("Websocket was already closed", exc_info=True)
+
+    async def _reject_connection(self, websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(
+                self._send_deleted_notice(websocket),
+                timeout=self.disconnect_socket_timeout,
+            )
+        except asyncio.TimeoutError:
+            self.stats.disconnect_timeouts += 1
+            await self._force_close(websocket)
+        except Exception:
+            logger.info("Websocket was already closed", exc_info=True)
+
+    @staticmethod
+    async def _send_deleted_notice(websocket: WebSocket) -> None:
+        await websocket.send_json(
+            {
+                "message": "Chat has been deleted",
+            }
+        )
+        await websocket.close()
+
+    def _get_resumed_frames(
+        self,
+        key: str,
+        resume_from: int,
+        backlog: ResumeBacklog,
+        held: list[bytes | WireFrames],
+    ) -> list[bytes | WireFrames]:
+        # The backlog was loaded from the database while the replay buffer and
+        # the held sender kept collecting, they overlap and are merged by
+        # position.
+        frames: dict[int, bytes | WireFrames] = {
+            frame.sequence: frame
+            for frame in backlog.frames
+            if frame.sequence is not None and frame.sequence > resume_from
+        }
+        if self.replay_buffer is not None:
+            frames.update(self.replay_buffer.get_after_sequence(key, resume_from))
+
+        unsequenced = []
+        for frame in held:
+            sequence = frame.sequence if isinstance(frame, WireFrames) else None
+
+            if sequence is None:
+                unsequenced.append(frame)
+            elif sequence > resume_from:
+                frames[sequence] = frame
+
+        sequences = sorted(frames)
+        resumed = [frames[sequence] for sequence in sequences]
+
+        # Unless the buffered frames go on right after a truncated backlog, the
+        # messages in between are missing and the client is told where the gap
+        # starts.
+        if backlog.is_truncated:
+            last = max(
+                (
+                    frame.sequence
+                    for frame in backlog.frames
+                    if frame.sequence is not None
+                ),
+                default=resume_from,
+            )
+            index = bisect.bisect_right(sequences, last)
+
+            if index == len(sequences) or sequences[index] != last + 1:
+                resumed.insert(index, build_history_truncated_frames(last))
+
+        return resumed + unsequenced
+
+    def _forget(self, websocket: WebSocket, key: str) -> ConnectionSender | None:
+        websockets = self.connections_map.get(key)
+
+        if websockets is not None:
+            websockets.discard(websocket)
+
+            if not websockets:
+                del self.connections_map[key]
+                self.interest_keys.discard(key.encode())
+
+        sender = self.senders_map.pop(websocket, None)
+        if sender is not None:
+            self.stats.removed_connections += 1
+
+        return sender
+
+    def _drop_connection(
+        self, sender: ConnectionSender, code: int = status.WS_1013_TRY_AGAIN_LATER
+    ) -> None:
+        self._forget(sender.websocket, sender.key)
+
+        task = asyncio.create_task(sender.disconnect(code=code))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _start_reaper(self) -> None:
+        if self.idle_timeout and (self._reaper is None or self._reaper.done()):
+            self._reaper = asyncio.create_task(self._run_reaper())
+
+    async def _run_reaper(self) -> None:
+        while self.senders_map:
+            await asyncio.sleep(self.idle_timeout / 2)
+            idle_since = time.monotonic() - self.idle_timeout
+
+            for sender in list(self.senders_map.values()):
+                if sender.last_seen_at < idle_since:
+                    self.stats.reaped_connections += 1
+                    self._drop_connection(sender, code=status.WS_1001_GOING_AWAY)
@@ -0,0 +1,192 @@
+import time
+from collections import (
+    deque,
+    OrderedDict,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from infra.websockets.formats import WireFrames
+
+
+# Rough per-message bookkeeping cost on top of the frame and the oid.
+MESSAGE_OVERHEAD_BYTES = 128
+
+
+@dataclass
+class ReplayBufferStats:
+    chats: int = 0
+    messages: int = 0
+    size_bytes: int = 0
+    evicted_chats: int = 0
+    replayed_messages: int = 0
+
+
+@dataclass
+class ChatReplay:
+    # (message_oid, sequence, frame), in the order the messages were consumed.
+    messages: deque[tuple[str, int | None, bytes | WireFrames]] = field(
+        default_factory=deque
+    )
+    size_bytes: int = 0
+    last_joined_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ChatReplayBuffer:
+    """Keeps the most recent messages of every chat followed on this node."""
+
+    max_messages_per_chat: int = 100
+    max_size_bytes: int = 64 * 1024 * 1024
+    idle_ttl: float = 900.0
+
+    stats: ReplayBufferStats = field(default_factory=ReplayBufferStats, init=False)
+    # Ordered from the least to the most recently joined chat.
+    _chats: OrderedDict[str, ChatReplay] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    def has_chat(self, chat_oid: str) -> bool:
+        return chat_oid in self._chats
+
+    def discard(self, chat_oid: str) -> None:
+        chat = self._chats.pop(chat_oid, None)
+
+        if chat is not None:
+            self.stats.size_bytes -= chat.size_bytes
+            self.stats.messages -= len(chat.messages)
+            self.stats.chats = len(self._chats)
+
+    def append(
+        self,
+        chat_oid: str,
+        message_oid: str,
+        frame: bytes | WireFrames,
+        sequence: int | None = None,
+    ) -> None:
+        self._evict_idle()
+
+        chat = self._chats.get(chat_oid)
+        if chat is None:
+            chat = self._chats[chat_oid] = ChatReplay()
+
+        size = self._get_size(message_oid, frame)
+        chat.messages.append((message_oid, sequence, frame))
+        chat.size_bytes += size
+        self.stats.size_bytes += size
+        self.stats.messages += 1
+
+        if len(chat.messages) > self.max_messages_per_chat:
+            self._drop_oldest(chat)
+
+        # Whole chats are evicted, the least recently joined first, so the
+        # buffers of the chats people are in stay complete.
+        while self.stats.size_bytes > self.max_size_bytes and self._chats:
+            self._evict(next(iter(self._chats)))
+
+        self.stats.chats = len(self._chats)
+
+    def get_since(
+        self, chat_oid: str, message_oid: str | None = None
+    ) -> list[bytes | WireFrames]:
+        """Frames after message_oid, or all of them if it is not buffered."""
+        chat = self._join(chat_oid)
+        if chat is None:
+            return []
+
+        frames = [frame for _, _, frame in chat.messages]
+        if message_oid is not None:
+            for index, (buffered_oid, _, _) in enumerate(chat.messages):
+                if buffered_oid == message_oid:
+                    frames = frames[index + 1 :]
+                    break
+
+        self.stats.replayed_messages += len(frames)
+
+        return frames
+
+    def covers_sequence(self, chat_oid: str, sequence: int) -> bool:
+        """Whether every message of the chat after `sequence` is buffered.
+
+        Unknown chats start being buffered, so whatever is consumed from now
+        on is kept while the caller loads the older part of the gap elsewhere.
+        """
+        chat = self._join(chat_oid)
+        if chat is None:
+            return False
+
+        sequences = sorted(
+            buffered for _, buffered, _ in chat.messages if buffered is not None
+        )
+        if not sequences or sequences[0] > sequence + 1:
+            return False
+
+        # Messages of a chat may be consumed slightly out of order, a gap means
+        # one of them has not arrived yet.
+        after = [buffered for buffered in sequences if buffered > sequence]
+        return after == list(range(sequence + 1, sequence + 1 + len(after)))
+
+    def get_after_sequence(
+        self, chat_oid: str, sequence: int
+    ) -> list[tuple[int, bytes | WireFrames]]:
+        chat = self._join(chat_oid)
+        if chat is None:
+            return []
+
+        frames = sorted(
+            (
+                (buffered, frame)
+                for _, buffered, frame in chat.messages
+                if buffered is not None and buffered > sequence
+            ),
+            key=lambda item: item[0],
+        )
+        self.stats.replayed_messages += len(frames)
+
+        return frames
+
+    def _join(self, chat_oid: str) -> ChatReplay | None:
+        # Returns None for a chat that was not buffered yet and is from now on.
+        self._evict_idle()
+
+        chat = self._chats.get(chat_oid)
+        if chat is None:
+            self._chats[chat_oid] = ChatReplay()
+            self.stats.chats = len(self._chats)
+            return None
+
+        chat.last_joined_at = time.monotonic()
+        self._chats.move_to_end(chat_oid)
+
+        return chat
+
+    def _drop_oldest(self, chat: ChatReplay) -> None:
+        message_oid, _, frame = chat.messages.popleft()
+        size = self._get_size(message_oid, frame)
+        chat.size_bytes -= size
+        self.stats.size_bytes -= size
+        self.stats.messages -= 1
+
+    def _evict(self, chat_oid: str) -> None:
+        chat = self._chats.pop(chat_oid)
+        self.stats.size_bytes -= chat.size_bytes
+        self.stats.messages -= len(chat.messages)
+        self.stats.evicted_chats += 1
+
+    def _evict_idle(self) -> None:
+        idle_since = time.monotonic() - self.idle_ttl
+
+        while self._chats:
+            chat_oid, chat = next(iter(self._chats.items()))
+            if chat.last_joined_at > idle_since:
+                break
+
+            self._evict(chat_oid)
+
+        self.stats.chats = len(self._chats)
+
+    @staticmethod
+    def _get_size(message_oid: str, frame: bytes | WireFrames) -> int:
+        return len(frame) + len(message_oid) + MESSAGE_OVERHEAD_BYTES
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import (
+    dataclass,
+    field,
+)
+from enum import Enum
+from typing import Callable
+
+from fastapi import (
+    status,
+    WebSocket,
+)
+
+from infra.websockets.formats import (
+    join_frames,
+    WireFormat,
+    WireFrames,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+@dataclass
+class SendQueueStats:
+    enqueued_frames: int = 0
+    sent_frames: int = 0
+    dropped_frames: int = 0
+    coalesced_frames: int = 0
+    disconnected_clients: int = 0
+
+
+@dataclass(eq=False)
+class ConnectionSender:
+    """Writes frames to one websocket from its own task and bounded queue."""
+
+    websocket: WebSocket
+    key: str
+    max_size: int
+    overflow_policy: OverflowPolicy
+    stats: SendQueueStats
+    on_overflow: Callable[["ConnectionSender"], None] = lambda sender: None
+    on_failure: Callable[["ConnectionSender"], None] = lambda sender: None
+    wire_format: WireFormat = WireFormat.JSON
+    # Only clients that negotiated a wire format understand array frames.
+    accepts_batches: bool = False
+    # A text frame written before anything queued, it is never dropped.
+    greeting: str | None = None
+
+    is_closed: bool = field(default=False, init=False)
+    queued_bytes: int = field(default=0, init=False)
+    last_seen_at: float = field(default_factory=time.monotonic, init=False)
+    # Every entry holds one or more frames, coalesced entries are sent as one
+    # array frame.
+    _entries: deque[list[bytes]] = field(default_factory=deque, init=False)
+    _has_entries: asyncio.Event = field(default_factory=asyncio.Event, init=False)
+    _writer: asyncio.Task | None = field(default=None, init=False, repr=False)
+    # Frames enqueued while the sender is held, kept as they came so they can
+    # be merged with the resumed messages.
+    _held: deque[bytes | WireFrames] | None = field(default=None, init=False)
+
+    @property
+    def depth(self) -> int:
+        return sum(len(entry) for entry in self._entries)
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._write_entries())
+
+    def hold(self) -> None:
+        self._held = deque(maxlen=self.max_size)
+
+    def release(self) -> list[bytes | WireFrames]:
+        held, self._held = self._held, None
+
+        return list(held or ())
+
+    def enqueue(self, frame: bytes | WireFrames) -> bool:
+        if self.is_closed:
+            return False
+
+        if self._held is not None:
+            # Bounded like the queue, the oldest frames go first.
+            if len(self._held) == self.max_size:
+                self.stats.dropped_frames += 1
+
+            self._held.append(frame)
+            return True
+
+        if isinstance(frame, WireFrames):
+            frame = frame.encode(self.wire_format)
+
+        self.stats.enqueued_frames += 1
+
+        if len(self._entries) >= self.max_size and not self._handle_overflow():
+            return False
+
+        self._entries.append([frame])
+        self.queued_bytes += len(frame)
+        self._has_entries.set()
+
+        return True
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+        self.stats.dropped_frames += sum(len(entry) for entry in self._entries)
+        self._entries.clear()
+        self.queued_bytes = 0
+
+    def _handle_overflow(self) -> bool:
+        # Clients that can not take array frames lose the oldest frames instead.
+        if self.overflow_policy == OverflowPolicy.DROP_OLDEST or (
+            self.overflow_policy == OverflowPolicy.COALESCE
+            and not (self.accepts_batches and self.wire_format.supports_batches)
+        ):
+            dropped = self._entries.popleft()
+            self.queued_bytes -= sum(len(frame) for frame in dropped)
+            self.stats.dropped_frames += len(dropped)
+            return True
+
+        if self.overflow_policy == OverflowPolicy.COALESCE:
+            coalesced = [frame for entry in self._entries for frame in entry]
+            self.stats.coalesced_frames += len(self._entries)
+            self._entries.clear()
+
+            # The batch holds at most a full queue, so a stalled client keeps
+            # losing its oldest frames instead of growing the batch forever.
+            dropped = coalesced[: -self.max_size]
+            coalesced = coalesced[-self.max_size :]
+            self.queued_bytes -= sum(len(frame) for frame in dropped)
+            self.stats.dropped_frames += len(dropped)
+
+            self._entries.append(coalesced)
+            return True
+
+        self.is_closed = True
+        self.stats.disconnected_clients += 1
+        self.stats.dropped_frames += 1
+        self.on_overflow(self)
+
+        return False
+
+    async def _write_entries(self) -> None:
+        try:
+            if self.greeting is not None:
+                await self.websocket.send_text(self.greeting)
+
+            while True:
+                await self._has_entries.wait()
+
+                while self._entries:
+                    entry = self._entries.popleft()
+                    self.queued_bytes -= sum(len(frame) for frame in entry)
+                    frame = join_frames(self.wire_format, entry)
+
+                    await self.websocket.send_bytes(frame)
+                    self.stats.sent_frames += len(entry)
+
+                self._has_entries.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.info("Stopped writing to a websocket that failed", exc_info=True)
+            await self.close()
+            self.on_failure(self)
+
+    async def disconnect(self, code: int = status.WS_1013_TRY_AGAIN_LATER) -> None:
+        await self.close()
+
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            logger.info("Websocket was already closed", exc_info=True)
@@ -1,13 +1,16 @@
 from dataclasses import dataclass
 
 from domain.entities.messages import Chat, ChatListener, Message
+from domain.exceptions.base import ApplicationException
 from domain.values.messages import Text, Title
+from infra.exceptions.messages import MessagesWriteException
 from infra.repositories.messages.base import BaseMessagesRepository
 from infra.repositories.messages.memory import BaseChatsRepository
 from logic.commands.base import BaseCommand, BaseCommandHandler
 from logic.exceptions.messages import (
     ChatNotFoundException,
     ChatWithThatTitleAlreadyExistsException,
+    MessageNotSavedException,
 )
 
 
@@ -50,15 +53,116 @@ class CreateMessageCommandHandler(BaseCommandHandler[CreateMessageCommand, Messa
         if not chat:
             raise ChatNotFoundException(chat_oid=command.chat_oid)
 
-        message = Message(text=Text(value=command.text), chat_oid=command.chat_oid)
+        text = Text(value=command.text)
+        sequence = await self.chats_repository.reserve_message_sequences(
+            chat_oid=command.chat_oid
+        )
+        if sequence is None:
+            raise ChatNotFoundException(chat_oid=command.chat_oid)
+
+        message = Message(text=text, chat_oid=command.chat_oid, sequence=sequence)
         chat.add_message(message)
-        await self.message_repository.add_message(message=message)
+
+        try:
+            await self.message_repository.add_message(message=message)
+        except Exception:
+            await self.chats_repository.uncount_messages(
+                chat_oid=command.chat_oid, count=1
+            )
+            raise
 
         await self._mediator.publish(chat.pull_events())
 
         return message
 
 
+@dataclass(frozen=True)
+class CreateMessagesBatchCommand(BaseCommand):
+    texts: tuple[str, ...]
+    chat_oid: str
+
+
+@dataclass(frozen=True)
+class CreateMessagesBatchCommandHandler(
+    BaseCommandHandler[CreateMessagesBatchCommand, list[Message | ApplicationException]]
+):
+    chats_repository: BaseChatsRepository
+    message_repository: BaseMessagesRepository
+
+    async def handle(
+        self, command: CreateMessagesBatchCommand
+    ) -> list[Message | ApplicationException]:
+        chat = await self.chats_repository.get_chat_by_oid(oid=command.chat_oid)
+        if not chat:
+            raise ChatNotFoundException(chat_oid=command.chat_oid)
+
+        texts: list[Text | ApplicationException] = []
+
+        for text in command.texts:
+            try:
+                texts.append(Text(value=text))
+            except ApplicationException as exception:
+                texts.append(exception)
+
+        valid_count = sum(isinstance(text, Text) for text in texts)
+        # One round trip reserves the positions of the whole batch.
+        sequence = 0
+        if valid_count:
+            sequence = await self.chats_repository.reserve_message_sequences(
+                chat_oid=command.chat_oid, count=valid_count
+            )
+            if sequence is None:
+                raise ChatNotFoundException(chat_oid=command.chat_oid)
+
+        results: list[Message | ApplicationException] = []
+        messages: list[Message] = []
+
+        for text in texts:
+            if not isinstance(text, Text):
+                results.append(text)
+                continue
+
+            message = Message(text=text, chat_oid=command.chat_oid, sequence=sequence)
+            sequence += 1
+            messages.append(message)
+            results.append(message)
+
+        # Messages rejected by the storage fail on their own, the rest of the
+        # batch is still saved and published.
+        write_errors: dict[str, str] = {}
+
+        try:
+            await self.message_repository.add_messages(messages=messages)
+        except MessagesWriteException as exception:
+            write_errors = {
+                messages[index].oid: reason
+                for index, reason in exception.errors.items()
+            }
+        except Exception:
+            await self.chats_repository.uncount_messages(
+                chat_oid=command.chat_oid, count=len(messages)
+            )
+            raise
+
+        if write_errors:
+            await self.chats_repository.uncount_messages(
+                chat_oid=command.chat_oid, count=len(write_errors)
+            )
+
+        for message in messages:
+            if message.oid not in write_errors:
+                chat.add_message(message)
+
+        await self._mediator.publish(chat.pull_events())
+
+        return [
+            MessageNotSavedException(reason=write_errors[result.oid])
+            if isinstance(result, Message) and result.oid in write_errors
+            else result
+            for result in results
+        ]
+
+
 @dataclass(frozen=True)
 class DeleteChatCommand(BaseCommand):
     chat_oid: str
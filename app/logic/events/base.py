@@ -23,10 +23,16 @@ class IntegrationEvent(BaseEvent, ABC): ...
 
 
 @dataclass
-class EventHandler(ABC, Generic[ET, ER]):
+class BaseEventHandler(ABC, Generic[ET, ER]):
+    @abstractmethod
+    def handle(self, event: ET) -> ER: ...
+
+    async def handle_batch(self, events: list[ET]) -> list[ER]:
+        return [await self.handle(event) for event in events]
+
+
+@dataclass
+class EventHandler(BaseEventHandler[ET, ER]):
     message_broker: BaseMessageBroker
     connection_manager: BaseConnectionManager
     broker_topic: str | None = None
-
-    @abstractmethod
-    def handle(self, event: ET) -> ER: ...
@@ -1,6 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import (
+    dataclass,
+    field,
+)
 from typing import ClassVar
 
+from domain.entities.messages import Message
+from domain.events.base import BaseEvent
 from domain.events.messages import (
     ChatDeletedEvent,
     ListenerAddedEvent,
@@ -9,7 +14,12 @@ from domain.events.messages import (
     NewMessageReceivedEvent,
 )
 from infra.message_brokers.converters import convert_event_to_broker_message
+from infra.message_brokers.dots import BrokerMessage
+from infra.repositories.messages.cache import CachedChatsRepository
+from infra.websockets.formats import WireFrames
+from infra.websockets.replay import ChatReplayBuffer
 from logic.events.base import (
+    BaseEventHandler,
     EventHandler,
     IntegrationEvent,
 )
@@ -54,6 +64,20 @@ class NewMessageReceivedEventHandler(EventHandler[NewMessageReceivedEvent, None]
             key=event.chat_oid.encode(),
         )
 
+    async def handle_batch(self, events: list[NewMessageReceivedEvent]) -> list[None]:
+        await self.message_broker.send_messages(
+            [
+                BrokerMessage(
+                    topic=self.broker_topic,
+                    value=convert_event_to_broker_message(event=event),
+                    key=event.chat_oid.encode(),
+                )
+                for event in events
+            ]
+        )
+
+        return [None] * len(events)
+
 
 @dataclass
 class NewMessageReceivedFromBrokerEvent(IntegrationEvent):
@@ -62,17 +86,52 @@ class NewMessageReceivedFromBrokerEvent(IntegrationEvent):
     message_text: str
     message_oid: str
     chat_oid: str
+    sequence: int | None = None
+
+
+def convert_event_to_wire_frames(
+    event: NewMessageReceivedFromBrokerEvent,
+) -> WireFrames:
+    fields = {
+        "message_oid": event.message_oid,
+        "chat_oid": event.chat_oid,
+        "message_text": event.message_text,
+    }
+    if event.sequence is not None:
+        fields["sequence"] = event.sequence
+
+    return WireFrames(json=convert_event_to_broker_message(event=event), fields=fields)
+
+
+def convert_message_to_wire_frames(message: Message) -> WireFrames:
+    return convert_event_to_wire_frames(
+        NewMessageReceivedFromBrokerEvent(
+            message_text=message.text.as_generic_type(),
+            message_oid=message.oid,
+            chat_oid=message.chat_oid,
+            sequence=message.sequence,
+        )
+    )
 
 
 @dataclass
 class NewMessageReceivedFromBrokerEventHandler(
     EventHandler[NewMessageReceivedFromBrokerEvent, None]
 ):
+    replay_buffer: ChatReplayBuffer | None = field(default=None, kw_only=True)
+
     async def handle(self, event: NewMessageReceivedFromBrokerEvent) -> None:
-        await self.connection_manager.send_all(
-            key=event.chat_oid,
-            bytes_=convert_event_to_broker_message(event=event),
-        )
+        frame = convert_event_to_wire_frames(event)
+
+        if self.replay_buffer is not None:
+            self.replay_buffer.append(
+                chat_oid=event.chat_oid,
+                message_oid=event.message_oid,
+                frame=frame,
+                sequence=event.sequence,
+            )
+
+        await self.connection_manager.send_all(key=event.chat_oid, bytes_=frame)
 
 
 @dataclass
@@ -84,3 +143,33 @@ class ChatDeletedEventHandler(EventHandler[ChatDeletedEvent, None]):
             key=event.chat_oid.encode(),
         )
         await self.connection_manager.disconnect_all(event.chat_oid)
+
+
+@dataclass
+class ChatDeletedFromBrokerEvent(IntegrationEvent):
+    event_title: ClassVar[str] = "Chat Deleted Event From Broker Received"
+
+    chat_oid: str
+
+
+@dataclass
+class ChatDeletedFromBrokerEventHandler(EventHandler[ChatDeletedFromBrokerEvent, None]):
+    # The sockets of a chat may be held by another node than the one that
+    # deleted it.
+    async def handle(self, event: ChatDeletedFromBrokerEvent) -> None:
+        await self.connection_manager.disconnect_all(event.chat_oid)
+
+
+@dataclass
+class ChatListenersChangedFromBrokerEvent(IntegrationEvent):
+    event_title: ClassVar[str] = "Chat Listeners Changed Event From Broker Received"
+
+    chat_oid: str
+
+
+@dataclass
+class InvalidateChatCacheEventHandler(BaseEventHandler[BaseEvent, None]):
+    chats_cache: CachedChatsRepository
+
+    async def handle(self, event: BaseEvent) -> None:
+        self.chats_cache.invalidate(event.chat_oid)
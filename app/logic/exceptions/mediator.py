@@ -19,3 +19,12 @@ class CommandHandlersNotRegisteredException(LogicException):
     @property
     def message(self):
         return f"Could not find handlers for the command: {self.command_type}"
+
+
+@dataclass(eq=False)
+class MediatorFrozenException(LogicException):
+    registered_type: type
+
+    @property
+    def message(self):
+        return f"Mediator is frozen, could not register handlers for: {self.registered_type}"
@@ -19,3 +19,12 @@ class ChatNotFoundException(LogicException):
     @property
     def message(self):
         return f"A chat with the same oid not found: {self.chat_oid}"
+
+
+@dataclass(eq=False)
+class MessageNotSavedException(LogicException):
+    reason: str
+
+    @property
+    def message(self):
+        return f"The message could not be saved: {self.reason}"
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from functools import lru_cache
 from uuid import uuid4
 
@@ -21,18 +22,46 @@ from domain.events.messages import (
 )
 from infra.message_brokers.base import BaseMessageBroker
 from infra.message_brokers.kafka import KafkaMessageBroker
+from infra.message_brokers.outbox import (
+    OutboxMessageBroker,
+    OutboxRelay,
+)
+from infra.message_brokers.profiles import get_producer_settings
+from infra.message_brokers.routing import (
+    ChatNode,
+    PartitionOwnershipMap,
+)
 from infra.repositories.messages.base import (
     BaseChatsRepository,
     BaseMessagesRepository,
 )
+from infra.repositories.messages.buckets import (
+    BucketedMongoDBMessagesRepository,
+    MessagesStorageLayout,
+)
+from infra.repositories.messages.cache import CachedChatsRepository
+from infra.repositories.messages.group_commit import GroupCommitMessagesRepository
+from infra.repositories.messages.memory import (
+    MemoryChatRepository,
+    MemoryMessagesRepository,
+    StorageBackend,
+)
 from infra.repositories.messages.mongo import (
     MongoDBChatsRepository,
     MongoDBMessagesRepository,
 )
+from infra.repositories.outbox.base import BaseOutboxRepository
+from infra.repositories.outbox.mongo import MongoDBOutboxRepository
+from infra.repositories.transactions import (
+    BaseTransactionManager,
+    MongoDBTransactionManager,
+    NullTransactionManager,
+)
 from infra.websockets.managers import (
     BaseConnectionManager,
     ConnectionManager,
 )
+from infra.websockets.replay import ChatReplayBuffer
 from logic.commands.messages import (
     AddTelegramListenerCommand,
     AddTelegramListenerCommandHandler,
@@ -40,6 +69,8 @@ from logic.commands.messages import (
     CreateChatCommandHandler,
     CreateMessageCommand,
     CreateMessageCommandHandler,
+    CreateMessagesBatchCommand,
+    CreateMessagesBatchCommandHandler,
     DeleteChatCommand,
     DeleteChatCommandHandler,
     DeleteChatListenerCommandHandler,
@@ -47,6 +78,10 @@ from logic.commands.messages import (
 )
 from logic.events.messages import (
     ChatDeletedEventHandler,
+    ChatDeletedFromBrokerEvent,
+    ChatDeletedFromBrokerEventHandler,
+    ChatListenersChangedFromBrokerEvent,
+    InvalidateChatCacheEventHandler,
     ListenerAddedEventHandler,
     ListenerDeletedEventHandler,
     NewChatCreatedEventHandler,
@@ -55,14 +90,23 @@ from logic.events.messages import (
     NewMessageReceivedFromBrokerEventHandler,
 )
 from logic.mediator.base import Mediator
-from logic.mediator.event import EventMediator
+from logic.mediator.event import (
+    EventMediator,
+    EventPublishMode,
+)
 from logic.queries.messages import (
+    ExportMessagesQuery,
+    ExportMessagesQueryHandler,
     GetAllChatsListenersQuery,
     GetAllChatsListenersQueryHandler,
     GetAllChatsQuery,
     GetAllChatsQueryHandler,
     GetChatDetailQuery,
     GetChatDetailQueryHandler,
+    GetChatRouteQuery,
+    GetChatRouteQueryHandler,
+    GetMessagesAfterSequenceQuery,
+    GetMessagesAfterSequenceQueryHandler,
     GetMessagesQuery,
     GetMessagesQueryHandler,
 )
@@ -74,10 +118,15 @@ def init_container() -> Container:
     return _init_container()
 
 
-def _init_container() -> Container:
+@lru_cache(1)
+def get_mediator() -> Mediator:
+    return init_container().resolve(Mediator)
+
+
+def _init_container(config: Config | None = None) -> Container:
     container = Container()
 
-    container.register(Config, instance=Config(), scope=Scope.singleton)
+    container.register(Config, instance=config or Config(), scope=Scope.singleton)
 
     config: Config = container.resolve(Config)
 
@@ -92,30 +141,118 @@ def _init_container() -> Container:
     )
     client = container.resolve(AsyncIOMotorClient)
 
-    def init_chats_mongodb_repository() -> BaseChatsRepository:
+    def init_chats_mongodb_repository() -> MongoDBChatsRepository:
         return MongoDBChatsRepository(
             mongo_db_client=client,
             mongo_db_db_name=config.mongodb_chat_database,
             mongo_db_collection_name=config.mongodb_chat_collection,
         )
 
-    def init_messages_mongodb_repository() -> BaseMessagesRepository:
+    def init_messages_mongodb_repository() -> MongoDBMessagesRepository:
         return MongoDBMessagesRepository(
             mongo_db_client=client,
             mongo_db_db_name=config.mongodb_chat_database,
             mongo_db_collection_name=config.mongodb_messages_collection,
         )
 
+    def init_message_buckets_mongodb_repository() -> BucketedMongoDBMessagesRepository:
+        return BucketedMongoDBMessagesRepository(
+            mongo_db_client=client,
+            mongo_db_db_name=config.mongodb_chat_database,
+            mongo_db_collection_name=config.mongodb_message_buckets_collection,
+            bucket_size=config.messages_bucket_size,
+            bucket_window=timedelta(seconds=config.messages_bucket_window_seconds),
+        )
+
     container.register(
-        BaseChatsRepository,
+        MongoDBChatsRepository,
         factory=init_chats_mongodb_repository,
         scope=Scope.singleton,
     )
     container.register(
-        BaseMessagesRepository,
+        MongoDBMessagesRepository,
         factory=init_messages_mongodb_repository,
         scope=Scope.singleton,
     )
+    container.register(
+        BucketedMongoDBMessagesRepository,
+        factory=init_message_buckets_mongodb_repository,
+        scope=Scope.singleton,
+    )
+
+    def init_chats_cache() -> CachedChatsRepository:
+        return CachedChatsRepository(
+            chats_repository=container.resolve(MongoDBChatsRepository),
+            max_size=config.chats_cache_max_size,
+            ttl=config.chats_cache_ttl,
+        )
+
+    container.register(
+        CachedChatsRepository,
+        factory=init_chats_cache,
+        scope=Scope.singleton,
+    )
+
+    # Kept in the process, nothing in front of them needs caching.
+    memory_messages_repository = MemoryMessagesRepository()
+    container.register(
+        MemoryChatRepository,
+        instance=MemoryChatRepository(messages_repository=memory_messages_repository),
+        scope=Scope.singleton,
+    )
+    container.register(
+        MemoryMessagesRepository,
+        instance=memory_messages_repository,
+        scope=Scope.singleton,
+    )
+    is_in_memory = config.storage_backend == StorageBackend.MEMORY
+
+    def init_chats_repository() -> BaseChatsRepository:
+        if is_in_memory:
+            return container.resolve(MemoryChatRepository)
+
+        if not config.chats_cache_enabled:
+            return container.resolve(MongoDBChatsRepository)
+
+        return container.resolve(CachedChatsRepository)
+
+    container.register(
+        BaseChatsRepository,
+        factory=init_chats_repository,
+        scope=Scope.singleton,
+    )
+
+    def init_group_commit_messages_repository() -> GroupCommitMessagesRepository:
+        return GroupCommitMessagesRepository(
+            messages_repository=container.resolve(MongoDBMessagesRepository),
+            max_delay_ms=config.messages_group_commit_max_delay_ms,
+            max_batch_size=config.messages_group_commit_max_batch_size,
+        )
+
+    container.register(
+        GroupCommitMessagesRepository,
+        factory=init_group_commit_messages_repository,
+        scope=Scope.singleton,
+    )
+
+    def init_messages_repository() -> BaseMessagesRepository:
+        if is_in_memory:
+            return container.resolve(MemoryMessagesRepository)
+
+        # Config refuses the group commit together with buckets.
+        if config.messages_storage_layout == MessagesStorageLayout.BUCKET:
+            return container.resolve(BucketedMongoDBMessagesRepository)
+
+        if not config.messages_group_commit_enabled:
+            return container.resolve(MongoDBMessagesRepository)
+
+        return container.resolve(GroupCommitMessagesRepository)
+
+    container.register(
+        BaseMessagesRepository,
+        factory=init_messages_repository,
+        scope=Scope.singleton,
+    )
 
     # Command handlers
     container.register(CreateChatCommandHandler)
@@ -124,161 +261,338 @@ def _init_container() -> Container:
     # Query Handlers
     container.register(GetChatDetailQueryHandler)
     container.register(GetMessagesQueryHandler)
+    container.register(GetMessagesAfterSequenceQueryHandler)
+    container.register(ExportMessagesQueryHandler)
     container.register(GetAllChatsQueryHandler)
     container.register(GetAllChatsListenersQueryHandler)
+    container.register(GetChatRouteQueryHandler)
+
+    def create_message_broker() -> KafkaMessageBroker:
+        producer_settings = get_producer_settings(
+            profile=config.kafka_producer_profile,
+            linger_ms=config.kafka_producer_linger_ms,
+            max_batch_size=config.kafka_producer_max_batch_size,
+            compression_type=config.kafka_producer_compression_type,
+        )
 
-    def create_message_broker() -> BaseMessageBroker:
         return KafkaMessageBroker(
-            producer=AIOKafkaProducer(bootstrap_servers=config.kafka_url),
+            producer=AIOKafkaProducer(
+                bootstrap_servers=config.kafka_url,
+                **producer_settings.to_producer_kwargs(),
+            ),
             consumer=AIOKafkaConsumer(
                 bootstrap_servers=config.kafka_url,
                 group_id=f"chats-{uuid4()}",
                 metadata_max_age_ms=30000,
+                enable_auto_commit=False,
             ),
+            max_in_flight_messages=config.kafka_max_in_flight_messages,
         )
 
     # Message Broker
     container.register(
-        BaseMessageBroker, factory=create_message_broker, scope=Scope.singleton
+        KafkaMessageBroker, factory=create_message_broker, scope=Scope.singleton
     )
 
+    # Outbox
+    def init_outbox_mongodb_repository() -> BaseOutboxRepository:
+        return MongoDBOutboxRepository(
+            mongo_db_client=client,
+            mongo_db_db_name=config.mongodb_chat_database,
+            mongo_db_collection_name=config.mongodb_outbox_collection,
+        )
+
     container.register(
-        BaseConnectionManager, instance=ConnectionManager(), scope=Scope.singleton
+        BaseOutboxRepository,
+        factory=init_outbox_mongodb_repository,
+        scope=Scope.singleton,
     )
 
-    # Mediator
-    def init_mediator() -> Mediator:
-        mediator = Mediator()
+    def init_message_broker() -> BaseMessageBroker:
+        # The outbox makes events as durable as the MongoDB writes they come
+        # with, in memory there are none.
+        if not config.outbox_enabled or is_in_memory:
+            return container.resolve(KafkaMessageBroker)
 
-        # command handlers
-        create_chat_handler = CreateChatCommandHandler(
-            _mediator=mediator,
-            chats_repository=container.resolve(BaseChatsRepository),
-        )
-        create_message_handler = CreateMessageCommandHandler(
-            _mediator=mediator,
-            message_repository=container.resolve(BaseMessagesRepository),
-            chats_repository=container.resolve(BaseChatsRepository),
-        )
-        delete_chat_handler = DeleteChatCommandHandler(
-            _mediator=mediator,
-            chats_repository=container.resolve(BaseChatsRepository),
-        )
-        add_telegram_listener_handler = AddTelegramListenerCommandHandler(
-            _mediator=mediator,
-            chats_repository=container.resolve(BaseChatsRepository),
+        return OutboxMessageBroker(
+            message_broker=container.resolve(KafkaMessageBroker),
+            outbox_repository=container.resolve(BaseOutboxRepository),
         )
 
-        delete_telegram_listener_handler = DeleteChatListenerCommandHandler(
-            _mediator=mediator,
-            chats_repository=container.resolve(BaseChatsRepository),
-        )
+    container.register(
+        BaseMessageBroker, factory=init_message_broker, scope=Scope.singleton
+    )
 
-        # event handlers
-        new_chat_created_event_handler = NewChatCreatedEventHandler(
-            broker_topic=config.new_chats_event_topic,
-            message_broker=container.resolve(BaseMessageBroker),
-            connection_manager=container.resolve(BaseConnectionManager),
-        )
-        new_message_received_handler = NewMessageReceivedEventHandler(
-            message_broker=container.resolve(BaseMessageBroker),
-            broker_topic=config.new_message_received_topic,
-            connection_manager=container.resolve(BaseConnectionManager),
+    def init_outbox_relay() -> OutboxRelay:
+        return OutboxRelay(
+            outbox_repository=container.resolve(BaseOutboxRepository),
+            message_broker=container.resolve(KafkaMessageBroker),
+            batch_size=config.outbox_relay_batch_size,
+            poll_interval=config.outbox_relay_poll_interval,
+            lease_seconds=config.outbox_relay_lease_seconds,
         )
-        new_message_received_from_broker_event_handler = (
-            NewMessageReceivedFromBrokerEventHandler(
-                message_broker=container.resolve(BaseMessageBroker),
-                broker_topic=config.new_message_received_topic,
-                connection_manager=container.resolve(BaseConnectionManager),
+
+    container.register(OutboxRelay, factory=init_outbox_relay, scope=Scope.singleton)
+
+    def init_transaction_manager() -> BaseTransactionManager:
+        if not config.mongodb_transactions_enabled or is_in_memory:
+            return NullTransactionManager()
+
+        return MongoDBTransactionManager(mongo_db_client=client)
+
+    container.register(
+        BaseTransactionManager,
+        factory=init_transaction_manager,
+        scope=Scope.singleton,
+    )
+
+    # Chat routing
+    def init_partition_ownership_map() -> PartitionOwnershipMap:
+        if not config.chat_routing_enabled:
+            # This node owns every chat.
+            return PartitionOwnershipMap(
+                partitions_count=config.chat_routing_partitions,
+                nodes=(ChatNode(node_id=config.chat_routing_node_id, url=""),),
+                local_node_id=config.chat_routing_node_id,
             )
+
+        return PartitionOwnershipMap.from_string(
+            nodes=config.chat_routing_nodes,
+            partitions_count=config.chat_routing_partitions,
+            local_node_id=config.chat_routing_node_id,
         )
-        chat_deleted_event_handler = ChatDeletedEventHandler(
-            message_broker=container.resolve(BaseMessageBroker),
-            broker_topic=config.chat_deleted_topic,
-            connection_manager=container.resolve(BaseConnectionManager),
+
+    container.register(
+        PartitionOwnershipMap,
+        factory=init_partition_ownership_map,
+        scope=Scope.singleton,
+    )
+
+    replay_buffer = None
+    if config.replay_buffer_enabled:
+        replay_buffer = ChatReplayBuffer(
+            max_messages_per_chat=config.replay_buffer_messages_per_chat,
+            max_size_bytes=config.replay_buffer_max_size_bytes,
+            idle_ttl=config.replay_buffer_idle_ttl,
         )
-        new_listener_added_handler = ListenerAddedEventHandler(
-            message_broker=container.resolve(BaseMessageBroker),
-            broker_topic=config.new_listener_added_topic,
-            connection_manager=container.resolve(BaseConnectionManager),
+        container.register(
+            ChatReplayBuffer, instance=replay_buffer, scope=Scope.singleton
         )
 
-        listener_deleted_handler = ListenerDeletedEventHandler(
+    container.register(
+        BaseConnectionManager,
+        instance=ConnectionManager(
+            send_queue_size=config.websocket_send_queue_size,
+            overflow_policy=config.websocket_overflow_policy,
+            replay_buffer=replay_buffer,
+            idle_timeout=config.websocket_idle_timeout,
+            disconnect_timeout=config.websocket_disconnect_timeout,
+            disconnect_socket_timeout=config.websocket_disconnect_socket_timeout,
+        ),
+        scope=Scope.singleton,
+    )
+
+    # Mediator
+
+    container.register(
+        Mediator, factory=lambda: init_mediator(container), scope=Scope.singleton
+    )
+    container.register(
+        EventMediator,
+        factory=lambda: container.resolve(Mediator),
+        scope=Scope.singleton,
+    )
+
+    container.register(Scheduler, factory=lambda: Scheduler(), scope=Scope.singleton)
+
+    return container
+
+
+def init_mediator(container: Container) -> Mediator:
+    """Builds the mediator and its handlers from the container.
+
+    The container keeps the result as a singleton, call this directly only to
+    get a fresh mediator.
+    """
+    config: Config = container.resolve(Config)
+    replay_buffer = None
+    if config.replay_buffer_enabled:
+        replay_buffer = container.resolve(ChatReplayBuffer)
+
+    mediator = Mediator(
+        max_concurrent_handlers=config.event_handlers_concurrency,
+        handler_timeout=config.event_handler_timeout,
+        transaction_manager=container.resolve(BaseTransactionManager),
+    )
+
+    # command handlers
+    create_chat_handler = CreateChatCommandHandler(
+        _mediator=mediator,
+        chats_repository=container.resolve(BaseChatsRepository),
+    )
+    create_message_handler = CreateMessageCommandHandler(
+        _mediator=mediator,
+        message_repository=container.resolve(BaseMessagesRepository),
+        chats_repository=container.resolve(BaseChatsRepository),
+    )
+    create_messages_batch_handler = CreateMessagesBatchCommandHandler(
+        _mediator=mediator,
+        message_repository=container.resolve(BaseMessagesRepository),
+        chats_repository=container.resolve(BaseChatsRepository),
+    )
+    delete_chat_handler = DeleteChatCommandHandler(
+        _mediator=mediator,
+        chats_repository=container.resolve(BaseChatsRepository),
+    )
+    add_telegram_listener_handler = AddTelegramListenerCommandHandler(
+        _mediator=mediator,
+        chats_repository=container.resolve(BaseChatsRepository),
+    )
+
+    delete_telegram_listener_handler = DeleteChatListenerCommandHandler(
+        _mediator=mediator,
+        chats_repository=container.resolve(BaseChatsRepository),
+    )
+
+    # event handlers
+    new_chat_created_event_handler = NewChatCreatedEventHandler(
+        broker_topic=config.new_chats_event_topic,
+        message_broker=container.resolve(BaseMessageBroker),
+        connection_manager=container.resolve(BaseConnectionManager),
+    )
+    new_message_received_handler = NewMessageReceivedEventHandler(
+        message_broker=container.resolve(BaseMessageBroker),
+        broker_topic=config.new_message_received_topic,
+        connection_manager=container.resolve(BaseConnectionManager),
+    )
+    new_message_received_from_broker_event_handler = (
+        NewMessageReceivedFromBrokerEventHandler(
             message_broker=container.resolve(BaseMessageBroker),
-            broker_topic=config.listener_deleted_topic,
+            broker_topic=config.new_message_received_topic,
             connection_manager=container.resolve(BaseConnectionManager),
+            replay_buffer=replay_buffer,
         )
+    )
+    chat_deleted_event_handler = ChatDeletedEventHandler(
+        message_broker=container.resolve(BaseMessageBroker),
+        broker_topic=config.chat_deleted_topic,
+        connection_manager=container.resolve(BaseConnectionManager),
+    )
+    chat_deleted_from_broker_event_handler = ChatDeletedFromBrokerEventHandler(
+        message_broker=container.resolve(BaseMessageBroker),
+        connection_manager=container.resolve(BaseConnectionManager),
+    )
+    new_listener_added_handler = ListenerAddedEventHandler(
+        message_broker=container.resolve(BaseMessageBroker),
+        broker_topic=config.new_listener_added_topic,
+        connection_manager=container.resolve(BaseConnectionManager),
+    )
 
-        # events
-        mediator.register_event(
-            NewChatCreatedEvent,
-            [new_chat_created_event_handler],
-        )
-        mediator.register_event(
-            NewMessageReceivedEvent,
-            [new_message_received_handler],
-        )
-        mediator.register_event(
-            NewMessageReceivedFromBrokerEvent,
-            [new_message_received_from_broker_event_handler],
-        )
-        mediator.register_event(
-            ChatDeletedEvent,
-            [chat_deleted_event_handler],
-        )
-        mediator.register_event(
-            ListenerAddedEvent,
-            [new_listener_added_handler],
-        )
-        mediator.register_event(
-            ListenerDeletedEvent,
-            [listener_deleted_handler],
-        )
+    listener_deleted_handler = ListenerDeletedEventHandler(
+        message_broker=container.resolve(BaseMessageBroker),
+        broker_topic=config.listener_deleted_topic,
+        connection_manager=container.resolve(BaseConnectionManager),
+    )
 
-        # commands
-        mediator.register_command(
-            CreateChatCommand,
-            [create_chat_handler],
-        )
-        mediator.register_command(
-            CreateMessageCommand,
-            [create_message_handler],
-        )
-        mediator.register_command(
-            DeleteChatCommand,
-            [delete_chat_handler],
-        )
-        mediator.register_command(
-            AddTelegramListenerCommand,
-            [add_telegram_listener_handler],
-        )
-        mediator.register_command(
-            DeleteTelegramListenerCommand, [delete_telegram_listener_handler]
-        )
+    chats_cache_handlers = []
 
-        # Queries
-        mediator.register_query(
-            GetChatDetailQuery,
-            container.resolve(GetChatDetailQueryHandler),
-        )
-        mediator.register_query(
-            GetMessagesQuery,
-            container.resolve(GetMessagesQueryHandler),
-        )
-        mediator.register_query(
-            GetAllChatsQuery,
-            container.resolve(GetAllChatsQueryHandler),
-        )
-        mediator.register_query(
-            GetAllChatsListenersQuery,
-            container.resolve(GetAllChatsListenersQueryHandler),
+    if config.chats_cache_enabled:
+        chats_cache_handlers.append(
+            InvalidateChatCacheEventHandler(
+                chats_cache=container.resolve(CachedChatsRepository),
+            )
         )
 
-        return mediator
+    # events
+    mediator.register_event(
+        NewChatCreatedEvent,
+        [new_chat_created_event_handler],
+    )
+    mediator.register_event(
+        NewMessageReceivedEvent,
+        [new_message_received_handler],
+    )
+    mediator.register_event(
+        NewMessageReceivedFromBrokerEvent,
+        [new_message_received_from_broker_event_handler],
+        publish_mode=EventPublishMode.CONCURRENT,
+    )
+    mediator.register_event(
+        ChatDeletedEvent,
+        [chat_deleted_event_handler, *chats_cache_handlers],
+    )
+    mediator.register_event(
+        ListenerAddedEvent,
+        [new_listener_added_handler, *chats_cache_handlers],
+    )
+    mediator.register_event(
+        ListenerDeletedEvent,
+        [listener_deleted_handler, *chats_cache_handlers],
+    )
+    mediator.register_event(
+        ChatDeletedFromBrokerEvent,
+        [chat_deleted_from_broker_event_handler, *chats_cache_handlers],
+    )
+    mediator.register_event(
+        ChatListenersChangedFromBrokerEvent,
+        chats_cache_handlers,
+    )
+
+    # commands
+    mediator.register_command(
+        CreateChatCommand,
+        [create_chat_handler],
+    )
+    mediator.register_command(
+        CreateMessageCommand,
+        [create_message_handler],
+    )
+    mediator.register_command(
+        CreateMessagesBatchCommand,
+        [create_messages_batch_handler],
+    )
+    mediator.register_command(
+        DeleteChatCommand,
+        [delete_chat_handler],
+    )
+    mediator.register_command(
+        AddTelegramListenerCommand,
+        [add_telegram_listener_handler],
+    )
+    mediator.register_command(
+        DeleteTelegramListenerCommand, [delete_telegram_listener_handler]
+    )
 
-    container.register(Mediator, factory=init_mediator)
-    container.register(EventMediator, factory=init_mediator)
+    # Queries
+    mediator.register_query(
+        GetChatDetailQuery,
+        container.resolve(GetChatDetailQueryHandler),
+    )
+    mediator.register_query(
+        GetMessagesQuery,
+        container.resolve(GetMessagesQueryHandler),
+    )
+    mediator.register_query(
+        GetMessagesAfterSequenceQuery,
+        container.resolve(GetMessagesAfterSequenceQueryHandler),
+    )
+    mediator.register_query(
+        ExportMessagesQuery,
+        container.resolve(ExportMessagesQueryHandler),
+    )
+    mediator.register_query(
+        GetAllChatsQuery,
+        container.resolve(GetAllChatsQueryHandler),
+    )
+    mediator.register_query(
+        GetAllChatsListenersQuery,
+        container.resolve(GetAllChatsListenersQueryHandler),
+    )
+    mediator.register_query(
+        GetChatRouteQuery,
+        container.resolve(GetChatRouteQueryHandler),
+    )
 
-    container.register(Scheduler, factory=lambda: Scheduler(), scope=Scope.singleton)
+    mediator.freeze()
 
-    return container
+    return mediator
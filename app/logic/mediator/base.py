@@ -1,24 +1,49 @@
+import asyncio
+import contextvars
+import logging
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Iterable
+from itertools import groupby
+from types import MappingProxyType
+from typing import Any, Awaitable, Iterable
 
 from domain.events.base import BaseEvent
+from infra.repositories.transactions import (
+    BaseTransactionManager,
+    NullTransactionManager,
+)
 from logic.commands.base import CR, CT, BaseCommand, BaseCommandHandler
-from logic.events.base import ER, ET, EventHandler
+from logic.events.base import BaseEventHandler, ER, ET
 from logic.exceptions.mediator import (
     CommandHandlersNotRegisteredException,
+    MediatorFrozenException,
 )
 from logic.mediator.command import CommandMediator
-from logic.mediator.event import EventMediator
+from logic.mediator.event import EventMediator, EventPublishMode
 from logic.mediator.query import QueryMediator
 from logic.queries.base import QR, QT, BaseQuery, BaseQueryHandler
 
 
+logger = logging.getLogger(__name__)
+# Set while an isolated handler runs, its task already holds a handler slot.
+inside_isolated_handler: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "inside_isolated_handler", default=False
+)
+# Ordering keys whose handlers the running task is part of. Events it publishes
+# for one of them must not wait for the chain they are running in.
+current_ordering_keys: contextvars.ContextVar[frozenset] = contextvars.ContextVar(
+    "current_ordering_keys", default=frozenset()
+)
+
+
 @dataclass(eq=False)
 class Mediator(EventMediator, QueryMediator, CommandMediator):
-    events_map: dict[ET, EventHandler] = field(
+    events_map: dict[ET, BaseEventHandler] = field(
         default_factory=lambda: defaultdict(list), kw_only=True
     )
+    publish_modes: dict[ET, EventPublishMode] = field(
+        default_factory=lambda: dict(), kw_only=True
+    )
     commands_map: dict[CT, BaseCommandHandler] = field(
         default_factory=lambda: defaultdict(list), kw_only=True
     )
@@ -26,28 +51,218 @@ class Mediator(EventMediator, QueryMediator, CommandMediator):
     queries_map: dict[QT, BaseQueryHandler] = field(
         default_factory=lambda: dict(), kw_only=True
     )
+    is_frozen: bool = field(default=False, init=False)
+
+    transaction_manager: BaseTransactionManager = field(
+        default_factory=NullTransactionManager, kw_only=True
+    )
+    max_concurrent_handlers: int = field(default=64, kw_only=True)
+    handler_timeout: float | None = field(default=None, kw_only=True)
+    ordering_key_attribute: str = field(default="chat_oid", kw_only=True)
+
+    _handlers_semaphore: asyncio.Semaphore = field(init=False, repr=False)
+    _ordering_tails: dict[Any, asyncio.Task] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _background_tasks: set[asyncio.Task] = field(
+        default_factory=set, init=False, repr=False
+    )
 
-    def register_event(self, event: ET, event_handlers: Iterable[EventHandler[ET, ER]]):
+    def __post_init__(self):
+        self._handlers_semaphore = asyncio.Semaphore(self.max_concurrent_handlers)
+
+    def register_event(
+        self,
+        event: ET,
+        event_handlers: Iterable[BaseEventHandler[ET, ER]],
+        publish_mode: EventPublishMode = EventPublishMode.SEQUENTIAL,
+    ):
+        self._ensure_not_frozen(event)
         self.events_map[event].extend(event_handlers)
+        self.publish_modes[event] = publish_mode
 
     def register_command(
         self, command: CT, command_handlers: Iterable[BaseCommandHandler[CT, CR]]
     ):
+        self._ensure_not_frozen(command)
         self.commands_map[command].extend(command_handlers)
 
     def register_query(self, query: QT, query_handler: BaseQueryHandler[QT, QR]):
+        self._ensure_not_frozen(query)
         self.queries_map[query] = query_handler
 
+    def freeze(self) -> None:
+        # Replace the mutable registries with read-only type -> handlers tables,
+        # so dispatch is a single lookup and nothing can be registered at runtime.
+        self.events_map = MappingProxyType(
+            {event: tuple(handlers) for event, handlers in self.events_map.items()}
+        )
+        self.publish_modes = MappingProxyType(dict(self.publish_modes))
+        self.commands_map = MappingProxyType(
+            {
+                command: tuple(handlers)
+                for command, handlers in self.commands_map.items()
+            }
+        )
+        self.queries_map = MappingProxyType(dict(self.queries_map))
+        self.is_frozen = True
+
+    def _ensure_not_frozen(self, registered_type: type) -> None:
+        if self.is_frozen:
+            raise MediatorFrozenException(registered_type)
+
     async def publish(self, events: Iterable[BaseEvent]) -> Iterable[ER]:
         result = []
+        concurrent_tasks: list[asyncio.Task] = []
+
+        # Consecutive events of the same type are handed to sequential handlers
+        # as one batch, e.g. to send them to the broker in a single request.
+        for event_type, events_run in groupby(
+            events, key=lambda event: event.__class__
+        ):
+            handlers: Iterable[BaseEventHandler] = self.events_map.get(event_type, ())
+
+            if not handlers:
+                continue
+
+            publish_mode = self.publish_modes.get(
+                event_type, EventPublishMode.SEQUENTIAL
+            )
+            events_run = list(events_run)
+
+            if publish_mode == EventPublishMode.SEQUENTIAL:
+                for event in events_run:
+                    ordering_key = self._get_ordering_key(event)
+
+                    if ordering_key not in current_ordering_keys.get():
+                        await self._wait_for_previous(ordering_key)
+
+                for handler in handlers:
+                    result.extend(await handler.handle_batch(events_run))
+
+                continue
+
+            # Events published by an isolated handler run without taking
+            # another slot, waiting for one while holding one can deadlock.
+            acquire_slot = not inside_isolated_handler.get()
 
-        for event in events:
-            handlers: Iterable[EventHandler] = self.events_map[event.__class__]
+            for event in events_run:
+                task = self._schedule_in_order(
+                    self._get_ordering_key(event),
+                    self._handle_isolated(event, handlers, acquire_slot),
+                )
 
-            result.extend([await handler.handle(event) for handler in handlers])
+                if publish_mode == EventPublishMode.CONCURRENT:
+                    concurrent_tasks.append(task)
+
+        for task in concurrent_tasks:
+            result.extend(await task)
 
         return result
 
+    async def wait_background_tasks(self) -> None:
+        if self._background_tasks:
+            await asyncio.wait(self._background_tasks)
+
+    def _get_ordering_key(self, event: BaseEvent) -> Any:
+        return getattr(event, self.ordering_key_attribute, None)
+
+    async def _wait_for_previous(self, ordering_key: Any) -> None:
+        previous = self._ordering_tails.get(ordering_key)
+
+        if previous is not None:
+            await asyncio.wait([previous])
+
+    def _schedule_in_order(self, ordering_key: Any, handle: Awaitable) -> asyncio.Task:
+        # Events sharing an ordering key (the chat by default) are chained, so
+        # the next one starts only after the previous one was fully handled.
+        # Tasks get an empty context to stay out of the caller's transaction.
+        # A handler publishing for its own key runs the new event right away,
+        # chained after itself it would wait for itself.
+        ordering_keys = current_ordering_keys.get()
+        is_nested = ordering_key in ordering_keys
+        previous = None if is_nested else self._ordering_tails.get(ordering_key)
+
+        if ordering_key is not None:
+            ordering_keys = ordering_keys | {ordering_key}
+
+        task = asyncio.create_task(
+            self._run_after(previous, handle, ordering_keys),
+            context=contextvars.Context(),
+        )
+
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+        if ordering_key is not None and not is_nested:
+            self._ordering_tails[ordering_key] = task
+            task.add_done_callback(
+                lambda done: self._release_ordering_key(ordering_key, done)
+            )
+
+        return task
+
+    def _release_ordering_key(self, ordering_key: Any, task: asyncio.Task) -> None:
+        if self._ordering_tails.get(ordering_key) is task:
+            del self._ordering_tails[ordering_key]
+
+    async def _run_after(
+        self,
+        previous: asyncio.Task | None,
+        handle: Awaitable,
+        ordering_keys: frozenset,
+    ):
+        current_ordering_keys.set(ordering_keys)
+
+        if previous is not None:
+            await asyncio.wait([previous])
+
+        return await handle
+
+    async def _handle_isolated(
+        self, event: BaseEvent, handlers: Iterable[BaseEventHandler], acquire_slot: bool
+    ) -> list[ER]:
+        handlers = tuple(handlers)
+        results = await asyncio.gather(
+            *[self._run_handler(handler, event, acquire_slot) for handler in handlers],
+            return_exceptions=True,
+        )
+        handler_results = []
+
+        # A failed handler must not fail the others, it is left out of the
+        # results and logged with its error.
+        for handler, handler_result in zip(handlers, results):
+            if isinstance(handler_result, BaseException):
+                logger.error(
+                    "Event handler %s failed for %s",
+                    handler.__class__.__name__,
+                    event.__class__.__name__,
+                    exc_info=handler_result,
+                )
+            else:
+                handler_results.append(handler_result)
+
+        return handler_results
+
+    async def _run_handler(
+        self, handler: BaseEventHandler, event: BaseEvent, acquire_slot: bool
+    ) -> ER:
+        # Runs in a task of its own, the flag does not leak to the caller.
+        inside_isolated_handler.set(True)
+
+        if not acquire_slot:
+            return await self._wait_for_handler(handler, event)
+
+        async with self._handlers_semaphore:
+            return await self._wait_for_handler(handler, event)
+
+    async def _wait_for_handler(
+        self, handler: BaseEventHandler, event: BaseEvent
+    ) -> ER:
+        return await asyncio.wait_for(
+            handler.handle(event), timeout=self.handler_timeout
+        )
+
     async def handle_command(self, command: BaseCommand) -> Iterable[CR]:
         command_type = command.__class__
 
@@ -56,6 +271,16 @@ class Mediator(EventMediator, QueryMediator, CommandMediator):
         if not handlers:
             raise CommandHandlersNotRegisteredException(command_type)
 
+        # Aggregate writes and the outbox records of their events are committed
+        # together, when the transaction manager supports it, and the handlers
+        # are run again when the transaction is retried.
+        return await self.transaction_manager.run_in_transaction(
+            lambda: self._handle_command(handlers, command)
+        )
+
+    async def _handle_command(
+        self, handlers: Iterable[BaseCommandHandler], command: BaseCommand
+    ) -> list[CR]:
         return [await handler.handle(command) for handler in handlers]
 
     async def handle_query(self, query: BaseQuery) -> QR:
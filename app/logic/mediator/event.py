@@ -1,21 +1,34 @@
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from dataclasses import dataclass, field
+from enum import Enum
 from typing import Iterable
 
 from domain.events.base import BaseEvent
-from logic.events.base import ER, ET, EventHandler
+from logic.events.base import BaseEventHandler, ER, ET
+
+
+class EventPublishMode(str, Enum):
+    SEQUENTIAL = "sequential"
+    CONCURRENT = "concurrent"
+    FIRE_AND_FORGET = "fire_and_forget"
 
 
 @dataclass(eq=False)
 class EventMediator(ABC):
-    events_map: dict[ET, EventHandler] = field(
+    events_map: dict[ET, BaseEventHandler] = field(
         default_factory=lambda: defaultdict(list), kw_only=True
     )
+    publish_modes: dict[ET, EventPublishMode] = field(
+        default_factory=lambda: dict(), kw_only=True
+    )
 
     @abstractmethod
     def register_event(
-        self, event: ET, event_handlers: Iterable[EventHandler[ET, ER]]
+        self,
+        event: ET,
+        event_handlers: Iterable[BaseEventHandler[ET, ER]],
+        publish_mode: EventPublishMode = EventPublishMode.SEQUENTIAL,
     ): ...
 
     @abstractmethod
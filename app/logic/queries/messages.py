@@ -1,9 +1,21 @@
-from dataclasses import dataclass
-from typing import Iterable
+from dataclasses import (
+    dataclass,
+    replace,
+)
+from typing import (
+    AsyncIterator,
+    Iterable,
+)
 
 from domain.entities.messages import Chat, ChatListener, Message
-from infra.repositories.filters.messages import GetChatsFilters, GetMessagesFilters
+from infra.message_brokers.routing import ChatRoute, PartitionOwnershipMap
+from infra.repositories.filters.messages import (
+    CountMode,
+    GetChatsFilters,
+    GetMessagesFilters,
+)
 from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+from infra.repositories.messages.read_models import ChatListItem, MessageListItem
 from logic.exceptions.messages import ChatNotFoundException
 from logic.queries.base import BaseQuery, BaseQueryHandler
 
@@ -19,6 +31,19 @@ class GetMessagesQuery(BaseQuery):
     filters: GetMessagesFilters
 
 
+@dataclass(frozen=True)
+class GetMessagesAfterSequenceQuery(BaseQuery):
+    chat_oid: str
+    sequence: int
+    limit: int
+
+
+@dataclass(frozen=True)
+class ExportMessagesQuery(BaseQuery):
+    chat_oid: str
+    batch_size: int
+
+
 @dataclass(frozen=True)
 class GetAllChatsQuery(BaseQuery):
     filters: GetChatsFilters
@@ -29,6 +54,11 @@ class GetAllChatsListenersQuery(BaseQuery):
     chat_oid: str
 
 
+@dataclass(frozen=True)
+class GetChatRouteQuery(BaseQuery):
+    chat_oid: str
+
+
 @dataclass(frozen=True)
 class GetChatDetailQueryHandler(BaseQueryHandler):
     chats_repository: BaseChatsRepository
@@ -46,18 +76,71 @@ class GetChatDetailQueryHandler(BaseQueryHandler):
 @dataclass(frozen=True)
 class GetMessagesQueryHandler(BaseQueryHandler):
     messages_repository: BaseMessagesRepository
+    chats_repository: BaseChatsRepository
+
+    async def handle(
+        self, query: GetMessagesQuery
+    ) -> tuple[list[MessageListItem], int | None]:
+        filters = query.filters
+        estimated_count = None
+
+        if filters.count == CountMode.ESTIMATED:
+            estimated_count = await self.chats_repository.get_messages_count(
+                chat_oid=query.chat_oid
+            )
 
-    async def handle(self, query: GetMessagesQuery) -> Iterable[Message]:
-        return await self.messages_repository.get_messages(
-            chat_oid=query.chat_oid, filters=query.filters
+            # Chats whose counter was not backfilled yet are counted exactly.
+            if estimated_count is None:
+                filters = replace(filters, count=CountMode.EXACT)
+
+        messages, count = await self.messages_repository.get_messages(
+            chat_oid=query.chat_oid, filters=filters
         )
 
+        return messages, count if estimated_count is None else estimated_count
+
 
 @dataclass(frozen=True)
-class GetAllChatsQueryHandler(BaseQueryHandler[GetAllChatsQuery, Iterable[Chat]]):
+class ExportMessagesQueryHandler(
+    BaseQueryHandler[ExportMessagesQuery, AsyncIterator[MessageListItem]]
+):
     chats_repository: BaseChatsRepository
+    messages_repository: BaseMessagesRepository
 
-    async def handle(self, query: GetAllChatsQuery) -> Iterable[Chat]:  # type: ignore
+    async def handle(
+        self, query: ExportMessagesQuery
+    ) -> AsyncIterator[MessageListItem]:
+        # Checked up front, once the stream started there is no way to fail
+        # the request any more.
+        if not await self.chats_repository.get_chat_by_oid(oid=query.chat_oid):
+            raise ChatNotFoundException(chat_oid=query.chat_oid)
+
+        return self.messages_repository.iter_messages(
+            chat_oid=query.chat_oid, batch_size=query.batch_size
+        )
+
+
+@dataclass(frozen=True)
+class GetMessagesAfterSequenceQueryHandler(
+    BaseQueryHandler[GetMessagesAfterSequenceQuery, list[Message]]
+):
+    messages_repository: BaseMessagesRepository
+
+    async def handle(self, query: GetMessagesAfterSequenceQuery) -> list[Message]:
+        return await self.messages_repository.get_messages_after_sequence(
+            chat_oid=query.chat_oid, sequence=query.sequence, limit=query.limit
+        )
+
+
+@dataclass(frozen=True)
+class GetAllChatsQueryHandler(
+    BaseQueryHandler[GetAllChatsQuery, tuple[list[ChatListItem], int | None]]
+):
+    chats_repository: BaseChatsRepository
+
+    async def handle(
+        self, query: GetAllChatsQuery
+    ) -> tuple[list[ChatListItem], int | None]:
         return await self.chats_repository.get_all_chats(query.filters)
 
 
@@ -76,3 +159,11 @@ class GetAllChatsListenersQueryHandler(
         return await self.chats_repository.get_all_chat_listeners(
             chat_oid=query.chat_oid
         )
+
+
+@dataclass(frozen=True)
+class GetChatRouteQueryHandler(BaseQueryHandler[GetChatRouteQuery, ChatRoute]):
+    ownership_map: PartitionOwnershipMap
+
+    async def handle(self, query: GetChatRouteQuery) -> ChatRoute:
+        return self.ownership_map.get_route(query.chat_oid)
@@ -1,8 +1,22 @@
-from pydantic import Field
+from pydantic import (
+    Field,
+    model_validator,
+)
 from pydantic_settings import BaseSettings
 
+from infra.message_brokers.profiles import (
+    KafkaCompressionType,
+    KafkaProducerProfile,
+)
+from infra.repositories.messages.buckets import MessagesStorageLayout
+from infra.repositories.messages.memory import StorageBackend
+from infra.websockets.senders import OverflowPolicy
+
 
 class Config(BaseSettings):
+    storage_backend: StorageBackend = Field(
+        default=StorageBackend.MONGODB, alias="STORAGE_BACKEND"
+    )
     mongodb_connection_uri: str = Field(alias="MONGO_DB_CONNECTION_URI")
     mongodb_chat_database: str = Field(default="chat", alias="MONGODB_CHAT_DATABASE")
     mongodb_chat_collection: str = Field(
@@ -11,6 +25,32 @@ class Config(BaseSettings):
     mongodb_messages_collection: str = Field(
         default="messages", alias="MONGODB_MESSAGES_COLLECTION"
     )
+    mongodb_outbox_collection: str = Field(
+        default="outbox", alias="MONGODB_OUTBOX_COLLECTION"
+    )
+    mongodb_transactions_enabled: bool = Field(
+        default=False, alias="MONGODB_TRANSACTIONS_ENABLED"
+    )
+    mongodb_ensure_indexes: bool = Field(default=True, alias="MONGODB_ENSURE_INDEXES")
+    mongodb_message_buckets_collection: str = Field(
+        default="message_buckets", alias="MONGODB_MESSAGE_BUCKETS_COLLECTION"
+    )
+    messages_storage_layout: MessagesStorageLayout = Field(
+        default=MessagesStorageLayout.DOCUMENT, alias="MESSAGES_STORAGE_LAYOUT"
+    )
+    messages_bucket_size: int = Field(default=200, alias="MESSAGES_BUCKET_SIZE")
+    messages_bucket_window_seconds: float = Field(
+        default=3600.0, alias="MESSAGES_BUCKET_WINDOW_SECONDS"
+    )
+    messages_group_commit_enabled: bool = Field(
+        default=False, alias="MESSAGES_GROUP_COMMIT_ENABLED"
+    )
+    messages_group_commit_max_delay_ms: float = Field(
+        default=2.0, alias="MESSAGES_GROUP_COMMIT_MAX_DELAY_MS"
+    )
+    messages_group_commit_max_batch_size: int = Field(
+        default=500, alias="MESSAGES_GROUP_COMMIT_MAX_BATCH_SIZE"
+    )
 
     new_message_received_topic: str = Field(default="new-messages")
     new_chats_event_topic: str = Field(default="new-chats-topic")
@@ -19,3 +59,109 @@ class Config(BaseSettings):
     listener_deleted_topic: str = Field(default="listener-deleted-topic")
 
     kafka_url: str = Field(alias="KAFKA_URL")
+    kafka_producer_profile: KafkaProducerProfile = Field(
+        default=KafkaProducerProfile.DEFAULT, alias="KAFKA_PRODUCER_PROFILE"
+    )
+    kafka_producer_linger_ms: int | None = Field(
+        default=None, alias="KAFKA_PRODUCER_LINGER_MS"
+    )
+    kafka_producer_max_batch_size: int | None = Field(
+        default=None, alias="KAFKA_PRODUCER_MAX_BATCH_SIZE"
+    )
+    kafka_producer_compression_type: KafkaCompressionType | None = Field(
+        default=None, alias="KAFKA_PRODUCER_COMPRESSION_TYPE"
+    )
+    kafka_max_in_flight_messages: int = Field(
+        default=10_000, alias="KAFKA_MAX_IN_FLIGHT_MESSAGES"
+    )
+    kafka_consumer_batch_size: int = Field(
+        default=500, alias="KAFKA_CONSUMER_BATCH_SIZE"
+    )
+    kafka_consumer_batch_timeout_ms: int = Field(
+        default=100, alias="KAFKA_CONSUMER_BATCH_TIMEOUT_MS"
+    )
+
+    chats_cache_enabled: bool = Field(default=True, alias="CHATS_CACHE_ENABLED")
+    chats_cache_max_size: int = Field(default=10_000, alias="CHATS_CACHE_MAX_SIZE")
+    chats_cache_ttl: float = Field(default=60.0, alias="CHATS_CACHE_TTL")
+
+    chat_routing_enabled: bool = Field(default=False, alias="CHAT_ROUTING_ENABLED")
+    chat_routing_partitions: int = Field(default=12, alias="CHAT_ROUTING_PARTITIONS")
+    chat_routing_nodes: str = Field(default="", alias="CHAT_ROUTING_NODES")
+    chat_routing_node_id: str = Field(default="", alias="CHAT_ROUTING_NODE_ID")
+
+    websocket_send_queue_size: int = Field(
+        default=256, alias="WEBSOCKET_SEND_QUEUE_SIZE"
+    )
+    websocket_overflow_policy: OverflowPolicy = Field(
+        default=OverflowPolicy.DROP_OLDEST, alias="WEBSOCKET_OVERFLOW_POLICY"
+    )
+    # Off by default, clients that only listen never send anything.
+    websocket_idle_timeout: float = Field(default=0, alias="WEBSOCKET_IDLE_TIMEOUT")
+    websocket_disconnect_timeout: float = Field(
+        default=5.0, alias="WEBSOCKET_DISCONNECT_TIMEOUT"
+    )
+    websocket_disconnect_socket_timeout: float = Field(
+        default=1.0, alias="WEBSOCKET_DISCONNECT_SOCKET_TIMEOUT"
+    )
+    websocket_resume_max_messages: int = Field(
+        default=1000, alias="WEBSOCKET_RESUME_MAX_MESSAGES"
+    )
+
+    messages_export_batch_size: int = Field(
+        default=1000, alias="MESSAGES_EXPORT_BATCH_SIZE"
+    )
+
+    replay_buffer_enabled: bool = Field(default=True, alias="REPLAY_BUFFER_ENABLED")
+    replay_buffer_messages_per_chat: int = Field(
+        default=100, alias="REPLAY_BUFFER_MESSAGES_PER_CHAT"
+    )
+    replay_buffer_max_size_bytes: int = Field(
+        default=64 * 1024 * 1024, alias="REPLAY_BUFFER_MAX_SIZE_BYTES"
+    )
+    replay_buffer_idle_ttl: float = Field(default=900.0, alias="REPLAY_BUFFER_IDLE_TTL")
+
+    event_handlers_concurrency: int = Field(
+        default=64, alias="EVENT_HANDLERS_CONCURRENCY"
+    )
+    event_handler_timeout: float = Field(default=10.0, alias="EVENT_HANDLER_TIMEOUT")
+
+    # Events then reach the broker only once the relay polls them, up to
+    # OUTBOX_RELAY_POLL_INTERVAL later than they would be sent directly.
+    outbox_enabled: bool = Field(default=False, alias="OUTBOX_ENABLED")
+    outbox_relay_batch_size: int = Field(default=100, alias="OUTBOX_RELAY_BATCH_SIZE")
+    outbox_relay_poll_interval: float = Field(
+        default=0.5, alias="OUTBOX_RELAY_POLL_INTERVAL"
+    )
+    outbox_relay_lease_seconds: float = Field(
+        default=30.0, alias="OUTBOX_RELAY_LEASE_SECONDS"
+    )
+
+    @model_validator(mode="after")
+    def check_outbox_is_transactional(self) -> "Config":
+        # Without a transaction the outbox record is not written together with
+        # the aggregate, which is the whole point of the outbox.
+        if (
+            self.outbox_enabled
+            and self.storage_backend == StorageBackend.MONGODB
+            and not self.mongodb_transactions_enabled
+        ):
+            raise ValueError("OUTBOX_ENABLED requires MONGODB_TRANSACTIONS_ENABLED")
+
+        return self
+
+    @model_validator(mode="after")
+    def check_group_commit_layout(self) -> "Config":
+        # Bucket appends are ordered upserts, which the group commit can not
+        # split into per-message results.
+        if (
+            self.messages_group_commit_enabled
+            and self.storage_backend == StorageBackend.MONGODB
+            and self.messages_storage_layout == MessagesStorageLayout.BUCKET
+        ):
+            raise ValueError(
+                "MESSAGES_GROUP_COMMIT_ENABLED does not work with "
+                "MESSAGES_STORAGE_LAYOUT=bucket"
+            )
+
+        return self
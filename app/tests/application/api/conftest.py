@@ -2,7 +2,8 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from application.api.main import create_app
-from logic.init import init_container
+from logic.init import get_mediator, init_container
+from logic.mediator.base import Mediator
 from tests.fixtures import init_dummy_container
 
 import pytest
@@ -11,7 +12,9 @@ import pytest
 @pytest.fixture
 def app() -> FastAPI:
     app = create_app()
-    app.dependency_overrides[init_container] = init_dummy_container
+    container = init_dummy_container()
+    app.dependency_overrides[init_container] = lambda: container
+    app.dependency_overrides[get_mediator] = lambda: container.resolve(Mediator)
 
     return app
 
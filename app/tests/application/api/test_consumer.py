@@ -0,0 +1,76 @@
+import asyncio
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+import pytest
+
+from application.api.lifespan import (
+    convert_consumed_message_to_event,
+    get_consumed_topics,
+    publish_by_chat,
+)
+from infra.message_brokers.dots import ConsumedMessage
+from logic.events.messages import (
+    ChatListenersChangedFromBrokerEvent,
+    NewMessageReceivedFromBrokerEvent,
+)
+from settings.config import Config
+
+
+@dataclass
+class SlowRecordingMediator:
+    published: list[tuple[str, str]] = field(default_factory=list)
+
+    async def publish(self, events):
+        for event in events:
+            # The first chat is slow, so the other one can overtake it.
+            await asyncio.sleep(0.01 if event.chat_oid == "first" else 0)
+            self.published.append((event.chat_oid, event.message_text))
+
+
+@pytest.mark.asyncio
+async def test_publish_by_chat_keeps_order_within_chat():
+    mediator = SlowRecordingMediator()
+    events = [
+        NewMessageReceivedFromBrokerEvent(
+            message_text=str(index), message_oid=str(index), chat_oid=chat_oid
+        )
+        for index, chat_oid in enumerate(["first", "second", "first", "second"])
+    ]
+
+    await publish_by_chat(mediator, events)
+
+    assert mediator.published == [
+        ("second", "1"),
+        ("second", "3"),
+        ("first", "0"),
+        ("first", "2"),
+    ]
+
+
+def test_convert_consumed_message_skips_unknown_topics():
+    config = Config(MONGO_DB_CONNECTION_URI="", KAFKA_URL="")
+
+    listeners_changed = convert_consumed_message_to_event(
+        config,
+        ConsumedMessage(
+            topic=config.new_listener_added_topic, key=None, value={"chat_oid": "1"}
+        ),
+    )
+    unknown = convert_consumed_message_to_event(
+        config, ConsumedMessage(topic="other", key=None, value={"chat_oid": "1"})
+    )
+
+    assert isinstance(listeners_changed, ChatListenersChangedFromBrokerEvent)
+    assert unknown is None
+
+
+def test_deleted_chats_are_consumed_without_the_chats_cache():
+    config = Config(MONGO_DB_CONNECTION_URI="", KAFKA_URL="", CHATS_CACHE_ENABLED=False)
+
+    assert get_consumed_topics(config) == [
+        config.new_message_received_topic,
+        config.chat_deleted_topic,
+    ]
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from application.api.messages.exceptions import InvalidCursorException
+from application.api.messages.filters import GetMessagesFilters
+from domain.entities.messages import Message
+from domain.values.messages import Text
+from infra.repositories.filters.messages import (
+    CountMode,
+    CursorDirection,
+)
+
+
+def test_messages_cursor_round_trip():
+    message = Message(
+        text=Text("text"), chat_oid="chat", created_at=datetime(2024, 5, 1, 12, 30)
+    )
+    first_page_filters = GetMessagesFilters(limit=1, direction=CursorDirection.BACKWARD)
+
+    next_cursor = first_page_filters.get_next_cursor(
+        first_page_filters.to_infra(), [message]
+    )
+    infra_filters = GetMessagesFilters(cursor=next_cursor).to_infra()
+
+    assert infra_filters.direction == CursorDirection.BACKWARD
+    assert infra_filters.cursor.oid == message.oid
+    assert infra_filters.cursor.created_at == message.created_at
+
+
+def test_messages_cursor_is_not_returned_for_last_page():
+    filters = GetMessagesFilters(limit=10, direction=CursorDirection.FORWARD)
+
+    assert filters.get_next_cursor(filters.to_infra(), []) is None
+
+
+def test_messages_cursor_invalid():
+    with pytest.raises(InvalidCursorException):
+        GetMessagesFilters(cursor="not-a-cursor").to_infra()
+
+
+@pytest.mark.parametrize(
+    "params, expected_count_mode",
+    [
+        ({}, CountMode.ESTIMATED),
+        ({"with_count": True}, CountMode.EXACT),
+        ({"with_count": False}, CountMode.NONE),
+        ({"with_count": False, "count": CountMode.ESTIMATED}, CountMode.ESTIMATED),
+    ],
+)
+def test_deprecated_with_count_still_selects_the_count_mode(
+    params, expected_count_mode
+):
+    assert GetMessagesFilters(**params).to_infra().count == expected_count_mode
@@ -1,3 +1,4 @@
+import orjson
 from fastapi import status
 from httpx import Response
 from faker import Faker
@@ -36,3 +37,26 @@ def test_create_chat_fail_too_text_empty(
     json_data = response.json()
 
     assert json_data["detail"]["error"]
+
+
+def test_export_chat_messages(app: FastAPI, client: TestClient, faker: Faker):
+    response = client.post(
+        url=app.url_path_for("create_chat_handler"),
+        json={"title": faker.text(max_nb_chars=10)},
+    )
+    chat_oid = response.json()["oid"]
+
+    for text in ("first", "second"):
+        response = client.post(
+            url=app.url_path_for("create_message_handler", chat_oid=chat_oid),
+            json={"text": text},
+        )
+        assert response.is_success
+
+    response = client.get(
+        url=app.url_path_for("export_chat_messages_handler", chat_oid=chat_oid)
+    )
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [orjson.loads(line)["text"] for line in lines] == ["first", "second"]
@@ -0,0 +1,11 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def test_metrics_report_current_and_peak_memory(app: FastAPI, client: TestClient):
+    response = client.get(app.url_path_for("get_metrics_handler"))
+
+    assert response.is_success
+    json_data = response.json()
+
+    assert 0 < json_data["rss_bytes"] <= json_data["peak_rss_bytes"]
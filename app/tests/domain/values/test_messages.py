@@ -64,3 +64,32 @@ def test_new_message_events(faker: Faker):
     assert new_event.message_oid == message.oid
     assert new_event.message_text == text.as_generic_type()
     assert new_event.chat_oid == chat.oid
+
+
+def test_trusted_value_skips_validation():
+    title = Title.trusted("a" * 300)
+
+    assert title.as_generic_type() == "a" * 300
+    assert title == Title.trusted("a" * 300)
+
+
+def test_entities_have_no_instance_dict():
+    chat = Chat(title=Title("title"))
+    message = Message(text=Text("text"), chat_oid=chat.oid)
+
+    assert not hasattr(chat, "__dict__")
+    assert not hasattr(message, "__dict__")
+    assert not hasattr(message.text, "__dict__")
+
+
+def test_loaded_chats_share_no_messages():
+    first_chat = Chat(title=Title("first"))
+    second_chat = Chat(title=Title("second"))
+    message = Message(text=Text("text"), chat_oid=first_chat.oid)
+
+    first_chat.add_message(message)
+
+    assert message in first_chat.messages
+    assert not second_chat.messages
+    assert len(first_chat.pull_events()) == 1
+    assert first_chat.pull_events() == []
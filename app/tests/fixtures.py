@@ -1,11 +1,196 @@
-from punq import Container, Scope
+import asyncio
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import (
+    datetime,
+    timedelta,
+)
+from typing import Iterable
 
-from infra.repositories.messages.memory import BaseChatsRepository, MemoryChatRepository
+from punq import (
+    Container,
+    Scope,
+)
+
+from domain.entities.messages import (
+    Chat,
+    ChatListener,
+    Message,
+)
+from domain.values.messages import Text
+from infra.exceptions.messages import MessagesWriteException
+from infra.message_brokers.base import BaseMessageBroker
+from infra.message_brokers.dots import BrokerMessage
+from infra.message_brokers.null import NullMessageBroker
+from infra.message_brokers.outbox import OutboxMessageBroker
+from infra.repositories.filters.messages import (
+    GetChatsFilters,
+    GetMessagesFilters,
+)
+from infra.repositories.messages.base import (
+    BaseChatsRepository,
+    BaseMessagesRepository,
+)
+from infra.repositories.messages.converters import (
+    convert_message_document_to_list_item,
+    convert_message_to_document,
+)
+from infra.repositories.messages.memory import StorageBackend
 from logic.init import _init_container
+from settings.config import Config
 
 
 def init_dummy_container() -> Container:
-    container = _init_container()
+    # The whole container runs on the in-memory repositories, nothing in the
+    # tests connects to MongoDB or Kafka.
+    container = _init_container(config=Config(STORAGE_BACKEND=StorageBackend.MEMORY))
+    container.register(
+        BaseMessageBroker, instance=NullMessageBroker(), scope=Scope.singleton
+    )
 
-    container.register(BaseChatsRepository, MemoryChatRepository, scope=Scope.singleton)
     return container
+
+
+MESSAGES_STARTED_AT = datetime(2024, 1, 1, 12)
+
+
+def build_messages(
+    count: int, chat_oid: str = "chat", interval: timedelta = timedelta(minutes=15)
+) -> list[Message]:
+    # Four messages an hour by default, so they span several hourly buckets.
+    return [
+        Message(
+            text=Text(f"text {index}"),
+            chat_oid=chat_oid,
+            oid=f"message-{index:03}",
+            created_at=MESSAGES_STARTED_AT + interval * index,
+            sequence=index + 1,
+        )
+        for index in range(count)
+    ]
+
+
+@dataclass
+class RecordingMessageBroker(OutboxMessageBroker):
+    sent: list[BrokerMessage] = field(default_factory=list)
+    send_delay: float = 0
+
+    async def send_messages(self, messages: Iterable[BrokerMessage]):
+        await asyncio.sleep(self.send_delay)
+        self.sent.extend(messages)
+
+
+@dataclass
+class CountingChatsRepository(BaseChatsRepository):
+    chats: dict[str, Chat] = field(default_factory=dict)
+    loads: int = 0
+    sequences: dict[str, int] = field(default_factory=dict)
+    message_counts: dict[str, int] = field(default_factory=dict)
+
+    async def check_chat_exists_by_title(self, title: str) -> bool: ...
+
+    async def get_chat_by_oid(self, oid: str) -> Chat | None:
+        self.loads += 1
+        return self.chats.get(oid)
+
+    async def add_chat(self, chat: Chat) -> None:
+        self.chats[chat.oid] = chat
+
+    async def get_all_chats(self, filters: GetChatsFilters): ...
+
+    async def delete_chat_by_oid(self, oid: str) -> None:
+        self.chats.pop(oid)
+
+    async def add_telegram_listener(self, chat_oid: str, telegram_chat_id: str):
+        self.chats[chat_oid].listeners.add(ChatListener(oid=telegram_chat_id))
+
+    async def delete_telegram_listener(self, chat_oid: str, telegram_chat_id: str): ...
+
+    async def get_all_chat_listeners(self, chat_oid: str) -> Iterable[ChatListener]: ...
+
+    async def reserve_message_sequences(
+        self, chat_oid: str, count: int = 1
+    ) -> int | None:
+        if chat_oid not in self.chats:
+            return None
+
+        self.sequences[chat_oid] = self.sequences.get(chat_oid, 0) + count
+        self.message_counts[chat_oid] = self.message_counts.get(chat_oid, 0) + count
+        return self.sequences[chat_oid] - count + 1
+
+    async def uncount_messages(self, chat_oid: str, count: int) -> None:
+        self.message_counts[chat_oid] -= count
+
+    async def get_messages_count(self, chat_oid: str) -> int | None:
+        if chat_oid not in self.chats:
+            return None
+
+        return self.message_counts.get(chat_oid, 0)
+
+
+@dataclass
+class RecordingMessagesRepository(BaseMessagesRepository):
+    writes: list[list[Message]] = field(default_factory=list)
+    failing_texts: set[str] = field(default_factory=set)
+
+    async def add_message(self, message: Message) -> None:
+        self.writes.append([message])
+
+    async def add_messages(self, messages: Iterable[Message]) -> None:
+        messages = list(messages)
+        self.writes.append(messages)
+
+        write_errors = {
+            index: "E11000 duplicate key error"
+            for index, message in enumerate(messages)
+            if message.text.as_generic_type() in self.failing_texts
+        }
+        if write_errors:
+            raise MessagesWriteException(errors=write_errors)
+
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters): ...
+
+    async def get_messages_after_sequence(
+        self, chat_oid: str, sequence: int, limit: int
+    ): ...
+
+    async def iter_messages(self, chat_oid: str, batch_size: int):
+        for batch in self.writes:
+            for message in batch:
+                if message.chat_oid == chat_oid:
+                    yield convert_message_document_to_list_item(
+                        convert_message_to_document(message)
+                    )
+
+
+@dataclass(eq=False)
+class FakeWebSocket:
+    is_stalled: bool = False
+    sent: list[bytes | str] = field(default_factory=list)
+    notices: list[dict] = field(default_factory=list)
+    close_code: int | None = None
+
+    async def accept(self, subprotocol: str | None = None): ...
+
+    async def send_text(self, data: str):
+        while self.is_stalled:
+            await asyncio.sleep(0.01)
+
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes):
+        while self.is_stalled:
+            await asyncio.sleep(0.01)
+
+        self.sent.append(data)
+
+    async def send_json(self, data: dict):
+        while self.is_stalled:
+            await asyncio.sleep(0.01)
+
+        self.notices.append(data)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
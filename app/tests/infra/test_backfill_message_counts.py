@@ -0,0 +1,57 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+import pytest
+
+from domain.entities.messages import Message
+from domain.values.messages import Text
+from infra.repositories.messages.backfill_message_counts import backfill_message_counts
+from infra.repositories.messages.memory import MemoryMessagesRepository
+
+
+@dataclass
+class UpdateResult:
+    modified_count: int
+
+
+@dataclass
+class FakeChatsCollection:
+    documents: list[dict] = field(default_factory=list)
+
+    async def find(self, find: dict, projection: dict):
+        for document in self.documents:
+            if "message_count" not in document:
+                yield {"oid": document["oid"]}
+
+    async def update_one(self, find: dict, update: dict) -> UpdateResult:
+        for document in self.documents:
+            if document["oid"] == find["oid"] and "message_count" not in document:
+                document.update(update["$set"])
+                return UpdateResult(modified_count=1)
+
+        return UpdateResult(modified_count=0)
+
+
+@pytest.mark.asyncio
+async def test_only_chats_without_a_counter_are_backfilled():
+    messages_repository = MemoryMessagesRepository()
+    for chat_oid, count in (("old", 3), ("counted", 2)):
+        for index in range(count):
+            await messages_repository.add_message(
+                Message(text=Text(f"text {index}"), chat_oid=chat_oid)
+            )
+    chats_collection = FakeChatsCollection(
+        documents=[{"oid": "old"}, {"oid": "counted", "message_count": 5}]
+    )
+
+    backfilled = await backfill_message_counts(
+        chats_collection=chats_collection, messages_repository=messages_repository
+    )
+
+    assert backfilled == 1
+    assert chats_collection.documents == [
+        {"oid": "old", "message_count": 3},
+        {"oid": "counted", "message_count": 5},
+    ]
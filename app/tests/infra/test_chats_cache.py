@@ -0,0 +1,81 @@
+import pytest
+
+from domain.entities.messages import (
+    Chat,
+    ChatListener,
+)
+from domain.values.messages import Title
+from infra.repositories.messages.cache import CachedChatsRepository
+from tests.fixtures import CountingChatsRepository
+
+
+async def build_cache(**kwargs) -> tuple[CachedChatsRepository, Chat]:
+    chats_repository = CountingChatsRepository()
+    chat = Chat(title=Title("title"))
+    await chats_repository.add_chat(chat)
+
+    return CachedChatsRepository(chats_repository=chats_repository, **kwargs), chat
+
+
+@pytest.mark.asyncio
+async def test_chats_cache_hit_returns_copy():
+    cache, chat = await build_cache()
+
+    first = await cache.get_chat_by_oid(chat.oid)
+    first.add_listener(ChatListener(oid="listener"))
+    second = await cache.get_chat_by_oid(chat.oid)
+
+    assert cache.chats_repository.loads == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert not second.listeners
+    assert not second.pull_events()
+
+
+@pytest.mark.asyncio
+async def test_chats_cache_invalidated_on_write():
+    cache, chat = await build_cache()
+
+    await cache.get_chat_by_oid(chat.oid)
+    await cache.add_telegram_listener(chat_oid=chat.oid, telegram_chat_id="listener")
+    listeners = await cache.get_all_chat_listeners(chat.oid)
+
+    assert [listener.oid for listener in listeners] == ["listener"]
+    assert cache.stats.invalidations == 1
+    assert cache.chats_repository.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_chats_cache_evicts_least_recently_used():
+    cache, chat = await build_cache(max_size=1)
+    other_chat = Chat(title=Title("other"))
+    await cache.add_chat(other_chat)
+
+    await cache.get_chat_by_oid(chat.oid)
+    await cache.get_chat_by_oid(other_chat.oid)
+    await cache.get_chat_by_oid(chat.oid)
+
+    assert cache.stats.evictions == 2
+    assert cache.stats.size == 1
+    assert cache.chats_repository.loads == 3
+
+
+@pytest.mark.asyncio
+async def test_chats_cache_entries_expire():
+    cache, chat = await build_cache(ttl=0)
+
+    await cache.get_chat_by_oid(chat.oid)
+    await cache.get_chat_by_oid(chat.oid)
+
+    assert cache.stats.hits == 0
+    assert cache.chats_repository.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_chats_cache_expired_entries_leave_size():
+    cache, chat = await build_cache(ttl=0)
+
+    await cache.get_chat_by_oid(chat.oid)
+    await cache.chats_repository.delete_chat_by_oid(chat.oid)
+
+    assert await cache.get_chat_by_oid(chat.oid) is None
+    assert cache.stats.size == 0
@@ -0,0 +1,65 @@
+import zlib
+
+import pytest
+
+from infra.websockets.formats import (
+    DEFLATE_MIN_SIZE,
+    join_frames,
+    negotiate_wire_format,
+    WireFormat,
+    WireFrames,
+)
+from infra.websockets.managers import ConnectionManager
+from tests.fixtures import FakeWebSocket
+
+
+def test_negotiate_wire_format_picks_first_supported():
+    assert (
+        negotiate_wire_format(["chat.v2", "chat.v1.msgpack", "chat.v1.json"])
+        == WireFormat.MSGPACK
+    )
+    assert negotiate_wire_format(["graphql-ws"]) is None
+
+
+def test_msgpack_frame_uses_short_field_names():
+    frames = WireFrames(json=b"{}", fields={"message_oid": "1", "message_text": "hi"})
+
+    assert frames.encode(WireFormat.MSGPACK) == b"\x82\xa1o\xa11\xa1t\xa2hi"
+    assert join_frames(WireFormat.MSGPACK, [b"\xc0", b"\xc3"]) == b"\x92\xc0\xc3"
+
+
+def test_msgpack_frame_encodes_sequence_as_integer():
+    small = WireFrames(json=b"{}", fields={"sequence": 5})
+    large = WireFrames(json=b"{}", fields={"sequence": 70_000})
+
+    assert small.encode(WireFormat.MSGPACK) == b"\x81\xa1s\x05"
+    assert large.encode(WireFormat.MSGPACK) == b"\x81\xa1s\xce\x00\x01\x11\x70"
+
+
+def test_deflate_compresses_only_large_frames():
+    small = WireFrames(json=b'{"a": 1}', fields={})
+    large = WireFrames(json=b'{"t": "%s"}' % (b"x" * DEFLATE_MIN_SIZE), fields={})
+
+    assert small.encode(WireFormat.JSON_DEFLATE) == b"\x00" + small.json
+
+    frame = large.encode(WireFormat.JSON_DEFLATE)
+    assert frame[:1] == b"\x01"
+    assert zlib.decompress(frame[1:], wbits=-zlib.MAX_WBITS) == large.json
+
+
+@pytest.mark.asyncio
+async def test_frames_are_encoded_once_per_format(monkeypatch):
+    manager = ConnectionManager()
+    for wire_format in [WireFormat.MSGPACK] * 3 + [None] * 2:
+        await manager.accept_connection(
+            websocket=FakeWebSocket(), key="chat", wire_format=wire_format
+        )
+
+    frames = WireFrames(json=b"{}", fields={"message_oid": "1"})
+    calls = []
+    encode = frames._encode
+    monkeypatch.setattr(frames, "_encode", lambda fmt: calls.append(fmt) or encode(fmt))
+
+    await manager.send_all("chat", frames)
+
+    assert calls == [WireFormat.MSGPACK]
@@ -0,0 +1,178 @@
+import asyncio
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import Iterable
+
+import pytest
+from pymongo.errors import (
+    BulkWriteError,
+    NetworkTimeout,
+)
+
+from domain.entities.messages import Message
+from domain.values.messages import Text
+from infra.exceptions.messages import MessagesWriteException
+from infra.repositories.messages.group_commit import GroupCommitMessagesRepository
+from infra.repositories.messages.mongo import MongoDBMessagesRepository
+from infra.repositories.transactions import current_mongo_db_session
+
+
+@dataclass
+class RecordingMongoDBMessagesRepository:
+    writes: list[list[Message]] = field(default_factory=list)
+    failing_texts: set[str] = field(default_factory=set)
+    error: Exception | None = None
+
+    async def add_message(self, message: Message) -> None:
+        self.writes.append([message])
+
+    async def add_messages(self, messages: Iterable[Message]) -> None:
+        messages = list(messages)
+        self.writes.append(messages)
+
+        if self.error is not None:
+            raise self.error
+
+        write_errors = {
+            index: "E11000 duplicate key error"
+            for index, message in enumerate(messages)
+            if message.text.as_generic_type() in self.failing_texts
+        }
+        if write_errors:
+            raise MessagesWriteException(errors=write_errors)
+
+
+@dataclass
+class FailingCollection:
+    error: Exception
+
+    async def insert_many(self, documents: list[dict], ordered: bool, session=None):
+        raise self.error
+
+
+def build_message(text: str) -> Message:
+    return Message(text=Text(value=text), chat_oid="chat")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_inserts_are_written_together():
+    messages_repository = RecordingMongoDBMessagesRepository()
+    repository = GroupCommitMessagesRepository(
+        messages_repository=messages_repository, max_delay_ms=5
+    )
+
+    await asyncio.gather(
+        *[repository.add_message(build_message(str(index))) for index in range(10)]
+    )
+
+    assert [len(batch) for batch in messages_repository.writes] == [10]
+    assert repository.stats.batch_size.count == 1
+    assert repository.stats.written_messages == 10
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_written_without_waiting():
+    messages_repository = RecordingMongoDBMessagesRepository()
+    repository = GroupCommitMessagesRepository(
+        messages_repository=messages_repository, max_delay_ms=10_000, max_batch_size=3
+    )
+
+    await asyncio.wait_for(
+        asyncio.gather(
+            *[repository.add_message(build_message(str(index))) for index in range(6)]
+        ),
+        timeout=1,
+    )
+
+    assert [len(batch) for batch in messages_repository.writes] == [3, 3]
+
+
+@pytest.mark.asyncio
+async def test_failed_documents_fail_only_their_callers():
+    messages_repository = RecordingMongoDBMessagesRepository(failing_texts={"bad"})
+    repository = GroupCommitMessagesRepository(messages_repository=messages_repository)
+
+    results = await asyncio.gather(
+        repository.add_message(build_message("good")),
+        repository.add_message(build_message("bad")),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None
+    assert isinstance(results[1], MessagesWriteException)
+    assert repository.stats.failed_messages == 1
+
+
+@pytest.mark.asyncio
+async def test_transactions_bypass_the_batch():
+    messages_repository = RecordingMongoDBMessagesRepository()
+    repository = GroupCommitMessagesRepository(messages_repository=messages_repository)
+
+    token = current_mongo_db_session.set(object())
+    try:
+        await repository.add_message(build_message("text"))
+    finally:
+        current_mongo_db_session.reset(token)
+
+    assert repository.stats.flushes == 0
+    assert len(messages_repository.writes) == 1
+
+
+@pytest.mark.asyncio
+async def test_database_errors_fail_every_caller():
+    messages_repository = RecordingMongoDBMessagesRepository(error=NetworkTimeout())
+    repository = GroupCommitMessagesRepository(messages_repository=messages_repository)
+
+    results = await asyncio.gather(
+        repository.add_message(build_message("first")),
+        repository.add_message(build_message("second")),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, NetworkTimeout) for result in results)
+    assert repository.stats.failed_messages == 2
+
+
+@pytest.mark.asyncio
+async def test_aclose_writes_the_collecting_batch():
+    messages_repository = RecordingMongoDBMessagesRepository()
+    repository = GroupCommitMessagesRepository(
+        messages_repository=messages_repository, max_delay_ms=10_000
+    )
+
+    writes = [
+        asyncio.create_task(repository.add_message(build_message(str(index))))
+        for index in range(3)
+    ]
+    await asyncio.sleep(0)
+    await asyncio.wait_for(repository.aclose(), timeout=1)
+
+    assert [len(batch) for batch in messages_repository.writes] == [3]
+    assert all(write.done() and write.exception() is None for write in writes)
+
+
+@pytest.mark.asyncio
+async def test_write_concern_errors_fail_the_whole_batch():
+    error = BulkWriteError(
+        {
+            "writeErrors": [{"index": 1, "errmsg": "E11000 duplicate key error"}],
+            "writeConcernErrors": [{"errmsg": "waiting for replication timed out"}],
+        }
+    )
+    messages_repository = MongoDBMessagesRepository(
+        mongo_db_client={"chat": {"messages": FailingCollection(error=error)}},
+        mongo_db_db_name="chat",
+        mongo_db_collection_name="messages",
+    )
+
+    with pytest.raises(MessagesWriteException) as raised:
+        await messages_repository.add_messages(
+            [build_message("first"), build_message("second")]
+        )
+
+    assert raised.value.errors == {
+        0: "waiting for replication timed out",
+        1: "E11000 duplicate key error",
+    }
@@ -0,0 +1,57 @@
+from pymongo import IndexModel
+
+from infra.repositories.indexes import (
+    find_index_issues,
+    IndexIssueReason,
+)
+
+
+DECLARED_INDEXES = (
+    IndexModel("oid", name="oid_unique", unique=True),
+    IndexModel([("chat_oid", 1), ("created_at", 1)], name="chat_oid_created_at"),
+)
+
+
+def test_find_index_issues_all_present():
+    index_information = {
+        "_id_": {"key": [("_id", 1)], "v": 2},
+        "oid_unique": {"key": [("oid", 1)], "unique": True, "v": 2},
+        "chat_oid_created_at": {"key": [("chat_oid", 1), ("created_at", 1)], "v": 2},
+    }
+
+    assert not find_index_issues("messages", DECLARED_INDEXES, index_information)
+
+
+def test_find_index_issues_missing_and_divergent():
+    index_information = {
+        "oid_unique": {"key": [("oid", 1)], "v": 2},
+    }
+
+    issues = find_index_issues("messages", DECLARED_INDEXES, index_information)
+
+    assert [(issue.index_name, issue.reason) for issue in issues] == [
+        ("oid_unique", IndexIssueReason.DIVERGENT),
+        ("chat_oid_created_at", IndexIssueReason.MISSING),
+    ]
+
+
+def test_find_index_issues_matches_indexes_by_keys():
+    index_information = {
+        "oid_1": {"key": [("oid", 1)], "unique": True, "v": 2},
+        "chat_oid_1_created_at_1": {"key": [("chat_oid", 1), ("created_at", 1)]},
+    }
+
+    assert not find_index_issues("messages", DECLARED_INDEXES, index_information)
+
+
+def test_find_index_issues_reports_same_keys_with_other_options():
+    index_information = {
+        "oid_1": {"key": [("oid", 1)], "v": 2},
+        "chat_oid_created_at": {"key": [("chat_oid", 1), ("created_at", 1)], "v": 2},
+    }
+
+    issues = find_index_issues("messages", DECLARED_INDEXES, index_information)
+
+    assert [str(issue) for issue in issues] == [
+        "messages.oid_unique: divergent (indexed as oid_1)"
+    ]
@@ -0,0 +1,144 @@
+import asyncio
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+import pytest
+from pydantic import ValidationError
+
+from infra.message_brokers.kafka import KafkaMessageBroker
+from infra.message_brokers.profiles import (
+    get_producer_settings,
+    KafkaProducerProfile,
+)
+from settings.config import Config
+
+
+@dataclass
+class PendingProducer:
+    deliveries: list[asyncio.Future] = field(default_factory=list)
+
+    async def send(self, topic: str, key: bytes, value: bytes) -> asyncio.Future:
+        delivery = asyncio.get_running_loop().create_future()
+        self.deliveries.append(delivery)
+        return delivery
+
+
+@pytest.mark.asyncio
+async def test_send_message_nowait_waits_for_in_flight_slot():
+    producer = PendingProducer()
+    broker = KafkaMessageBroker(
+        producer=producer, consumer=None, max_in_flight_messages=2
+    )
+
+    first = await broker.send_message_nowait(key=b"1", topic="topic", value=b"1")
+    await broker.send_message_nowait(key=b"2", topic="topic", value=b"2")
+    blocked = asyncio.create_task(
+        broker.send_message_nowait(key=b"3", topic="topic", value=b"3")
+    )
+    await asyncio.sleep(0)
+
+    assert not blocked.done()
+    assert len(producer.deliveries) == 2
+
+    first.set_result(None)
+    await asyncio.wait_for(blocked, timeout=1)
+
+    assert len(producer.deliveries) == 3
+
+
+def test_get_producer_settings_applies_overrides():
+    settings = get_producer_settings(
+        profile=KafkaProducerProfile.THROUGHPUT, linger_ms=50
+    )
+
+    assert settings.linger_ms == 50
+    assert settings.max_batch_size == 256 * 1024
+    assert settings.to_producer_kwargs()["compression_type"] in ("lz4", "gzip")
+
+
+def test_config_rejects_unknown_compression_type():
+    with pytest.raises(ValidationError):
+        Config(
+            MONGO_DB_CONNECTION_URI="",
+            KAFKA_URL="",
+            KAFKA_PRODUCER_COMPRESSION_TYPE="brotli",
+        )
+
+
+@dataclass
+class Record:
+    topic: str
+    key: bytes
+    value: bytes
+
+
+@dataclass
+class BatchConsumer:
+    batches: list[dict]
+    commits: int = 0
+
+    def subscribe(self, topics: list[str]): ...
+
+    async def getmany(self, timeout_ms: int, max_records: int) -> dict:
+        return self.batches.pop(0) if self.batches else {}
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.asyncio
+async def test_start_consuming_batches_commits_after_dispatch():
+    consumer = BatchConsumer(
+        batches=[
+            {
+                "partition-0": [
+                    Record(topic="topic", key=b"1", value=b'{"n": 1}'),
+                    Record(topic="topic", key=b"1", value=b"not json"),
+                ],
+                "partition-1": [Record(topic="topic", key=b"2", value=b'{"n": 2}')],
+            },
+        ]
+    )
+    broker = KafkaMessageBroker(producer=None, consumer=consumer)
+    batches = broker.start_consuming_batches(["topic"], max_records=10, timeout_ms=1)
+
+    messages = await anext(batches)
+
+    assert [message.value for message in messages] == [{"n": 1}, {"n": 2}]
+    assert consumer.commits == 0
+
+    consumer.batches.append(
+        {"partition-0": [Record(topic="topic", key=b"1", value=b'{"n": 3}')]}
+    )
+    await anext(batches)
+
+    assert consumer.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_start_consuming_batches_skips_filtered_records_undecoded():
+    consumer = BatchConsumer(
+        batches=[
+            {
+                "partition-0": [
+                    Record(topic="topic", key=b"local", value=b'{"n": 1}'),
+                    Record(topic="topic", key=b"remote", value=b"never decoded"),
+                ],
+            },
+        ]
+    )
+    broker = KafkaMessageBroker(producer=None, consumer=consumer)
+    batches = broker.start_consuming_batches(
+        ["topic"],
+        max_records=10,
+        timeout_ms=1,
+        record_filter=lambda topic, key: key == b"local",
+    )
+
+    messages = await anext(batches)
+
+    assert [message.key for message in messages] == [b"local"]
+    assert broker.consumer_stats.processed_records == 1
+    assert broker.consumer_stats.skipped_records == 1
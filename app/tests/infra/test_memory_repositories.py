@@ -0,0 +1,131 @@
+import pytest
+
+from domain.entities.messages import (
+    Chat,
+    Message,
+)
+from domain.values.messages import (
+    Text,
+    Title,
+)
+from infra.repositories.filters.messages import (
+    CountMode,
+    CursorDirection,
+    GetChatsFilters,
+    GetMessagesFilters,
+    MessagesCursor,
+)
+from infra.repositories.messages.memory import (
+    MemoryChatRepository,
+    MemoryMessagesRepository,
+)
+from tests.fixtures import build_messages
+
+
+@pytest.mark.asyncio
+async def test_chats_are_indexed_by_oid_and_title():
+    repository = MemoryChatRepository()
+    chat = Chat(title=Title("title"))
+    await repository.add_chat(chat)
+
+    assert await repository.check_chat_exists_by_title("title")
+    assert (await repository.get_chat_by_oid(chat.oid)).oid == chat.oid
+
+    await repository.delete_chat_by_oid(chat.oid)
+
+    assert not await repository.check_chat_exists_by_title("title")
+    assert await repository.get_chat_by_oid(chat.oid) is None
+
+
+@pytest.mark.asyncio
+async def test_deleted_chat_drops_its_messages():
+    messages_repository = MemoryMessagesRepository()
+    repository = MemoryChatRepository(messages_repository=messages_repository)
+    chat = Chat(title=Title("title"))
+    await repository.add_chat(chat)
+    await messages_repository.add_message(Message(text=Text("text"), chat_oid=chat.oid))
+
+    await repository.delete_chat_by_oid(chat.oid)
+
+    messages, count = await messages_repository.get_messages(
+        chat.oid, GetMessagesFilters(count=CountMode.EXACT)
+    )
+    assert messages == []
+    assert count == 0
+
+
+@pytest.mark.asyncio
+async def test_stored_chat_is_not_changed_by_callers():
+    repository = MemoryChatRepository()
+    chat = Chat(title=Title("title"))
+    await repository.add_chat(chat)
+
+    loaded = await repository.get_chat_by_oid(chat.oid)
+    loaded.add_message(Message(text=Text("text"), chat_oid=chat.oid))
+    await repository.add_telegram_listener(chat.oid, "listener")
+
+    reloaded = await repository.get_chat_by_oid(chat.oid)
+    assert not reloaded.messages
+    assert [listener.oid for listener in reloaded.listeners] == ["listener"]
+
+
+@pytest.mark.asyncio
+async def test_chat_listing_and_counters():
+    repository = MemoryChatRepository()
+    chats = [Chat(title=Title(f"title {index}")) for index in range(5)]
+    for chat in chats:
+        await repository.add_chat(chat)
+
+    page, count = await repository.get_all_chats(GetChatsFilters(limit=2, offset=1))
+
+    assert [item.oid for item in page] == [chat.oid for chat in chats[1:3]]
+    assert count == 5
+    assert await repository.reserve_message_sequences(chats[0].oid, count=3) == 1
+    assert await repository.reserve_message_sequences(chats[0].oid) == 4
+    assert await repository.get_messages_count(chats[0].oid) == 4
+    assert await repository.reserve_message_sequences("unknown") is None
+
+
+@pytest.mark.parametrize("direction", list(CursorDirection))
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_every_message_once(direction: CursorDirection):
+    repository = MemoryMessagesRepository()
+    messages = build_messages(10)
+    # Out of order arrivals are kept sorted.
+    await repository.add_messages(reversed(messages))
+
+    expected = [message.oid for message in messages]
+    if direction == CursorDirection.BACKWARD:
+        expected.reverse()
+
+    seen = []
+    cursor = None
+    while True:
+        page, _ = await repository.get_messages(
+            "chat", GetMessagesFilters(limit=3, direction=direction, cursor=cursor)
+        )
+        if not page:
+            break
+
+        seen.extend(message.oid for message in page)
+        cursor = MessagesCursor(created_at=page[-1].created_at, oid=page[-1].oid)
+
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_offset_page_sequences_and_export():
+    repository = MemoryMessagesRepository()
+    messages = build_messages(10)
+    await repository.add_messages(messages)
+
+    page, count = await repository.get_messages(
+        "chat", GetMessagesFilters(limit=3, offset=4, count=CountMode.EXACT)
+    )
+    after = await repository.get_messages_after_sequence("chat", sequence=7, limit=2)
+    exported = [message async for message in repository.iter_messages("chat", 100)]
+
+    assert [message.oid for message in page] == [m.oid for m in messages[4:7]]
+    assert count == 10
+    assert [message.sequence for message in after] == [8, 9]
+    assert len(exported) == 10
@@ -0,0 +1,315 @@
+import copy
+import operator
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+import pytest
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from infra.exceptions.messages import MessagesWriteException
+from infra.repositories.filters.messages import (
+    CountMode,
+    CursorDirection,
+    GetMessagesFilters,
+    MessagesCursor,
+)
+from infra.repositories.messages.base import BaseMessagesRepository
+from infra.repositories.messages.buckets import (
+    BucketedMongoDBMessagesRepository,
+    build_bucket_document,
+    get_window_start,
+)
+from infra.repositories.messages.converters import convert_message_to_document
+from infra.repositories.messages.memory import MemoryMessagesRepository
+from infra.repositories.messages.migrate_to_buckets import migrate_messages_to_buckets
+from settings.config import Config
+from tests.fixtures import (
+    build_messages,
+    MESSAGES_STARTED_AT,
+)
+
+
+OPERATORS = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+
+def matches(document: dict, find: dict) -> bool:
+    for name, condition in find.items():
+        value = document.get(name)
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for name, operand in condition.items():
+            if name == "$eq":
+                if value != operand:
+                    return False
+            elif value is None or not OPERATORS[name](value, operand):
+                return False
+
+    return True
+
+
+@dataclass
+class FakeCursor:
+    documents: list[dict]
+
+    def sort(self, key, direction=None):
+        keys = [(key, direction)] if isinstance(key, str) else key
+        self.documents.sort(
+            key=lambda document: [document[name] for name, _ in keys],
+            reverse=keys[0][1] < 0,
+        )
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    async def close(self): ...
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+
+@dataclass
+class FakeCollection:
+    """Just the queries and updates the bucket layout sends, so the layout can
+    be held to the contract of the in-memory repository."""
+
+    documents: list[dict] = field(default_factory=list)
+
+    def find(self, find: dict, projection=None, session=None, batch_size=None):
+        return FakeCursor(
+            [
+                copy.deepcopy(document)
+                for document in self.documents
+                if matches(document, find)
+            ]
+        )
+
+    async def update_one(self, filter: dict, update: dict, upsert=False, session=None):
+        document = next(
+            (document for document in self.documents if matches(document, filter)), None
+        )
+        if document is None:
+            document = {
+                name: value
+                for name, value in filter.items()
+                if not isinstance(value, dict)
+            }
+            self.documents.append(document)
+
+        for name, value in update["$push"].items():
+            document.setdefault(name, []).append(copy.deepcopy(value))
+        for name, value in update["$inc"].items():
+            document[name] = document.get(name, 0) + value
+        for name, value in update.get("$min", {}).items():
+            document[name] = min(document.get(name, value), value)
+        for name, value in update.get("$max", {}).items():
+            document[name] = max(document.get(name, value), value)
+
+    async def bulk_write(self, requests, ordered=True, session=None):
+        for request in requests:
+            await self.update_one(request._filter, request._doc, upsert=True)
+
+    async def insert_many(self, documents, ordered=True, session=None):
+        self.documents.extend(copy.deepcopy(documents))
+
+    async def delete_many(self, find: dict, session=None):
+        self.documents = [
+            document for document in self.documents if not matches(document, find)
+        ]
+
+    def aggregate(self, pipeline: list[dict], session=None):
+        counts: dict = {}
+        for document in self.documents:
+            if matches(document, pipeline[0]["$match"]):
+                counts[document["window_start"]] = (
+                    counts.get(document["window_start"], 0) + document["count"]
+                )
+
+        return FakeCursor(
+            [
+                {"_id": window_start, "count": count}
+                for window_start, count in sorted(counts.items())
+            ]
+        )
+
+
+def build_bucket_repository(
+    collection: FakeCollection, bucket_size: int = 3
+) -> BucketedMongoDBMessagesRepository:
+    return BucketedMongoDBMessagesRepository(
+        mongo_db_client={"chat": {"buckets": collection}},
+        mongo_db_db_name="chat",
+        mongo_db_collection_name="buckets",
+        bucket_size=bucket_size,
+        bucket_window=timedelta(hours=1),
+    )
+
+
+# The in-memory repository is the reference, the bucket layout has to answer
+# every read the same way.
+REPOSITORY_FACTORIES = {
+    "memory": MemoryMessagesRepository,
+    "bucket": lambda: build_bucket_repository(FakeCollection(), bucket_size=2),
+}
+
+
+@pytest.fixture(params=list(REPOSITORY_FACTORIES))
+def repository(request) -> BaseMessagesRepository:
+    return REPOSITORY_FACTORIES[request.param]()
+
+
+def test_window_start_floors_to_the_window():
+    created_at = datetime(2024, 1, 1, 12, 42, 7)
+
+    assert get_window_start(created_at, timedelta(hours=1)) == datetime(2024, 1, 1, 12)
+
+
+@pytest.mark.parametrize("direction", list(CursorDirection))
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_every_message_once(
+    repository: BaseMessagesRepository, direction: CursorDirection
+):
+    messages = build_messages(20, interval=timedelta(minutes=7))
+    # Late arrivals open more buckets in a window that already has full ones.
+    await repository.add_messages([*messages[::2], *messages[1::2]])
+
+    expected = [message.oid for message in messages]
+    if direction == CursorDirection.BACKWARD:
+        expected.reverse()
+
+    seen = []
+    cursor = None
+    while True:
+        page, _ = await repository.get_messages(
+            "chat", GetMessagesFilters(limit=4, direction=direction, cursor=cursor)
+        )
+        if not page:
+            break
+
+        seen.extend(message.oid for message in page)
+        cursor = MessagesCursor(created_at=page[-1].created_at, oid=page[-1].oid)
+
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_offset_pages_and_exact_count(repository: BaseMessagesRepository):
+    messages = build_messages(20)
+    await repository.add_messages(messages)
+
+    page, count = await repository.get_messages(
+        "chat", GetMessagesFilters(limit=5, offset=7, count=CountMode.EXACT)
+    )
+
+    assert [message.oid for message in page] == [
+        message.oid for message in messages[7:12]
+    ]
+    assert count == 20
+
+
+@pytest.mark.asyncio
+async def test_messages_after_sequence(repository: BaseMessagesRepository):
+    await repository.add_messages(build_messages(20))
+
+    messages = await repository.get_messages_after_sequence("chat", sequence=5, limit=4)
+
+    assert [message.sequence for message in messages] == [6, 7, 8, 9]
+    assert messages[0].chat_oid == "chat"
+
+
+@pytest.mark.asyncio
+async def test_messages_after_sequence_written_out_of_order(
+    repository: BaseMessagesRepository,
+):
+    messages = build_messages(12, interval=timedelta(minutes=1))
+
+    # Buckets of one window end up holding interleaved runs of sequences.
+    for sequence in [4, 5, 3, 12, 10, 11, 1, 2, 6, 7, 8, 9]:
+        await repository.add_message(messages[sequence - 1])
+
+    resumed = await repository.get_messages_after_sequence("chat", sequence=2, limit=2)
+
+    assert [message.sequence for message in resumed] == [3, 4]
+
+
+@dataclass
+class FailingBulkWriteCollection(FakeCollection):
+    failed_index: int = 0
+
+    async def bulk_write(self, requests, ordered=True, session=None):
+        raise BulkWriteError(
+            {
+                "nInserted": 0,
+                "nUpserted": 0,
+                "nMatched": self.failed_index,
+                "writeErrors": [
+                    {"index": self.failed_index, "errmsg": "E11000 duplicate key"}
+                ],
+                "writeConcernErrors": [],
+            }
+        )
+
+
+@pytest.mark.asyncio
+async def test_failed_append_fails_every_append_after_it():
+    repository = build_bucket_repository(FailingBulkWriteCollection(failed_index=2))
+
+    with pytest.raises(MessagesWriteException) as error:
+        await repository.add_messages(build_messages(5))
+
+    assert sorted(error.value.errors) == [2, 3, 4]
+    assert error.value.errors[2] == "E11000 duplicate key"
+
+
+@pytest.mark.asyncio
+async def test_migration_keeps_every_message_in_order():
+    messages_collection = FakeCollection(
+        documents=[
+            convert_message_to_document(message)
+            for message in [*build_messages(10), *build_messages(4, chat_oid="other")]
+        ]
+    )
+    # A bucket left behind by an interrupted migration.
+    buckets_collection = FakeCollection(
+        documents=[build_bucket_document("chat", MESSAGES_STARTED_AT, [])]
+    )
+    repository = build_bucket_repository(buckets_collection)
+
+    stats = await migrate_messages_to_buckets(
+        messages_collection=messages_collection,
+        buckets_collection=buckets_collection,
+        bucket_size=repository.bucket_size,
+        bucket_window=repository.bucket_window,
+        batch_size=4,
+    )
+    exported = [message async for message in repository.iter_messages("chat", 10)]
+
+    assert (stats.chats, stats.messages) == (2, 14)
+    assert [message.sequence for message in exported] == list(range(1, 11))
+    assert all(bucket["count"] for bucket in buckets_collection.documents)
+
+
+def test_config_rejects_group_commit_with_buckets():
+    with pytest.raises(ValidationError):
+        Config(
+            MONGO_DB_CONNECTION_URI="",
+            KAFKA_URL="",
+            STORAGE_BACKEND="mongodb",
+            MESSAGES_STORAGE_LAYOUT="bucket",
+            MESSAGES_GROUP_COMMIT_ENABLED=True,
+        )
@@ -0,0 +1,103 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import Iterable
+
+import pytest
+
+from infra.message_brokers.dots import OutboxMessage
+from infra.message_brokers.outbox import (
+    OutboxMessageBroker,
+    OutboxRelay,
+)
+from infra.repositories.outbox.base import BaseOutboxRepository
+from tests.fixtures import RecordingMessageBroker
+
+
+@dataclass
+class MemoryOutboxRepository(BaseOutboxRepository):
+    messages: list[OutboxMessage] = field(default_factory=list)
+    dispatched: set[str] = field(default_factory=set)
+    lease_extensions: list[list[str]] = field(default_factory=list)
+
+    async def add_messages(self, messages: Iterable[OutboxMessage]) -> None:
+        self.messages.extend(messages)
+
+    async def claim_pending_messages(
+        self, owner: str, limit: int, lease_seconds: float
+    ) -> list[OutboxMessage]:
+        return [
+            message for message in self.messages if message.oid not in self.dispatched
+        ][:limit]
+
+    async def extend_lease(
+        self, owner: str, oids: Iterable[str], lease_seconds: float
+    ) -> None:
+        self.lease_extensions.append(list(oids))
+
+    async def mark_dispatched(self, oids: Iterable[str]) -> None:
+        self.dispatched.update(oids)
+
+
+@pytest.mark.asyncio
+async def test_outbox_broker_only_writes_to_outbox():
+    outbox_repository = MemoryOutboxRepository()
+    kafka_broker = RecordingMessageBroker(
+        message_broker=None, outbox_repository=outbox_repository
+    )
+    broker = OutboxMessageBroker(
+        message_broker=kafka_broker, outbox_repository=outbox_repository
+    )
+
+    await broker.send_message(key=b"chat", topic="new-messages", value=b"{}")
+
+    assert not kafka_broker.sent
+    assert [message.key for message in outbox_repository.messages] == [b"chat"]
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_dispatches_in_batches():
+    outbox_repository = MemoryOutboxRepository()
+    kafka_broker = RecordingMessageBroker(
+        message_broker=None, outbox_repository=outbox_repository
+    )
+    await outbox_repository.add_messages(
+        [
+            OutboxMessage(topic="new-messages", key=b"chat", value=b"%d" % number)
+            for number in range(5)
+        ]
+    )
+    relay = OutboxRelay(
+        outbox_repository=outbox_repository, message_broker=kafka_broker, batch_size=2
+    )
+
+    assert [await relay.relay_batch() for _ in range(4)] == [2, 2, 1, 0]
+    assert [message.value for message in kafka_broker.sent] == [
+        b"0",
+        b"1",
+        b"2",
+        b"3",
+        b"4",
+    ]
+    assert len(outbox_repository.dispatched) == 5
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_renews_lease_during_slow_send():
+    outbox_repository = MemoryOutboxRepository()
+    kafka_broker = RecordingMessageBroker(
+        message_broker=None, outbox_repository=outbox_repository, send_delay=0.05
+    )
+    message = OutboxMessage(topic="new-messages", key=b"chat", value=b"{}")
+    await outbox_repository.add_messages([message])
+    relay = OutboxRelay(
+        outbox_repository=outbox_repository,
+        message_broker=kafka_broker,
+        lease_seconds=0.03,
+    )
+
+    assert await relay.relay_batch() == 1
+    assert outbox_repository.lease_extensions
+    assert outbox_repository.lease_extensions[0] == [message.oid]
+    assert outbox_repository.dispatched == {message.oid}
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from infra.repositories.messages.converters import (
+    CHAT_LIST_ITEM_PROJECTION,
+    convert_chat_document_to_list_item,
+    convert_message_document_to_list_item,
+)
+from infra.repositories.messages.read_models import (
+    ChatListItem,
+    MessageListItem,
+)
+
+
+def test_chat_listing_projection_skips_listeners():
+    assert "listeners" not in CHAT_LIST_ITEM_PROJECTION
+    assert all(
+        CHAT_LIST_ITEM_PROJECTION[name] for name in ChatListItem.__dataclass_fields__
+    )
+
+
+def test_documents_convert_to_list_items():
+    created_at = datetime(2024, 1, 1)
+
+    assert convert_chat_document_to_list_item(
+        {"oid": "chat", "title": "title", "created_at": created_at}
+    ) == ChatListItem(oid="chat", title="title", created_at=created_at)
+    # Messages written before sequences were introduced have none.
+    assert convert_message_document_to_list_item(
+        {"oid": "message", "text": "text", "created_at": created_at}
+    ) == MessageListItem(oid="message", text="text", created_at=created_at)
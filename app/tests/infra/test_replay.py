@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+import pytest
+
+from infra.websockets.formats import WireFrames
+from infra.websockets.managers import (
+    ConnectionManager,
+    ResumeBacklog,
+)
+from infra.websockets.replay import (
+    ChatReplayBuffer,
+    MESSAGE_OVERHEAD_BYTES,
+)
+from tests.fixtures import FakeWebSocket
+
+
+def test_get_since_returns_messages_after_oid():
+    buffer = ChatReplayBuffer(max_messages_per_chat=3)
+
+    for index in range(5):
+        buffer.append(chat_oid="chat", message_oid=str(index), frame=b"x")
+
+    assert len(buffer.get_since("chat")) == 3
+    assert len(buffer.get_since("chat", message_oid="3")) == 1
+    # Too old to be buffered, everything that is buffered is returned.
+    assert len(buffer.get_since("chat", message_oid="0")) == 3
+    assert buffer.stats.messages == 3
+
+
+def test_memory_cap_evicts_least_recently_joined_chat():
+    message_size = 10 + 1 + MESSAGE_OVERHEAD_BYTES
+    buffer = ChatReplayBuffer(max_size_bytes=message_size * 3)
+
+    buffer.append(chat_oid="old", message_oid="1", frame=b"x" * 10)
+    buffer.append(chat_oid="joined", message_oid="2", frame=b"x" * 10)
+    buffer.get_since("joined")
+    buffer.append(chat_oid="new", message_oid="3", frame=b"x" * 10)
+    buffer.append(chat_oid="new", message_oid="4", frame=b"x" * 10)
+
+    assert not buffer.has_chat("old")
+    assert buffer.has_chat("joined")
+    assert buffer.stats.size_bytes == message_size * 3
+
+
+def test_idle_chats_are_evicted(monkeypatch):
+    buffer = ChatReplayBuffer(idle_ttl=60)
+    buffer.append(chat_oid="chat", message_oid="1", frame=b"x")
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    buffer.append(chat_oid="other", message_oid="2", frame=b"x")
+
+    assert not buffer.has_chat("chat")
+    assert buffer.stats.evicted_chats == 1
+
+
+@pytest.mark.asyncio
+async def test_connection_is_replayed_before_live_frames():
+    buffer = ChatReplayBuffer()
+    manager = ConnectionManager(replay_buffer=buffer)
+    buffer.append(chat_oid="chat", message_oid="1", frame=b"1")
+    buffer.append(chat_oid="chat", message_oid="2", frame=b"2")
+    websocket = FakeWebSocket()
+
+    await manager.accept_connection(
+        websocket=websocket, key="chat", since_message_oid="1"
+    )
+    await manager.send_all("chat", b"3")
+    await asyncio.sleep(0.01)
+    await manager.remove_connection(websocket=websocket, key="chat")
+
+    assert websocket.sent == [b"2", b"3"]
+    # The chat is still followed, so a reconnecting client misses nothing.
+    assert manager.has_local_interest(b"chat")
+
+
+def test_covers_sequence_requires_a_complete_gap():
+    buffer = ChatReplayBuffer()
+
+    # Unknown chats are never covered, but buffered from then on.
+    assert not buffer.covers_sequence("chat", 0)
+    assert buffer.has_chat("chat")
+
+    for sequence in (4, 5):
+        buffer.append(
+            chat_oid="chat", message_oid=str(sequence), frame=b"x", sequence=sequence
+        )
+
+    assert buffer.covers_sequence("chat", 5)
+    assert buffer.covers_sequence("chat", 3)
+    # Older than the buffer.
+    assert not buffer.covers_sequence("chat", 2)
+
+    buffer.append(chat_oid="chat", message_oid="7", frame=b"x", sequence=7)
+    # 6 has not been consumed yet.
+    assert not buffer.covers_sequence("chat", 3)
+
+
+@pytest.mark.asyncio
+async def test_resumed_connection_gets_exactly_the_delta():
+    buffer = ChatReplayBuffer()
+    manager = ConnectionManager(replay_buffer=buffer)
+    for sequence in (3, 4):
+        buffer.append(
+            chat_oid="chat",
+            message_oid=str(sequence),
+            frame=build_frames(sequence),
+            sequence=sequence,
+        )
+    websocket = FakeWebSocket()
+
+    # Loaded from the database, overlapping with the buffer.
+    async def load_backlog() -> ResumeBacklog:
+        return ResumeBacklog(frames=[build_frames(sequence) for sequence in (1, 2, 3)])
+
+    await manager.accept_connection(
+        websocket=websocket, key="chat", resume_from=1, load_backlog=load_backlog
+    )
+    await manager.send_all("chat", b"5")
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == [b"2", b"3", b"4", b"5"]
+
+
+@pytest.mark.asyncio
+async def test_greeting_is_written_before_replayed_messages():
+    buffer = ChatReplayBuffer()
+    manager = ConnectionManager(replay_buffer=buffer, send_queue_size=2)
+    for index in range(5):
+        buffer.append(chat_oid="chat", message_oid=str(index), frame=b"%d" % index)
+    websocket = FakeWebSocket()
+
+    await manager.accept_connection(
+        websocket=websocket, key="chat", greeting="You are now connected!"
+    )
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == ["You are now connected!", b"3", b"4"]
+
+
+@pytest.mark.asyncio
+async def test_frames_published_while_loading_the_backlog_are_kept():
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+
+    async def load_backlog() -> ResumeBacklog:
+        # Published after the query, before the connection is live.
+        await manager.send_all("chat", build_frames(3))
+        await manager.send_all("chat", build_frames(2))
+        return ResumeBacklog(frames=[build_frames(1), build_frames(2)])
+
+    await manager.accept_connection(
+        websocket=websocket, key="chat", resume_from=0, load_backlog=load_backlog
+    )
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == [b"1", b"2", b"3"]
+
+
+@pytest.mark.asyncio
+async def test_truncated_backlog_is_marked_where_the_gap_starts():
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+
+    async def load_backlog() -> ResumeBacklog:
+        await manager.send_all("chat", build_frames(9))
+        return ResumeBacklog(
+            frames=[build_frames(1), build_frames(2)], is_truncated=True
+        )
+
+    await manager.accept_connection(
+        websocket=websocket, key="chat", resume_from=0, load_backlog=load_backlog
+    )
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == [
+        b"1",
+        b"2",
+        b'{"type": "history_truncated", "sequence": 2}',
+        b"9",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_backlog_load_removes_the_connection():
+    manager = ConnectionManager()
+
+    async def load_backlog() -> ResumeBacklog:
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        await manager.accept_connection(
+            websocket=FakeWebSocket(),
+            key="chat",
+            resume_from=0,
+            load_backlog=load_backlog,
+        )
+
+    assert manager.connections_count == 0
+    assert not manager.has_local_interest(b"chat")
+
+
+def build_frames(sequence: int) -> WireFrames:
+    return WireFrames(json=b"%d" % sequence, fields={"sequence": sequence})
@@ -0,0 +1,94 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+from itertools import chain
+from uuid import uuid4
+
+import pytest
+from aiokafka.partitioner import DefaultPartitioner
+
+from application.api.lifespan import check_routed_topics
+from infra.message_brokers.null import NullMessageBroker
+from infra.message_brokers.routing import PartitionOwnershipMap
+
+
+def test_chat_partition_matches_producer_partitioner():
+    ownership_map = PartitionOwnershipMap.from_string(
+        nodes="node-0=ws://a,node-1=ws://b",
+        partitions_count=12,
+        local_node_id="node-0",
+    )
+    partitions = list(range(12))
+
+    for chat_oid in [str(uuid4()) for _ in range(100)]:
+        assert ownership_map.get_partition(chat_oid) == DefaultPartitioner()(
+            chat_oid.encode(), partitions, partitions
+        )
+
+
+def test_every_partition_has_exactly_one_owner():
+    maps = [
+        PartitionOwnershipMap.from_string(
+            nodes="node-0=ws://a, node-1=ws://b, node-2=ws://c",
+            partitions_count=12,
+            local_node_id=node_id,
+        )
+        for node_id in ("node-0", "node-1", "node-2")
+    ]
+    owned = [ownership_map.get_local_partitions() for ownership_map in maps]
+
+    assert sorted(chain.from_iterable(owned)) == list(range(12))
+    assert [len(partitions) for partitions in owned] == [4, 4, 4]
+
+    chat_oid = str(uuid4())
+    routes = [ownership_map.get_route(chat_oid) for ownership_map in maps]
+
+    assert [route.is_local for route in routes].count(True) == 1
+    assert len({route.node.url for route in routes}) == 1
+
+
+def test_local_node_must_be_a_routing_node():
+    with pytest.raises(ValueError):
+        PartitionOwnershipMap.from_string(
+            nodes="node-0=ws://a,node-1=ws://b",
+            partitions_count=12,
+            local_node_id="node-2",
+        )
+
+
+@dataclass
+class PartitionedMessageBroker(NullMessageBroker):
+    partitions_counts: dict[str, int] = field(default_factory=dict)
+
+    async def get_partitions_count(self, topic: str) -> int | None:
+        return self.partitions_counts.get(topic)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "partitions_counts",
+    [
+        {"new-messages": 12},
+        {"new-messages": 6, "chat-deleted": 3},
+    ],
+)
+async def test_routed_topics_must_exist_and_match_partitions(partitions_counts):
+    ownership_map = PartitionOwnershipMap.from_string(
+        nodes="node-0=ws://a", partitions_count=12, local_node_id="node-0"
+    )
+
+    await check_routed_topics(
+        message_broker=PartitionedMessageBroker({"new-messages": 12}),
+        topics=["new-messages"],
+        routed_topic="new-messages",
+        ownership_map=ownership_map,
+    )
+
+    with pytest.raises(ValueError):
+        await check_routed_topics(
+            message_broker=PartitionedMessageBroker(partitions_counts),
+            topics=["new-messages", "chat-deleted"],
+            routed_topic="new-messages",
+            ownership_map=ownership_map,
+        )
@@ -0,0 +1,118 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from infra.repositories.transactions import (
+    current_mongo_db_session,
+    MongoDBTransactionManager,
+)
+
+
+def build_error(label: str) -> OperationFailure:
+    return OperationFailure("WriteConflict", code=112, details={"errorLabels": [label]})
+
+
+@dataclass
+class FakeSession:
+    commit_errors: list[Exception] = field(default_factory=list)
+    started: int = 0
+    aborted: int = 0
+    committed: int = 0
+
+    def start_transaction(self) -> None:
+        self.started += 1
+
+    async def abort_transaction(self) -> None:
+        self.aborted += 1
+
+    async def commit_transaction(self) -> None:
+        if self.commit_errors:
+            raise self.commit_errors.pop(0)
+        self.committed += 1
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *args) -> None: ...
+
+
+@dataclass
+class FakeClient:
+    session: FakeSession
+
+    async def start_session(self) -> FakeSession:
+        return self.session
+
+
+@dataclass
+class FlakyWork:
+    errors: list[Exception]
+    sessions: list = field(default_factory=list)
+
+    async def __call__(self) -> str:
+        self.sessions.append(current_mongo_db_session.get())
+        if self.errors:
+            raise self.errors.pop(0)
+        return "done"
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_run_the_transaction_again():
+    session = FakeSession()
+    manager = MongoDBTransactionManager(
+        mongo_db_client=FakeClient(session), retry_delay=0
+    )
+    work = FlakyWork(errors=[build_error("TransientTransactionError")] * 2)
+
+    assert await manager.run_in_transaction(work) == "done"
+
+    assert work.sessions == [session] * 3
+    assert (session.started, session.aborted, session.committed) == (3, 2, 1)
+    assert current_mongo_db_session.get() is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_commit_results_commit_again():
+    session = FakeSession(commit_errors=[build_error("UnknownTransactionCommitResult")])
+    manager = MongoDBTransactionManager(
+        mongo_db_client=FakeClient(session), retry_delay=0
+    )
+    work = FlakyWork(errors=[])
+
+    assert await manager.run_in_transaction(work) == "done"
+
+    assert len(work.sessions) == 1
+    assert (session.started, session.committed) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_retries_are_bounded():
+    session = FakeSession()
+    manager = MongoDBTransactionManager(
+        mongo_db_client=FakeClient(session), max_attempts=3, retry_delay=0
+    )
+    work = FlakyWork(errors=[build_error("TransientTransactionError")] * 5)
+
+    with pytest.raises(OperationFailure):
+        await manager.run_in_transaction(work)
+
+    assert len(work.sessions) == 3
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried():
+    session = FakeSession()
+    manager = MongoDBTransactionManager(
+        mongo_db_client=FakeClient(session), retry_delay=0
+    )
+    work = FlakyWork(errors=[OperationFailure("Unauthorized", code=13)])
+
+    with pytest.raises(OperationFailure):
+        await manager.run_in_transaction(work)
+
+    assert len(work.sessions) == 1
+    assert session.aborted == 1
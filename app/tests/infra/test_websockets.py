@@ -0,0 +1,221 @@
+import asyncio
+import time
+
+import pytest
+
+from infra.websockets.formats import WireFormat
+from infra.websockets.managers import ConnectionManager
+from infra.websockets.senders import OverflowPolicy
+from tests.fixtures import FakeWebSocket
+
+
+async def connect(
+    manager: ConnectionManager,
+    *websockets: FakeWebSocket,
+    wire_format: WireFormat | None = None,
+) -> None:
+    for websocket in websockets:
+        await manager.accept_connection(
+            websocket=websocket, key="chat", wire_format=wire_format
+        )
+
+
+@pytest.mark.asyncio
+async def test_send_all_is_not_held_up_by_stalled_client():
+    manager = ConnectionManager(send_queue_size=2)
+    stalled, healthy = FakeWebSocket(is_stalled=True), FakeWebSocket()
+    await connect(manager, stalled, healthy)
+
+    for index in range(5):
+        await asyncio.wait_for(manager.send_all("chat", str(index).encode()), 0.1)
+    await asyncio.sleep(0.01)
+
+    assert healthy.sent == [b"0", b"1", b"2", b"3", b"4"]
+    assert stalled.sent == []
+    # The first frame was taken by the writer, the queue keeps the last two.
+    assert manager.queued_frames == 2
+    assert manager.send_stats.dropped_frames == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_merges_queued_frames():
+    manager = ConnectionManager(
+        send_queue_size=2, overflow_policy=OverflowPolicy.COALESCE
+    )
+    websocket = FakeWebSocket(is_stalled=True)
+    await connect(manager, websocket, wire_format=WireFormat.JSON)
+
+    await manager.send_all("chat", b"0")
+    await asyncio.sleep(0)
+    for index in range(1, 4):
+        await manager.send_all("chat", str(index).encode())
+    websocket.is_stalled = False
+    await asyncio.sleep(0.05)
+
+    assert websocket.sent == [b"0", b"[1,2]", b"3"]
+    assert manager.send_stats.dropped_frames == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_is_bounded_for_stalled_clients():
+    manager = ConnectionManager(
+        send_queue_size=2, overflow_policy=OverflowPolicy.COALESCE
+    )
+    websocket = FakeWebSocket(is_stalled=True)
+    await connect(manager, websocket, wire_format=WireFormat.JSON)
+
+    await manager.send_all("chat", b"0")
+    await asyncio.sleep(0)
+    for index in range(1, 100):
+        await manager.send_all("chat", str(index).encode())
+    websocket.is_stalled = False
+    await asyncio.sleep(0.05)
+
+    assert websocket.sent == [b"0", b"[97,98]", b"99"]
+    assert manager.send_stats.dropped_frames == 96
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_drops_frames_of_clients_without_batches():
+    manager = ConnectionManager(
+        send_queue_size=2, overflow_policy=OverflowPolicy.COALESCE
+    )
+    websocket = FakeWebSocket(is_stalled=True)
+    await connect(manager, websocket)
+
+    await manager.send_all("chat", b"0")
+    await asyncio.sleep(0)
+    for index in range(1, 4):
+        await manager.send_all("chat", str(index).encode())
+    websocket.is_stalled = False
+    await asyncio.sleep(0.05)
+
+    assert websocket.sent == [b"0", b"2", b"3"]
+    assert manager.send_stats.coalesced_frames == 0
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_client():
+    manager = ConnectionManager(
+        send_queue_size=1, overflow_policy=OverflowPolicy.DISCONNECT
+    )
+    websocket = FakeWebSocket(is_stalled=True)
+    await connect(manager, websocket)
+
+    for index in range(3):
+        await manager.send_all("chat", str(index).encode())
+    await asyncio.sleep(0.01)
+
+    assert websocket.close_code == 1013
+    assert "chat" not in manager.connections_map
+    assert manager.send_stats.disconnected_clients == 1
+
+
+@pytest.mark.asyncio
+async def test_local_interest_follows_connections():
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+
+    await connect(manager, websocket)
+    assert manager.has_local_interest(b"chat")
+
+    await manager.remove_connection(websocket=websocket, key="chat")
+    assert not manager.has_local_interest(b"chat")
+
+
+@pytest.mark.asyncio
+async def test_empty_chats_are_cleaned_up():
+    manager = ConnectionManager()
+    first, second = FakeWebSocket(), FakeWebSocket()
+    await connect(manager, first, second)
+
+    await manager.remove_connection(websocket=first, key="chat")
+    assert manager.connections_map == {"chat": {second}}
+
+    await manager.remove_connection(websocket=second, key="chat")
+    await manager.remove_connection(websocket=second, key="chat")
+    assert manager.connections_map == {}
+    assert manager.senders_map == {}
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_are_reaped_when_enabled():
+    manager = ConnectionManager(idle_timeout=0.05)
+    alive, silent = FakeWebSocket(), FakeWebSocket()
+    await connect(manager, alive, silent)
+
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+        manager.mark_alive(alive)
+
+    assert alive.sent == []
+    assert alive in manager.senders_map
+    assert silent not in manager.senders_map
+    assert silent.close_code == 1001
+    assert manager.stats.reaped_connections == 1
+
+    await manager.remove_connection(websocket=alive, key="chat")
+
+
+@pytest.mark.asyncio
+async def test_disconnect_all_is_bounded_by_stalled_clients():
+    manager = ConnectionManager(disconnect_timeout=0.05)
+    healthy, stalled = FakeWebSocket(), FakeWebSocket(is_stalled=True)
+    await connect(manager, healthy, stalled)
+
+    started_at = time.monotonic()
+    await manager.disconnect_all("chat")
+
+    assert time.monotonic() - started_at < 0.5
+    assert healthy.notices == [{"message": "Chat has been deleted"}]
+    assert healthy.close_code == 1000
+    # Closed without the notice it could not take.
+    assert stalled.close_code == 1001
+    assert manager.stats.disconnect_timeouts == 1
+    assert manager.connections_map == {}
+    assert not manager.has_local_interest(b"chat")
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_does_not_starve_the_sockets_behind_it():
+    manager = ConnectionManager(
+        disconnect_timeout=1, disconnect_socket_timeout=0.05, disconnect_concurrency=1
+    )
+    stalled = FakeWebSocket(is_stalled=True)
+    healthy = [FakeWebSocket() for _ in range(3)]
+    await connect(manager, stalled, *healthy)
+
+    await manager.disconnect_all("chat")
+
+    assert stalled.close_code == 1001
+    assert [websocket.close_code for websocket in healthy] == [1000] * 3
+    assert manager.stats.disconnect_timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_sockets_left_at_the_deadline_are_closed():
+    manager = ConnectionManager(
+        disconnect_timeout=0.05, disconnect_socket_timeout=1, disconnect_concurrency=1
+    )
+    websockets = [FakeWebSocket(is_stalled=True) for _ in range(4)]
+    await connect(manager, *websockets)
+
+    await manager.disconnect_all("chat")
+
+    assert [websocket.close_code for websocket in websockets] == [1001] * 4
+    # Counted once per socket, not per worker.
+    assert manager.stats.disconnect_timeouts == 4
+
+
+@pytest.mark.asyncio
+async def test_deleted_chat_rejects_connections():
+    manager = ConnectionManager(deleted_chat_ttl=0.05)
+    await manager.disconnect_all("chat")
+
+    websocket = FakeWebSocket()
+    assert not await manager.accept_connection(websocket=websocket, key="chat")
+    assert websocket.close_code == 1000
+    assert manager.stats.rejected_connections == 1
+
+    await asyncio.sleep(0.06)
+    assert await manager.accept_connection(websocket=FakeWebSocket(), key="chat")
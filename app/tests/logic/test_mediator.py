@@ -0,0 +1,239 @@
+import asyncio
+from dataclasses import (
+    dataclass,
+    field,
+)
+from types import MappingProxyType
+from typing import ClassVar
+
+import pytest
+
+from domain.events.base import BaseEvent
+from domain.events.messages import NewMessageReceivedEvent
+from logic.events.base import (
+    BaseEventHandler,
+    EventHandler,
+)
+from logic.exceptions.mediator import MediatorFrozenException
+from logic.mediator.base import Mediator
+from logic.mediator.event import (
+    EventMediator,
+    EventPublishMode,
+)
+from logic.queries.messages import (
+    GetChatDetailQuery,
+    GetChatDetailQueryHandler,
+)
+from tests.fixtures import init_dummy_container
+
+
+def test_mediator_is_built_once():
+    container = init_dummy_container()
+    mediator = container.resolve(Mediator)
+
+    assert container.resolve(Mediator) is mediator
+    assert container.resolve(EventMediator) is mediator
+
+
+def test_mediator_is_frozen():
+    mediator: Mediator = init_dummy_container().resolve(Mediator)
+
+    assert mediator.is_frozen
+    assert isinstance(mediator.events_map, MappingProxyType)
+    assert isinstance(mediator.commands_map, MappingProxyType)
+    assert isinstance(mediator.queries_map, MappingProxyType)
+
+
+def test_frozen_mediator_rejects_registration():
+    mediator: Mediator = init_dummy_container().resolve(Mediator)
+    handler = mediator.queries_map[GetChatDetailQuery]
+
+    with pytest.raises(MediatorFrozenException):
+        mediator.register_query(GetChatDetailQuery, handler)
+
+    assert isinstance(handler, GetChatDetailQueryHandler)
+
+
+@dataclass
+class RecordingEventHandler(EventHandler[NewMessageReceivedEvent, str]):
+    handled: list[str] = field(default_factory=list)
+
+    async def handle(self, event: NewMessageReceivedEvent) -> str:
+        await asyncio.sleep(float(event.message_text))
+        self.handled.append(event.message_oid)
+
+        return event.message_oid
+
+
+def build_event(
+    chat_oid: str, message_oid: str, delay: float
+) -> NewMessageReceivedEvent:
+    return NewMessageReceivedEvent(
+        message_text=str(delay), message_oid=message_oid, chat_oid=chat_oid
+    )
+
+
+def build_mediator(
+    handlers: list[EventHandler], publish_mode: EventPublishMode, **kwargs
+) -> Mediator:
+    mediator = Mediator(**kwargs)
+    mediator.register_event(NewMessageReceivedEvent, handlers, publish_mode)
+    mediator.freeze()
+
+    return mediator
+
+
+@pytest.mark.asyncio
+async def test_concurrent_publish_keeps_chat_order():
+    handler = RecordingEventHandler(message_broker=None, connection_manager=None)
+    mediator = build_mediator([handler], EventPublishMode.CONCURRENT)
+
+    result = await mediator.publish(
+        [
+            build_event(chat_oid="first", message_oid="first-1", delay=0.05),
+            build_event(chat_oid="first", message_oid="first-2", delay=0),
+            build_event(chat_oid="second", message_oid="second-1", delay=0),
+        ]
+    )
+
+    assert sorted(result) == ["first-1", "first-2", "second-1"]
+    assert handler.handled == ["second-1", "first-1", "first-2"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_publish_isolates_slow_handlers():
+    slow_handler = RecordingEventHandler(message_broker=None, connection_manager=None)
+    mediator = build_mediator(
+        [slow_handler], EventPublishMode.CONCURRENT, handler_timeout=0.01
+    )
+
+    result = await mediator.publish(
+        [
+            build_event(chat_oid="first", message_oid="slow", delay=1),
+            build_event(chat_oid="second", message_oid="fast", delay=0),
+        ]
+    )
+
+    assert result == ["fast"]
+    assert slow_handler.handled == ["fast"]
+
+
+@pytest.mark.asyncio
+async def test_fire_and_forget_publish_does_not_wait():
+    handler = RecordingEventHandler(message_broker=None, connection_manager=None)
+    mediator = build_mediator([handler], EventPublishMode.FIRE_AND_FORGET)
+
+    result = await mediator.publish(
+        [build_event(chat_oid="first", message_oid="first-1", delay=0.01)]
+    )
+
+    assert result == []
+    assert handler.handled == []
+
+    await mediator.wait_background_tasks()
+
+    assert handler.handled == ["first-1"]
+
+
+@dataclass
+class FailingEventHandler(EventHandler[NewMessageReceivedEvent, str]):
+    async def handle(self, event: NewMessageReceivedEvent) -> str:
+        raise RuntimeError(event.message_oid)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_publish_logs_failed_handlers(caplog):
+    handler = RecordingEventHandler(message_broker=None, connection_manager=None)
+    failing_handler = FailingEventHandler(message_broker=None, connection_manager=None)
+    mediator = build_mediator([handler, failing_handler], EventPublishMode.CONCURRENT)
+
+    result = await mediator.publish(
+        [build_event(chat_oid="first", message_oid="first-1", delay=0)]
+    )
+
+    assert result == ["first-1"]
+    assert "FailingEventHandler failed" in caplog.text
+    assert "RuntimeError: first-1" in caplog.text
+
+
+@dataclass
+class RepublishingEventHandler(EventHandler[NewMessageReceivedEvent, str]):
+    mediator: Mediator | None = None
+
+    async def handle(self, event: NewMessageReceivedEvent) -> str:
+        if event.chat_oid == "first":
+            await self.mediator.publish(
+                [build_event(chat_oid="second", message_oid="nested", delay=0)]
+            )
+
+        return event.message_oid
+
+
+@pytest.mark.asyncio
+async def test_nested_concurrent_publish_does_not_wait_for_a_slot():
+    handler = RepublishingEventHandler(message_broker=None, connection_manager=None)
+    mediator = build_mediator(
+        [handler], EventPublishMode.CONCURRENT, max_concurrent_handlers=1
+    )
+    handler.mediator = mediator
+
+    result = await asyncio.wait_for(
+        mediator.publish(
+            [build_event(chat_oid="first", message_oid="first-1", delay=0)]
+        ),
+        timeout=1,
+    )
+
+    assert result == ["first-1"]
+
+
+@dataclass
+class ChatTouchedEvent(BaseEvent):
+    event_title: ClassVar[str] = "Chat Touched"
+
+    chat_oid: str
+
+
+@dataclass
+class TouchingEventHandler(BaseEventHandler[NewMessageReceivedEvent, str]):
+    mediator: Mediator | None = None
+
+    async def handle(self, event: NewMessageReceivedEvent) -> str:
+        await self.mediator.publish([ChatTouchedEvent(chat_oid=event.chat_oid)])
+        return event.message_oid
+
+
+@dataclass
+class TouchedEventHandler(BaseEventHandler[ChatTouchedEvent, str]):
+    async def handle(self, event: ChatTouchedEvent) -> str:
+        return event.chat_oid
+
+
+@pytest.mark.parametrize(
+    "nested_publish_mode",
+    [EventPublishMode.SEQUENTIAL, EventPublishMode.CONCURRENT],
+)
+@pytest.mark.asyncio
+async def test_nested_publish_for_the_same_chat_does_not_wait_for_itself(
+    nested_publish_mode, caplog
+):
+    handler = TouchingEventHandler()
+    mediator = Mediator(handler_timeout=0.5)
+    mediator.register_event(
+        NewMessageReceivedEvent, [handler], EventPublishMode.CONCURRENT
+    )
+    mediator.register_event(
+        ChatTouchedEvent, [TouchedEventHandler()], nested_publish_mode
+    )
+    mediator.freeze()
+    handler.mediator = mediator
+
+    result = await mediator.publish(
+        [
+            build_event(chat_oid="chat", message_oid="first", delay=0),
+            build_event(chat_oid="chat", message_oid="second", delay=0),
+        ]
+    )
+
+    assert result == ["first", "second"]
+    assert "failed" not in caplog.text
@@ -0,0 +1,87 @@
+import pytest
+
+from domain.entities.messages import Chat
+from domain.events.messages import NewMessageReceivedEvent
+from domain.exceptions.messages import EmptyTextException
+from domain.values.messages import Title
+from infra.message_brokers.dots import BrokerMessage
+from logic.commands.messages import (
+    CreateMessagesBatchCommand,
+    CreateMessagesBatchCommandHandler,
+)
+from logic.events.messages import NewMessageReceivedEventHandler
+from logic.exceptions.messages import MessageNotSavedException
+from logic.mediator.base import Mediator
+from tests.fixtures import (
+    CountingChatsRepository,
+    RecordingMessageBroker,
+    RecordingMessagesRepository,
+)
+
+
+async def build_handler(
+    messages_repository: RecordingMessagesRepository,
+    message_broker: RecordingMessageBroker,
+) -> tuple[CreateMessagesBatchCommandHandler, Chat]:
+    chats_repository = CountingChatsRepository()
+    chat = Chat(title=Title("title"))
+    await chats_repository.add_chat(chat)
+
+    mediator = Mediator()
+    mediator.register_event(
+        NewMessageReceivedEvent,
+        [
+            NewMessageReceivedEventHandler(
+                message_broker=message_broker,
+                connection_manager=None,
+                broker_topic="new-messages",
+            )
+        ],
+    )
+    handler = CreateMessagesBatchCommandHandler(
+        _mediator=mediator,
+        chats_repository=chats_repository,
+        message_repository=messages_repository,
+    )
+
+    return handler, chat
+
+
+@pytest.mark.asyncio
+async def test_create_messages_batch_command():
+    message_broker = RecordingMessageBroker(message_broker=None, outbox_repository=None)
+    messages_repository = RecordingMessagesRepository()
+    handler, chat = await build_handler(messages_repository, message_broker)
+
+    results = await handler.handle(
+        CreateMessagesBatchCommand(texts=("first", "", "second"), chat_oid=chat.oid)
+    )
+
+    assert isinstance(results[1], EmptyTextException)
+    assert [result.text.as_generic_type() for result in (results[0], results[2])] == [
+        "first",
+        "second",
+    ]
+    # Positions are only reserved for the valid texts.
+    assert [results[0].sequence, results[2].sequence] == [1, 2]
+    assert len(messages_repository.writes) == 1
+    assert messages_repository.writes[0] == [results[0], results[2]]
+    assert all(isinstance(sent, BrokerMessage) for sent in message_broker.sent)
+    assert [sent.key for sent in message_broker.sent] == [chat.oid.encode()] * 2
+
+
+@pytest.mark.asyncio
+async def test_create_messages_batch_command_reports_write_errors_per_item():
+    message_broker = RecordingMessageBroker(message_broker=None, outbox_repository=None)
+    messages_repository = RecordingMessagesRepository(failing_texts={"duplicate"})
+    handler, chat = await build_handler(messages_repository, message_broker)
+
+    results = await handler.handle(
+        CreateMessagesBatchCommand(texts=("first", "duplicate"), chat_oid=chat.oid)
+    )
+
+    assert results[0].text.as_generic_type() == "first"
+    assert isinstance(results[1], MessageNotSavedException)
+    # Only the saved message is published and counted.
+    assert len(message_broker.sent) == 1
+    assert await handler.chats_repository.get_messages_count(chat.oid) == 1
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+
+import pytest
+
+from domain.entities.messages import Chat
+from domain.values.messages import Title
+from infra.repositories.filters.messages import (
+    CountMode,
+    GetMessagesFilters,
+)
+from logic.commands.messages import (
+    CreateMessageCommand,
+    CreateMessageCommandHandler,
+)
+from logic.queries.messages import (
+    GetMessagesQuery,
+    GetMessagesQueryHandler,
+)
+from tests.fixtures import (
+    CountingChatsRepository,
+    RecordingMessagesRepository,
+)
+
+
+@dataclass
+class ScanningMessagesRepository(RecordingMessagesRepository):
+    scanned_count: int = 0
+
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters):
+        if filters.count == CountMode.EXACT:
+            return [], self.scanned_count
+
+        return [], None
+
+
+@dataclass
+class FailingMessagesRepository(RecordingMessagesRepository):
+    async def add_message(self, message):
+        raise ConnectionError
+
+
+@pytest.mark.parametrize(
+    "count_mode, expected_count",
+    [
+        (CountMode.EXACT, 7),
+        (CountMode.ESTIMATED, 5),
+        (CountMode.NONE, None),
+    ],
+)
+@pytest.mark.asyncio
+async def test_get_messages_count_modes(count_mode, expected_count):
+    chats_repository = CountingChatsRepository()
+    chat = Chat(title=Title("title"))
+    await chats_repository.add_chat(chat)
+    await chats_repository.reserve_message_sequences(chat_oid=chat.oid, count=5)
+
+    handler = GetMessagesQueryHandler(
+        messages_repository=ScanningMessagesRepository(scanned_count=7),
+        chats_repository=chats_repository,
+    )
+
+    _, count = await handler.handle(
+        GetMessagesQuery(
+            chat_oid=chat.oid, filters=GetMessagesFilters(count=count_mode)
+        )
+    )
+
+    assert count == expected_count
+
+
+@pytest.mark.asyncio
+async def test_chats_without_a_counter_are_counted_exactly():
+    handler = GetMessagesQueryHandler(
+        messages_repository=ScanningMessagesRepository(scanned_count=7),
+        # Knows no counter for the chat, like chats created before it was kept.
+        chats_repository=CountingChatsRepository(),
+    )
+
+    _, count = await handler.handle(
+        GetMessagesQuery(
+            chat_oid="chat", filters=GetMessagesFilters(count=CountMode.ESTIMATED)
+        )
+    )
+
+    assert count == 7
+
+
+@pytest.mark.asyncio
+async def test_failed_insert_is_not_counted():
+    chats_repository = CountingChatsRepository()
+    chat = Chat(title=Title("title"))
+    await chats_repository.add_chat(chat)
+    handler = CreateMessageCommandHandler(
+        _mediator=None,
+        chats_repository=chats_repository,
+        message_repository=FailingMessagesRepository(),
+    )
+
+    with pytest.raises(ConnectionError):
+        await handler.handle(CreateMessageCommand(text="text", chat_oid=chat.oid))
+
+    assert await chats_repository.get_messages_count(chat.oid) == 0
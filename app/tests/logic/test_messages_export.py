@@ -0,0 +1,65 @@
+import orjson
+import pytest
+
+from application.api.messages.handlers import encode_ndjson
+from domain.entities.messages import (
+    Chat,
+    Message,
+)
+from domain.values.messages import (
+    Text,
+    Title,
+)
+from logic.exceptions.messages import ChatNotFoundException
+from logic.queries.messages import (
+    ExportMessagesQuery,
+    ExportMessagesQueryHandler,
+)
+from tests.fixtures import (
+    CountingChatsRepository,
+    RecordingMessagesRepository,
+)
+
+
+@pytest.mark.asyncio
+async def test_export_messages_streams_ndjson_in_chunks():
+    chats_repository = CountingChatsRepository()
+    chat = Chat(title=Title("title"))
+    await chats_repository.add_chat(chat)
+
+    messages_repository = RecordingMessagesRepository()
+    await messages_repository.add_messages(
+        [
+            Message(text=Text(str(index)), chat_oid=chat.oid, sequence=index)
+            for index in range(5)
+        ]
+    )
+    await messages_repository.add_message(
+        Message(text=Text("other chat"), chat_oid="other")
+    )
+
+    handler = ExportMessagesQueryHandler(
+        chats_repository=chats_repository, messages_repository=messages_repository
+    )
+    messages = await handler.handle(
+        ExportMessagesQuery(chat_oid=chat.oid, batch_size=2)
+    )
+    chunks = [chunk async for chunk in encode_ndjson(messages, chunk_size=2)]
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+
+    records = [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [record["text"] for record in records] == ["0", "1", "2", "3", "4"]
+    assert records[0]["sequence"] == 0
+    assert set(records[0]) == {"oid", "text", "created_at", "sequence"}
+
+
+@pytest.mark.asyncio
+async def test_export_messages_of_unknown_chat_fails_before_streaming():
+    handler = ExportMessagesQueryHandler(
+        chats_repository=CountingChatsRepository(),
+        messages_repository=RecordingMessagesRepository(),
+    )
+
+    with pytest.raises(ChatNotFoundException):
+        await handler.handle(ExportMessagesQuery(chat_oid="unknown", batch_size=10))